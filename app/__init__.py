@@ -1,26 +1,30 @@
+import click
 from flask import Flask
+from flask.cli import AppGroup
 from flask_sqlalchemy import SQLAlchemy
-from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
 from flask_cors import CORS
-from flask_swagger_ui import get_swaggerui_blueprint
 from .config import Config
+from .database import RoutingSession, init_database
+from .utils.cache import cache
+from .utils.metrics import request_metrics
 
-db = SQLAlchemy()
-migrate = Migrate()
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
 
-def create_app(config_class=Config):
-    app = Flask(__name__)
-    app.config.from_object(config_class)
-    
-    # Initialize extensions
-    db.init_app(app)
-    migrate.init_app(app, db)
-    jwt.init_app(app)
-    CORS(app)
+def init_migrations(app):
+    """Set up Flask-Migrate, which registers the `flask db` commands.
+
+    Flask-Migrate imports Alembic, so create_app only does this when running
+    under the flask CLI; scripts calling flask_migrate.upgrade() etc. directly
+    call it themselves.
+    """
+    from flask_migrate import Migrate
+    Migrate(app, db)
+
+def init_swagger_ui(app):
+    from flask_swagger_ui import get_swaggerui_blueprint
     
-    # Register Swagger UI
     SWAGGER_URL = '/api/docs'
     API_URL = '/static/swagger.json'
     swaggerui_blueprint = get_swaggerui_blueprint(
@@ -31,6 +35,91 @@ def create_app(config_class=Config):
         }
     )
     app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
+
+def flask_cli_command():
+    """Name of the flask CLI command loading the app, '' while the flask command is still looking up
+    one of app.cli's commands, or None outside the flask CLI (whose click context carries Flask's ScriptInfo)"""
+    from flask.cli import ScriptInfo
+    context = click.get_current_context(silent=True)
+    if context is None or context.find_object(ScriptInfo) is None:
+        return None
+    # Built-in commands such as `flask run` load the app from their own context, below the flask group's
+    while context.parent is not None and context.parent.parent is not None:
+        context = context.parent
+    return context.info_name if context.parent is not None else ''
+
+def create_schema(app):
+    """db.create_all() unless SCHEMA_AUTO_CREATE is off"""
+    if app.config['SCHEMA_AUTO_CREATE']:
+        with app.app_context():
+            db.create_all()
+
+class AppCommands(AppGroup):
+    """app.cli of an app loaded by the flask command before it knows which command it will run.
+
+    The schema is created once a command other than `flask db` is looked up;
+    migrations must find the database as Alembic left it.
+    """
+
+    def __init__(self, app):
+        super().__init__(app.name)
+        self.app = app
+
+    def get_command(self, ctx, name):
+        if name != 'db':
+            create_schema(self.app)
+        return super().get_command(ctx, name)
+
+def create_app(config_class=Config, from_cli=None):
+    """Application factory; from_cli says whether the flask CLI is loading the app (detected when None)"""
+    app = Flask(__name__)
+    app.config.from_object(config_class)
+    
+    if from_cli is None:
+        command = flask_cli_command()
+    else:
+        command = '' if from_cli else None
+    if command == '':
+        app.cli = AppCommands(app)
+    
+    # Initialize extensions
+    init_database(app, db)
+    # Registered first, so that requests refused by other hooks are still counted
+    request_metrics.init_app(app, db)
+    # Only the flask CLI needs the migration commands
+    if command is not None:
+        init_migrations(app)
+    jwt.init_app(app)
+    CORS(app)
+    cache.init_app(app)
+    
+    from app.utils.fx import rate_cache
+    rate_cache.init_app(app)
+    
+    from app.utils.auth import user_cache
+    user_cache.init_app(app)
+    
+    from app.utils.passwords import password_hasher
+    password_hasher.init_app(app)
+    
+    from app.utils.ratelimit import rate_limiter
+    rate_limiter.init_app(app)
+    
+    from app.utils.reports import spending_memo
+    spending_memo.init_app(app)
+    
+    from app.utils.alerts import budget_alerts
+    budget_alerts.init_app(app)
+    
+    from app.utils.forecast import spend_forecaster
+    spend_forecaster.init_app(app)
+    
+    from app.utils.anomalies import anomaly_detector
+    anomaly_detector.init_app(app)
+    
+    # Register Swagger UI
+    if app.config['SWAGGER_UI_ENABLED']:
+        init_swagger_ui(app)
     
     # Register blueprints
     from app.api.auth import auth_bp
@@ -38,16 +127,31 @@ def create_app(config_class=Config):
     from app.api.transactions import transactions_bp
     from app.api.categories import categories_bp
     from app.api.budgets import budgets_bp
+    from app.api.fx import fx_bp
+    from app.api.reports import reports_bp
+    from app.api.recurring import recurring_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(users_bp, url_prefix='/api/users')
     app.register_blueprint(transactions_bp, url_prefix='/api/transactions')
     app.register_blueprint(categories_bp, url_prefix='/api/categories')
     app.register_blueprint(budgets_bp, url_prefix='/api/budgets')
+    app.register_blueprint(fx_bp, url_prefix='/api/fx')
+    app.register_blueprint(reports_bp, url_prefix='/api/reports')
+    app.register_blueprint(recurring_bp, url_prefix='/api/recurring')
+    
+    # Register CLI commands
+    from app.cli import fx_cli, recurring_cli, rollups_cli
+    
+    app.cli.add_command(rollups_cli)
+    app.cli.add_command(fx_cli)
+    app.cli.add_command(recurring_cli)
     
-    # Create tables if they don't exist
-    with app.app_context():
-        db.create_all()
+    # Create tables if they don't exist; with SCHEMA_AUTO_CREATE off, and for
+    # `flask db`, Alembic alone manages the schema. While the flask command is
+    # still looking up its command, AppCommands does this instead
+    if command not in ('', 'db'):
+        create_schema(app)
     
     @app.route('/api/health', methods=['GET'])
     def health_check():
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, current_user
 from app.models.user import User
+from app.utils.auth import token_claims
 from app import db
 
 auth_bp = Blueprint('auth', __name__)
@@ -42,9 +43,14 @@ def login():
     if not user or not user.check_password(data['password']):
         return jsonify({'message': 'Invalid username or password'}), 401
     
-    # Create tokens
-    access_token = create_access_token(identity=user.id)
-    refresh_token = create_refresh_token(identity=user.id)
+    # Upgrade the stored hash when PASSWORD_HASH_METHOD has changed since it was made
+    if user.password_needs_rehash():
+        user.set_password(data['password'])
+        db.session.commit()
+    
+    # Create tokens; the identity claims spare later requests a user lookup
+    access_token = create_access_token(identity=user.id, additional_claims=token_claims(user))
+    refresh_token = create_refresh_token(identity=user.id, additional_claims=token_claims(user))
     
     return jsonify({
         'message': 'Login successful',
@@ -56,18 +62,12 @@ def login():
 @auth_bp.route('/refresh', methods=['POST'])
 @jwt_required(refresh=True)
 def refresh():
-    current_user_id = get_jwt_identity()
-    access_token = create_access_token(identity=current_user_id)
+    access_token = create_access_token(identity=current_user.id, additional_claims=token_claims(current_user))
     
     return jsonify({'access_token': access_token}), 200
 
 @auth_bp.route('/profile', methods=['GET'])
 @jwt_required()
 def profile():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    
-    if not user:
-        return jsonify({'message': 'User not found'}), 404
-    
-    return jsonify({'user': user.to_dict()}), 200
\ No newline at end of file
+    # current_user comes from the token checks' in-process cache
+    return jsonify({'user': current_user.profile}), 200
\ No newline at end of file
@@ -1,82 +1,66 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
 from app.models.budget import Budget
 from app.models.category import Category
-from app.models.transaction import Transaction
+from app.utils.money import parse_currency, to_cents
+from app.utils.helpers import budget_spending_statement, get_budget_spending
+from app.utils.serializers import BUDGET_SERIALIZER, json_response
+from app.utils.cache import cached_response, invalidate_cached_responses
+from app.utils.alerts import budget_alerts
+from app.utils.forecast import spend_forecaster
+from app.database import use_replica
 from app import db
-from sqlalchemy import func
 
 budgets_bp = Blueprint('budgets', __name__)
 
+def budget_list_statement(user_id, args):
+    """Budget spending SELECT for the active_only/category_id filters in args"""
+    active_only = args.get('active_only', 'false').lower() == 'true'
+    category_id = args.get('category_id', type=int)
+    
+    active_on = datetime.utcnow().date() if active_only else None
+    
+    return budget_spending_statement(user_id, active_on=active_on, category_id=category_id)
+
 @budgets_bp.route('', methods=['GET'])
 @jwt_required()
+@cached_response
+@use_replica
 def get_budgets():
     current_user_id = get_jwt_identity()
     
-    # Get query parameters
-    active_only = request.args.get('active_only', 'false').lower() == 'true'
-    category_id = request.args.get('category_id', type=int)
-    
-    # Base query
-    query = Budget.query.filter_by(user_id=current_user_id)
-    
-    # Apply filters
-    if active_only:
-        today = datetime.utcnow().date()
-        query = query.filter(Budget.start_date <= today, Budget.end_date >= today)
-    
-    if category_id:
-        query = query.filter_by(category_id=category_id)
-    
-    budgets = query.all()
-    
-    # Enhance budget data with spending information
-    result = []
-    for budget in budgets:
-        budget_dict = budget.to_dict()
-        
-        # Calculate current spending for this budget
-        spending = db.session.query(func.sum(Transaction.amount)).filter(
-            Transaction.user_id == current_user_id,
-            Transaction.category_id == budget.category_id,
-            Transaction.type == 'expense',
-            Transaction.date >= budget.start_date,
-            Transaction.date <= budget.end_date
-        ).scalar() or 0
-        
-        budget_dict['spent'] = spending
-        budget_dict['remaining'] = budget.amount - spending
-        budget_dict['percentage_used'] = (spending / budget.amount) * 100 if budget.amount > 0 else 0
-        
-        result.append(budget_dict)
-    
-    return jsonify({'budgets': result}), 200
+    # Budgets and their current spending come back from a single query
+    budgets = db.session.execute(budget_list_statement(current_user_id, request.args)).all()
+    
+    return json_response('budgets', BUDGET_SERIALIZER.serialize_many(budgets))
+
+@budgets_bp.route('/alerts', methods=['GET'])
+@jwt_required()
+def get_budget_alerts():
+    current_user_id = get_jwt_identity()
+    
+    # Served from the running spend counters; only the first read of a user queries the database
+    return jsonify({'alerts': budget_alerts.alerts(current_user_id)}), 200
+
+@budgets_bp.route('/forecast', methods=['GET'])
+@jwt_required()
+def get_budget_forecast():
+    current_user_id = get_jwt_identity()
+    
+    # Spend to date from the alert counters, the rest from cached per-category weekday averages
+    return jsonify({'forecasts': spend_forecaster.forecasts(current_user_id)}), 200
 
 @budgets_bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
 def get_budget(id):
     current_user_id = get_jwt_identity()
-    budget = Budget.query.filter_by(id=id, user_id=current_user_id).first()
+    budgets = get_budget_spending(current_user_id, budget_id=id)
     
-    if not budget:
+    if not budgets:
         return jsonify({'message': 'Budget not found'}), 404
     
-    # Calculate current spending for this budget
-    spending = db.session.query(func.sum(Transaction.amount)).filter(
-        Transaction.user_id == current_user_id,
-        Transaction.category_id == budget.category_id,
-        Transaction.type == 'expense',
-        Transaction.date >= budget.start_date,
-        Transaction.date <= budget.end_date
-    ).scalar() or 0
-    
-    budget_dict = budget.to_dict()
-    budget_dict['spent'] = spending
-    budget_dict['remaining'] = budget.amount - spending
-    budget_dict['percentage_used'] = (spending / budget.amount) * 100 if budget.amount > 0 else 0
-    
-    return jsonify({'budget': budget_dict}), 200
+    return json_response('budget', BUDGET_SERIALIZER.serialize(budgets[0]))
 
 @budgets_bp.route('', methods=['POST'])
 @jwt_required()
@@ -104,9 +88,17 @@ def create_budget():
     if end_date < start_date:
         return jsonify({'message': 'End date must be after start date'}), 400
     
+    # Parse amount and currency
+    try:
+        amount_cents = to_cents(data['amount'])
+        currency = parse_currency(data.get('currency'), current_app.config['DEFAULT_CURRENCY'])
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
     # Create new budget
     budget = Budget(
-        amount=float(data['amount']),
+        amount_cents=amount_cents,
+        currency=currency,
         start_date=start_date,
         end_date=end_date,
         category_id=data['category_id'],
@@ -115,6 +107,8 @@ def create_budget():
     
     db.session.add(budget)
     db.session.commit()
+    invalidate_cached_responses(current_user_id)
+    budget_alerts.refresh_user(current_user_id)
     
     return jsonify({
         'message': 'Budget created successfully',
@@ -133,8 +127,13 @@ def update_budget(id):
     data = request.get_json()
     
     # Update fields
-    if data.get('amount'):
-        budget.amount = float(data['amount'])
+    try:
+        if data.get('amount'):
+            budget.amount_cents = to_cents(data['amount'])
+        if data.get('currency'):
+            budget.currency = parse_currency(data['currency'])
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     
     if data.get('start_date'):
         try:
@@ -159,6 +158,8 @@ def update_budget(id):
         budget.category_id = data['category_id']
     
     db.session.commit()
+    invalidate_cached_responses(current_user_id)
+    budget_alerts.refresh_user(current_user_id)
     
     return jsonify({
         'message': 'Budget updated successfully',
@@ -176,5 +177,7 @@ def delete_budget(id):
     
     db.session.delete(budget)
     db.session.commit()
+    invalidate_cached_responses(current_user_id)
+    budget_alerts.refresh_user(current_user_id)
     
     return jsonify({'message': 'Budget deleted successfully'}), 200
\ No newline at end of file
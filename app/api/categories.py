@@ -1,19 +1,24 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import select
 from app.models.category import Category
+from app.utils.serializers import CATEGORY_SERIALIZER, json_response
+from app.utils.cache import cached_response, invalidate_cached_responses
+from app.utils.alerts import budget_alerts
 from app import db
 
 categories_bp = Blueprint('categories', __name__)
 
 @categories_bp.route('', methods=['GET'])
 @jwt_required()
+@cached_response
 def get_categories():
     current_user_id = get_jwt_identity()
-    categories = Category.query.filter_by(user_id=current_user_id).all()
+    categories = db.session.execute(
+        select(*CATEGORY_SERIALIZER.columns).where(Category.user_id == current_user_id).order_by(Category.id)
+    )
     
-    return jsonify({
-        'categories': [category.to_dict() for category in categories]
-    }), 200
+    return json_response('categories', CATEGORY_SERIALIZER.serialize_many(categories))
 
 @categories_bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
@@ -46,6 +51,7 @@ def create_category():
     
     db.session.add(category)
     db.session.commit()
+    invalidate_cached_responses(current_user_id)
     
     return jsonify({
         'message': 'Category created successfully',
@@ -72,6 +78,8 @@ def update_category(id):
         category.color = data['color']
     
     db.session.commit()
+    invalidate_cached_responses(current_user_id)
+    budget_alerts.forget_user(current_user_id)
     
     return jsonify({
         'message': 'Category updated successfully',
@@ -89,5 +97,7 @@ def delete_category(id):
     
     db.session.delete(category)
     db.session.commit()
+    invalidate_cached_responses(current_user_id)
+    budget_alerts.forget_user(current_user_id)
     
     return jsonify({'message': 'Category deleted successfully'}), 200
\ No newline at end of file
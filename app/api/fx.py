@@ -0,0 +1,32 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from datetime import datetime
+from app.utils.fx import rate_cache
+from app.utils.money import parse_currency
+
+fx_bp = Blueprint('fx', __name__)
+
+@fx_bp.route('/rates/<base>/<quote>', methods=['GET'])
+@jwt_required()
+def get_rate(base, quote):
+    try:
+        base = parse_currency(base, None)
+        quote = parse_currency(quote, None)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    # Rate in effect on the given date (default today), carried forward over gaps
+    rate_date = datetime.utcnow().date()
+    if request.args.get('date'):
+        try:
+            rate_date = datetime.strptime(request.args['date'], '%Y-%m-%d').date()
+        except ValueError:
+            return jsonify({'message': 'Invalid date format. Use YYYY-MM-DD'}), 400
+    
+    rate = rate_cache.get_rate(base, quote, rate_date)
+    if rate is None:
+        return jsonify({'message': f'No {base}/{quote} rate on or before {rate_date.isoformat()}'}), 404
+    
+    return jsonify({
+        'rate': {'base': base, 'quote': quote, 'date': rate_date.isoformat(), 'rate': rate}
+    }), 200
@@ -0,0 +1,118 @@
+from flask import Blueprint, request, jsonify, current_app
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from datetime import datetime, timedelta
+from sqlalchemy import update
+from app.models.category import Category
+from app.models.recurring_transaction import RecurringTransaction
+from app.models.transaction import Transaction
+from app.utils.money import parse_currency, to_cents
+from app.utils.recurring import FREQUENCIES, materialize
+from app.utils.cache import invalidate_cached_responses
+from app import db
+
+recurring_bp = Blueprint('recurring', __name__)
+
+@recurring_bp.route('', methods=['GET'])
+@jwt_required()
+def get_recurring_transactions():
+    current_user_id = get_jwt_identity()
+    schedules = RecurringTransaction.query.filter_by(user_id=current_user_id).order_by(RecurringTransaction.id).all()
+    
+    return jsonify({'recurring_transactions': [schedule.to_dict() for schedule in schedules]}), 200
+
+@recurring_bp.route('', methods=['POST'])
+@jwt_required()
+def create_recurring_transaction():
+    current_user_id = get_jwt_identity()
+    data = request.get_json()
+    
+    # Validate input
+    if not data or not data.get('amount') or not data.get('type') or not data.get('category_id') \
+            or not data.get('frequency') or not data.get('start_date'):
+        return jsonify({'message': 'Missing required fields'}), 400
+    
+    if data['type'] not in ['income', 'expense']:
+        return jsonify({'message': 'Transaction type must be either "income" or "expense"'}), 400
+    
+    if data['frequency'] not in FREQUENCIES:
+        return jsonify({'message': f'Frequency must be one of {", ".join(FREQUENCIES)}'}), 400
+    
+    # Validate category
+    category = Category.query.filter_by(id=data['category_id'], user_id=current_user_id).first()
+    if not category:
+        return jsonify({'message': 'Category not found'}), 404
+    
+    # Parse dates
+    try:
+        start_date = datetime.strptime(data['start_date'], '%Y-%m-%d').date()
+        end_date = datetime.strptime(data['end_date'], '%Y-%m-%d').date() if data.get('end_date') else None
+    except (TypeError, ValueError):
+        return jsonify({'message': 'Invalid date format. Use YYYY-MM-DD'}), 400
+    
+    if end_date and end_date < start_date:
+        return jsonify({'message': 'End date must be after start date'}), 400
+    
+    # Parse cadence limits, amount and currency
+    try:
+        interval = int(data.get('interval', 1))
+        max_occurrences = int(data['max_occurrences']) if data.get('max_occurrences') is not None else None
+        amount_cents = to_cents(data['amount'])
+        currency = parse_currency(data.get('currency'), current_app.config['DEFAULT_CURRENCY'])
+    except (TypeError, ValueError) as e:
+        return jsonify({'message': str(e)}), 400
+    
+    if interval < 1 or (max_occurrences is not None and max_occurrences < 1):
+        return jsonify({'message': 'interval and max_occurrences must be at least 1'}), 400
+    
+    # Past occurrences are created within this request, so how far back they go is bounded
+    today = datetime.utcnow().date()
+    max_backfill_days = current_app.config['RECURRING_MAX_BACKFILL_DAYS']
+    if start_date < today - timedelta(days=max_backfill_days):
+        return jsonify({'message': f'Start date must be within the last {max_backfill_days} days'}), 400
+    
+    # Create new schedule
+    schedule = RecurringTransaction(
+        amount_cents=amount_cents,
+        currency=currency,
+        description=data.get('description', ''),
+        type=data['type'],
+        frequency=data['frequency'],
+        interval=interval,
+        start_date=start_date,
+        end_date=end_date,
+        max_occurrences=max_occurrences,
+        occurrences=0,
+        next_date=start_date,
+        category_id=category.id,
+        user_id=current_user_id
+    )
+    
+    db.session.add(schedule)
+    db.session.flush()
+    # Occurrences already due are created now; later ones by `flask recurring materialize`
+    created = materialize([schedule], today, current_app.config['RECURRING_CHUNK_SIZE'])
+    db.session.commit()
+    invalidate_cached_responses(current_user_id)
+    
+    return jsonify({
+        'message': 'Recurring transaction created successfully',
+        'recurring_transaction': schedule.to_dict(),
+        'created_transactions': created
+    }), 201
+
+@recurring_bp.route('/<int:id>', methods=['DELETE'])
+@jwt_required()
+def delete_recurring_transaction(id):
+    current_user_id = get_jwt_identity()
+    schedule = RecurringTransaction.query.filter_by(id=id, user_id=current_user_id).first()
+    
+    if not schedule:
+        return jsonify({'message': 'Recurring transaction not found'}), 404
+    
+    # Transactions already created stay, no longer linked to the schedule
+    db.session.execute(update(Transaction).where(Transaction.recurring_id == id).values(recurring_id=None))
+    db.session.delete(schedule)
+    db.session.commit()
+    invalidate_cached_responses(current_user_id)
+    
+    return jsonify({'message': 'Recurring transaction deleted successfully'}), 200
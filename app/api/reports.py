@@ -0,0 +1,92 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required, get_jwt_identity
+from sqlalchemy import select
+from app.models.category import Category
+from app.models.user import User
+from app.utils.money import from_cents, parse_currency
+from app.utils.reports import report_period, spending_memo
+from app.utils.cache import cached_response
+from app.database import use_replica
+from app import db
+
+reports_bp = Blueprint('reports', __name__)
+
+def _change(current, previous):
+    return {
+        'change': from_cents(current - previous),
+        'change_pct': round((current - previous) / previous * 100, 1) if previous else None
+    }
+
+def spending_report(user_id, args):
+    """Per-category expenses of a period next to those of the period before it.
+
+    Raises ValueError with a message for the client on a bad argument.
+    """
+    (start, end), (previous_start, previous_end) = report_period(args.get('period', 'this_month'))
+    user = db.session.get(User, user_id)
+    currency = parse_currency(args.get('currency'), user.reporting_currency)
+    
+    current, missing_rates = spending_memo.totals(user_id, start, end, currency)
+    previous, previous_missing_rates = spending_memo.totals(user_id, previous_start, previous_end, currency)
+    names = dict(db.session.execute(
+        select(Category.id, Category.name).where(Category.user_id == user_id)
+    ).all())
+    
+    # Largest spend first; categories only spent on in the previous period are listed too
+    category_ids = sorted(current.keys() | previous.keys(), key=lambda id: (-current.get(id, 0), id))
+    total, previous_total = sum(current.values()), sum(previous.values())
+    
+    return {
+        'period': args.get('period', 'this_month'),
+        'start_date': start.isoformat(),
+        'end_date': end.isoformat(),
+        'previous_start_date': previous_start.isoformat(),
+        'previous_end_date': previous_end.isoformat(),
+        'currency': currency,
+        'missing_rates': sorted(set(missing_rates) | set(previous_missing_rates)),
+        'total': from_cents(total),
+        'previous_total': from_cents(previous_total),
+        **_change(total, previous_total),
+        'categories': [{
+            'category_id': category_id,
+            'category_name': names.get(category_id),
+            'total': from_cents(current.get(category_id, 0)),
+            'previous_total': from_cents(previous.get(category_id, 0)),
+            **_change(current.get(category_id, 0), previous.get(category_id, 0))
+        } for category_id in category_ids]
+    }
+
+@reports_bp.route('/spending', methods=['GET'])
+@jwt_required()
+@cached_response
+@use_replica
+def get_spending_report():
+    current_user_id = get_jwt_identity()
+    
+    try:
+        report = spending_report(current_user_id, request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    return jsonify({'report': report}), 200
+
+@reports_bp.route('/cashflow', methods=['GET'])
+@jwt_required()
+@cached_response
+@use_replica
+def get_cashflow_report():
+    # NumPy is only imported once the first cash flow report is asked for
+    from app.utils.cashflow import cashflow_params, cashflow_report
+    
+    current_user_id = get_jwt_identity()
+    
+    try:
+        start_date, end_date, group_by = cashflow_params(request.args)
+        user = db.session.get(User, current_user_id)
+        currency = parse_currency(request.args.get('currency'), user.reporting_currency)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    report = cashflow_report(current_user_id, start_date, end_date, group_by, currency)
+    
+    return jsonify({'cashflow': report}), 200
@@ -1,50 +1,167 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
+from sqlalchemy import and_, or_, select
 from app.models.transaction import Transaction
 from app.models.category import Category
+from app.models.user import User
+from app.utils.bulk import TransactionBulkInserter, iter_ndjson
+from app.utils.exporters import (
+    EXPORT_FORMATS, EXPORT_MIMETYPES, EXPORT_WRITERS, iter_export_batches, parquet_available
+)
+from app.utils.importers import (
+    DEFAULT_CSV_COLUMNS, IMPORT_FORMATS, CategoryResolver, StatementImporter, iter_csv, iter_ofx
+)
+from app.utils.money import parse_currency, to_cents
+from app.utils.helpers import SUMMARY_GROUPINGS, get_income_expense_summary
+from app.utils.pagination import decode_cursor, encode_cursor, get_page_size
+from app.utils.rollups import rollup_entry, update_daily_totals
+from app.utils.serializers import TRANSACTION_SERIALIZER, json_response
+from app.utils.cache import cached_response, invalidate_cached_responses
+from app.utils.anomalies import anomaly_detector
+from app.database import use_replica
 from app import db
 
 transactions_bp = Blueprint('transactions', __name__)
 
-@transactions_bp.route('', methods=['GET'])
-@jwt_required()
-def get_transactions():
-    current_user_id = get_jwt_identity()
-    
+def transaction_filters(user_id, args):
+    """WHERE clauses for the transaction filters in args.
+
+    Raises ValueError with a message for the client when a filter value
+    can't be parsed.
+    """
     # Get query parameters for filtering
-    category_id = request.args.get('category_id', type=int)
-    transaction_type = request.args.get('type')
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
+    category_id = args.get('category_id', type=int)
+    transaction_type = args.get('type')
+    start_date = args.get('start_date')
+    end_date = args.get('end_date')
     
-    # Base query
-    query = Transaction.query.filter_by(user_id=current_user_id)
+    filters = [Transaction.user_id == user_id]
     
     # Apply filters if provided
     if category_id:
-        query = query.filter_by(category_id=category_id)
+        filters.append(Transaction.category_id == category_id)
     if transaction_type:
-        query = query.filter_by(type=transaction_type)
+        filters.append(Transaction.type == transaction_type)
     if start_date:
         try:
-            start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-            query = query.filter(Transaction.date >= start_date)
+            filters.append(Transaction.date >= datetime.strptime(start_date, '%Y-%m-%d').date())
         except ValueError:
-            return jsonify({'message': 'Invalid start_date format. Use YYYY-MM-DD'}), 400
+            raise ValueError('Invalid start_date format. Use YYYY-MM-DD')
     if end_date:
         try:
-            end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-            query = query.filter(Transaction.date <= end_date)
+            filters.append(Transaction.date <= datetime.strptime(end_date, '%Y-%m-%d').date())
         except ValueError:
-            return jsonify({'message': 'Invalid end_date format. Use YYYY-MM-DD'}), 400
+            raise ValueError('Invalid end_date format. Use YYYY-MM-DD')
     
-    # Order by date (newest first)
-    transactions = query.order_by(Transaction.date.desc()).all()
+    return filters
+
+def _filtered_transactions_query(user_id):
+    """Build the transaction query for the filters in the request args.
+
+    Returns a (query, error_response) pair; error_response is set when a
+    filter value can't be parsed.
+    """
+    try:
+        filters = transaction_filters(user_id, request.args)
+    except ValueError as e:
+        return None, (jsonify({'message': str(e)}), 400)
     
-    return jsonify({
-        'transactions': [transaction.to_dict() for transaction in transactions]
-    }), 200
+    return Transaction.query.filter(*filters), None
+
+def transaction_list_statement(user_id, args):
+    """SELECT of the serialized transaction columns for the filters and cursor in args.
+
+    Raises ValueError with a message for the client on a bad filter or cursor.
+    """
+    filters = transaction_filters(user_id, args)
+    
+    # Resume after the last row of the previous page
+    cursor = args.get('cursor')
+    if cursor:
+        cursor_date, cursor_id = decode_cursor(cursor)
+        filters.append(or_(
+            Transaction.date < cursor_date,
+            and_(Transaction.date == cursor_date, Transaction.id < cursor_id)
+        ))
+    
+    # Order by date (newest first), with id as a tie-breaker so the keyset is unique;
+    # only the serialized columns are selected, so no ORM objects are built
+    return select(*TRANSACTION_SERIALIZER.columns).join(
+        Category, Transaction.category_id == Category.id
+    ).where(*filters).order_by(
+        Transaction.date.desc(), Transaction.id.desc()
+    )
+
+def transaction_page_size(args, config):
+    return get_page_size(
+        args.get('limit', type=int),
+        config['TRANSACTIONS_PAGE_SIZE'],
+        config['TRANSACTIONS_MAX_PAGE_SIZE']
+    )
+
+def transaction_page(rows, page_size):
+    """Split the page_size + 1 rows fetched for a page into (rows, next_cursor)"""
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    return rows, encode_cursor(rows[-1].date, rows[-1].id)
+
+@transactions_bp.route('', methods=['GET'])
+@jwt_required()
+@cached_response
+@use_replica
+def get_transactions():
+    current_user_id = get_jwt_identity()
+    
+    try:
+        statement = transaction_list_statement(current_user_id, request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    serialize = TRANSACTION_SERIALIZER.serialize
+    
+    if request.args.get('format') == 'ndjson':
+        batch_size = current_app.config['TRANSACTIONS_STREAM_BATCH_SIZE']
+        
+        def generate():
+            rows = db.session.execute(statement.execution_options(yield_per=batch_size))
+            for partition in rows.partitions():
+                yield ''.join([serialize(row) + '\n' for row in partition])
+        
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+    
+    # Fetch one extra row to find out whether there is a next page
+    page_size = transaction_page_size(request.args, current_app.config)
+    transactions, next_cursor = transaction_page(db.session.execute(statement.limit(page_size + 1)).all(), page_size)
+    
+    return json_response(
+        'transactions', TRANSACTION_SERIALIZER.serialize_many(transactions), next_cursor=next_cursor
+    )
+
+@transactions_bp.route('/export', methods=['GET'])
+@jwt_required()
+def export_transactions():
+    current_user_id = get_jwt_identity()
+    
+    export_format = request.args.get('format', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'message': f'format must be one of: {", ".join(EXPORT_FORMATS)}'}), 400
+    if export_format == 'parquet' and not parquet_available():
+        return jsonify({'message': 'Parquet export requires the pyarrow package'}), 400
+    
+    query, error = _filtered_transactions_query(current_user_id)
+    if error:
+        return error
+    
+    # Rows are written out as they come off the database cursor
+    batches = iter_export_batches(query, current_app.config['TRANSACTIONS_STREAM_BATCH_SIZE'])
+    body = EXPORT_WRITERS[export_format](batches)
+    
+    return Response(
+        stream_with_context(body),
+        mimetype=EXPORT_MIMETYPES[export_format],
+        headers={'Content-Disposition': f'attachment; filename=transactions.{export_format}'}
+    )
 
 @transactions_bp.route('/<int:id>', methods=['GET'])
 @jwt_required()
@@ -76,6 +193,13 @@ def create_transaction():
     if not category:
         return jsonify({'message': 'Category not found'}), 404
     
+    # Parse amount and currency
+    try:
+        amount_cents = to_cents(data['amount'])
+        currency = parse_currency(data.get('currency'), current_app.config['DEFAULT_CURRENCY'])
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
     # Parse date if provided
     transaction_date = datetime.utcnow().date()
     if data.get('date'):
@@ -86,7 +210,8 @@ def create_transaction():
     
     # Create new transaction
     transaction = Transaction(
-        amount=float(data['amount']),
+        amount_cents=amount_cents,
+        currency=currency,
         description=data.get('description', ''),
         date=transaction_date,
         type=data['type'],
@@ -94,14 +219,120 @@ def create_transaction():
         user_id=current_user_id
     )
     
+    # Scored against the category's recent expenses, before the new row is added
+    anomaly = anomaly_detector.check(transaction)
+    
     db.session.add(transaction)
+    update_daily_totals(added=[rollup_entry(transaction)])
     db.session.commit()
+    invalidate_cached_responses(current_user_id)
     
-    return jsonify({
+    response = {
         'message': 'Transaction created successfully',
         'transaction': transaction.to_dict()
+    }
+    if anomaly:
+        anomaly_detector.announce(transaction, anomaly)
+        response['anomaly'] = anomaly
+    
+    return jsonify(response), 201
+
+@transactions_bp.route('/bulk', methods=['POST'])
+@jwt_required()
+def create_transactions_bulk():
+    current_user_id = get_jwt_identity()
+    
+    # Accept a JSON array, or NDJSON streamed one line at a time
+    if request.mimetype == 'application/x-ndjson':
+        items = iter_ndjson(request.stream)
+    else:
+        items = request.get_json(silent=True)
+        if isinstance(items, dict):
+            items = items.get('transactions')
+        if not isinstance(items, list):
+            return jsonify({'message': 'Expected a JSON array of transactions or NDJSON'}), 400
+    
+    inserter = TransactionBulkInserter(
+        current_user_id, current_app.config['TRANSACTIONS_BULK_CHUNK_SIZE'], current_app.config['DEFAULT_CURRENCY']
+    )
+    count = 0
+    for index, data in enumerate(items):
+        inserter.add(index, data)
+        count += 1
+    inserter.flush()
+    
+    if not count:
+        return jsonify({'message': 'No transactions provided'}), 400
+    
+    errors = sorted(inserter.errors, key=lambda error: error['index'])
+    if not inserter.created:
+        db.session.rollback()
+        return jsonify({'message': 'No transactions were created', 'created': 0, 'errors': errors}), 400
+    
+    db.session.commit()
+    invalidate_cached_responses(current_user_id)
+    
+    return jsonify({
+        'message': 'Transactions created successfully',
+        'created': inserter.created,
+        'errors': errors
     }), 201
 
+@transactions_bp.route('/import', methods=['POST'])
+@jwt_required()
+def import_transactions():
+    current_user_id = get_jwt_identity()
+    
+    upload = request.files.get('file')
+    if not upload:
+        return jsonify({'message': 'Missing statement file'}), 400
+    
+    # Work out the format from the form or the file extension
+    import_format = (request.form.get('format') or upload.filename.rsplit('.', 1)[-1]).lower()
+    if import_format == 'qfx':
+        import_format = 'ofx'
+    if import_format not in IMPORT_FORMATS:
+        return jsonify({'message': f'format must be one of: {", ".join(IMPORT_FORMATS)}'}), 400
+    
+    if import_format == 'csv':
+        columns = {
+            field: request.form[f'{field}_column']
+            for field in DEFAULT_CSV_COLUMNS
+            if request.form.get(f'{field}_column')
+        }
+        try:
+            records = iter_csv(upload.stream, columns, request.form.get('date_format', '%Y-%m-%d'))
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
+    else:
+        records = iter_ofx(upload.stream)
+    
+    categories = CategoryResolver(
+        current_user_id,
+        default_category_id=request.form.get('default_category_id', type=int),
+        create_missing=request.form.get('create_categories', 'false').lower() == 'true'
+    )
+    try:
+        currency = parse_currency(request.form.get('currency'), current_app.config['DEFAULT_CURRENCY'])
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    importer = StatementImporter(
+        current_user_id, categories, current_app.config['TRANSACTIONS_BULK_CHUNK_SIZE'], currency=currency
+    )
+    for index, record in enumerate(records):
+        importer.add(index, record)
+    importer.flush()
+    
+    db.session.commit()
+    invalidate_cached_responses(current_user_id)
+    
+    return jsonify({
+        'message': 'Statement imported',
+        'imported': importer.imported,
+        'duplicates': importer.duplicates,
+        'errors': importer.errors
+    }), 201 if importer.imported else 200
+
 @transactions_bp.route('/<int:id>', methods=['PUT'])
 @jwt_required()
 def update_transaction(id):
@@ -112,10 +343,16 @@ def update_transaction(id):
         return jsonify({'message': 'Transaction not found'}), 404
     
     data = request.get_json()
+    before = rollup_entry(transaction)
     
     # Update fields
-    if data.get('amount'):
-        transaction.amount = float(data['amount'])
+    try:
+        if data.get('amount'):
+            transaction.amount_cents = to_cents(data['amount'])
+        if data.get('currency'):
+            transaction.currency = parse_currency(data['currency'])
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     if data.get('description') is not None:
         transaction.description = data['description']
     if data.get('date'):
@@ -133,12 +370,25 @@ def update_transaction(id):
             return jsonify({'message': 'Category not found'}), 404
         transaction.category_id = data['category_id']
     
+    # Scored again when the amount, or what it is compared with, changed
+    after = rollup_entry(transaction)
+    rescore = (after.amount_cents, after.type, after.category_id, after.currency) != \
+        (before.amount_cents, before.type, before.category_id, before.currency)
+    anomaly = anomaly_detector.check(transaction) if rescore else None
+    
+    update_daily_totals(added=[after], removed=[before])
     db.session.commit()
+    invalidate_cached_responses(current_user_id)
     
-    return jsonify({
+    response = {
         'message': 'Transaction updated successfully',
         'transaction': transaction.to_dict()
-    }), 200
+    }
+    if anomaly:
+        anomaly_detector.announce(transaction, anomaly)
+        response['anomaly'] = anomaly
+    
+    return jsonify(response), 200
 
 @transactions_bp.route('/<int:id>', methods=['DELETE'])
 @jwt_required()
@@ -150,60 +400,56 @@ def delete_transaction(id):
         return jsonify({'message': 'Transaction not found'}), 404
     
     db.session.delete(transaction)
+    update_daily_totals(removed=[rollup_entry(transaction)])
     db.session.commit()
+    invalidate_cached_responses(current_user_id)
     
     return jsonify({'message': 'Transaction deleted successfully'}), 200
 
-@transactions_bp.route('/summary', methods=['GET'])
-@jwt_required()
-def get_transaction_summary():
-    current_user_id = get_jwt_identity()
-    
-    # Get query parameters
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
+def summary_params(args):
+    """(start_date, end_date, group_by) of a summary request.
+
+    Raises ValueError with a message for the client on a bad value.
+    """
+    start_date = args.get('start_date')
+    end_date = args.get('end_date')
+    group_by = args.get('group_by')
     
-    # Base query
-    query = Transaction.query.filter_by(user_id=current_user_id)
+    if group_by and group_by not in SUMMARY_GROUPINGS:
+        raise ValueError(f'group_by must be one of: {", ".join(SUMMARY_GROUPINGS)}')
     
-    # Apply date filters if provided
+    # Parse date filters if provided
     if start_date:
         try:
             start_date = datetime.strptime(start_date, '%Y-%m-%d').date()
-            query = query.filter(Transaction.date >= start_date)
         except ValueError:
-            return jsonify({'message': 'Invalid start_date format. Use YYYY-MM-DD'}), 400
+            raise ValueError('Invalid start_date format. Use YYYY-MM-DD')
     if end_date:
         try:
             end_date = datetime.strptime(end_date, '%Y-%m-%d').date()
-            query = query.filter(Transaction.date <= end_date)
         except ValueError:
-            return jsonify({'message': 'Invalid end_date format. Use YYYY-MM-DD'}), 400
-    
-    # Get all transactions within the filter
-    transactions = query.all()
-    
-    # Calculate summary
-    total_income = sum(t.amount for t in transactions if t.type == 'income')
-    total_expense = sum(t.amount for t in transactions if t.type == 'expense')
-    net = total_income - total_expense
-    
-    # Group by category
-    category_summary = {}
-    for t in transactions:
-        category_name = t.category.name
-        if category_name not in category_summary:
-            category_summary[category_name] = {
-                'income': 0,
-                'expense': 0
-            }
-        category_summary[category_name][t.type] += t.amount
+            raise ValueError('Invalid end_date format. Use YYYY-MM-DD')
     
-    return jsonify({
-        'summary': {
-            'total_income': total_income,
-            'total_expense': total_expense,
-            'net': net,
-            'by_category': category_summary
-        }
-    }), 200
\ No newline at end of file
+    return start_date, end_date, group_by
+
+def transaction_summary(session, user_id, args):
+    """Summary for the query args, in the requested currency or the user's reporting currency"""
+    start_date, end_date, group_by = summary_params(args)
+    user = session.get(User, user_id)
+    currency = parse_currency(args.get('currency'), user.reporting_currency)
+    
+    return get_income_expense_summary(user_id, start_date, end_date, group_by, currency, session=session)
+
+@transactions_bp.route('/summary', methods=['GET'])
+@jwt_required()
+@cached_response
+@use_replica
+def get_transaction_summary():
+    current_user_id = get_jwt_identity()
+    
+    try:
+        summary = transaction_summary(db.session, current_user_id, request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    
+    return jsonify({'summary': summary}), 200
\ No newline at end of file
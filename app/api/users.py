@@ -1,6 +1,9 @@
 from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity, current_user
 from app.models.user import User
+from app.utils.auth import token_claims, user_cache
+from app.utils.cache import invalidate_cached_responses
+from app.utils.money import parse_currency
 from app import db
 
 users_bp = Blueprint('users', __name__)
@@ -8,19 +11,21 @@ users_bp = Blueprint('users', __name__)
 @users_bp.route('/me', methods=['GET'])
 @jwt_required()
 def get_my_profile():
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    
-    if not user:
-        return jsonify({'message': 'User not found'}), 404
-    
-    return jsonify({'user': user.to_dict()}), 200
+    # current_user comes from the token checks' in-process cache
+    return jsonify({'user': current_user.profile}), 200
+
+def _new_tokens(user):
+    """Fresh tokens for a user whose earlier tokens were just revoked"""
+    return {
+        'access_token': create_access_token(identity=user.id, additional_claims=token_claims(user)),
+        'refresh_token': create_refresh_token(identity=user.id, additional_claims=token_claims(user))
+    }
 
 @users_bp.route('/me', methods=['PUT'])
 @jwt_required()
 def update_my_profile():
     current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
+    user = db.session.get(User, current_user_id)
     
     if not user:
         return jsonify({'message': 'User not found'}), 404
@@ -39,22 +44,36 @@ def update_my_profile():
             return jsonify({'message': 'Email already exists'}), 409
         user.email = data['email']
     
-    # Update password if provided
+    # Update password if provided; this revokes the tokens issued so far
     if data.get('password'):
         user.set_password(data['password'])
+        user.revoke_tokens()
+    
+    # Reports are converted to the reporting currency
+    if data.get('reporting_currency'):
+        try:
+            user.reporting_currency = parse_currency(data['reporting_currency'])
+        except ValueError as e:
+            return jsonify({'message': str(e)}), 400
     
     db.session.commit()
+    user_cache.forget(current_user_id)
+    invalidate_cached_responses(current_user_id)
     
-    return jsonify({
+    response = {
         'message': 'Profile updated successfully',
         'user': user.to_dict()
-    }), 200
+    }
+    if data.get('password'):
+        response.update(_new_tokens(user))
+    
+    return jsonify(response), 200
 
 @users_bp.route('/me/change-password', methods=['POST'])
 @jwt_required()
 def change_password():
     current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
+    user = db.session.get(User, current_user_id)
     
     if not user:
         return jsonify({'message': 'User not found'}), 404
@@ -69,8 +88,10 @@ def change_password():
     if not user.check_password(data['current_password']):
         return jsonify({'message': 'Current password is incorrect'}), 401
     
-    # Set new password
+    # Set new password and revoke every token issued with the old one
     user.set_password(data['new_password'])
+    user.revoke_tokens()
     db.session.commit()
+    user_cache.forget(current_user_id)
     
-    return jsonify({'message': 'Password changed successfully'}), 200
\ No newline at end of file
+    return jsonify({'message': 'Password changed successfully', **_new_tokens(user)}), 200
\ No newline at end of file
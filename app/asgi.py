@@ -0,0 +1,194 @@
+"""ASGI entry point: the hot read endpoints as async handlers, everything else through Flask.
+
+The transaction list and summary, the budget list and the category list
+run as Starlette handlers over SQLAlchemy's asyncio engine (aiosqlite or
+asyncpg), so a request waiting on the database holds no thread. All other
+routes are served by the regular Flask app through a WSGI adapter.
+
+Needs the optional async dependencies:
+pip install starlette a2wsgi uvicorn "sqlalchemy[asyncio]" aiosqlite (or asyncpg)
+"""
+import json
+import math
+import jwt as pyjwt
+from contextlib import asynccontextmanager
+from a2wsgi import WSGIMiddleware
+from flask_jwt_extended import decode_token
+from sqlalchemy import select
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from werkzeug.datastructures import MultiDict
+from app import create_app, db
+from app.api.budgets import budget_list_statement
+from app.api.transactions import (
+    transaction_list_statement, transaction_page, transaction_page_size, transaction_summary
+)
+from app.config import Config
+from app.database import apply_sqlite_pragmas, engine_options
+from app.models.category import Category
+from app.models.user import User
+from app.utils.auth import user_cache
+from app.utils.ratelimit import RateLimitExceeded, rate_limiter
+from app.utils.serializers import BUDGET_SERIALIZER, CATEGORY_SERIALIZER, TRANSACTION_SERIALIZER, json_envelope
+
+ASYNC_DRIVERS = {
+    'sqlite': 'sqlite+aiosqlite',
+    'postgresql': 'postgresql+asyncpg'
+}
+
+class AuthError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def async_database_url(url):
+    """The asyncio driver URL for a sync database URL"""
+    url = make_url(url)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f'No asyncio driver for {backend} databases')
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+async def authenticate(request, session, endpoint):
+    """User id of the request's access token; mirrors the responses of @jwt_required()
+    and applies endpoint's rate limit as the Flask app would"""
+    with request.app.state.flask_app.app_context():
+        # Like the before_request hook, IP limits apply before the token is looked at
+        rate_limiter.hit(endpoint, 'ip', request.client.host if request.client else None)
+
+        header = request.headers.get('Authorization')
+        if not header:
+            raise AuthError(401, 'Missing Authorization Header')
+        parts = header.split()
+        if len(parts) != 2 or parts[0] != 'Bearer':
+            raise AuthError(422, "Bad Authorization header. Expected 'Authorization: Bearer <JWT>'")
+
+        try:
+            claims = decode_token(parts[1])
+        except pyjwt.ExpiredSignatureError:
+            raise AuthError(401, 'Token has expired')
+        except pyjwt.InvalidTokenError as e:
+            raise AuthError(422, str(e))
+        if claims.get('type') != 'access':
+            raise AuthError(422, 'Only non-refresh tokens are allowed')
+
+        # Same revocation check as token_is_revoked, with the lookup on a miss done asynchronously
+        entry = user_cache.peek(claims['sub'])
+        if entry is None:
+            entry = user_cache.put(claims['sub'], await session.get(User, claims['sub']))
+        rate_limiter.hit(endpoint, 'user', claims['sub'])
+    user = entry[0]
+    if user is None or claims.get('ver', 0) != user.token_version:
+        raise AuthError(401, 'Token has been revoked')
+    return claims['sub']
+
+def _json(body, status=200):
+    return Response(body, status_code=status, media_type='application/json')
+
+def _message(status, message, key='message'):
+    return JSONResponse({key: message}, status_code=status)
+
+def async_view(endpoint_name):
+    """Authenticate the request and open an AsyncSession for handler(request, session, user_id, args);
+    endpoint_name is the Flask endpoint the handler stands in for, whose rate limit it shares"""
+    def decorator(handler):
+        async def endpoint(request):
+            args = MultiDict(request.query_params.multi_items())
+            async with request.app.state.sessionmaker() as session:
+                try:
+                    user_id = await authenticate(request, session, endpoint_name)
+                except AuthError as e:
+                    return _message(e.status, e.message, key='msg')
+                except RateLimitExceeded as e:
+                    response = _message(429, 'Too many requests')
+                    response.headers['Retry-After'] = str(math.ceil(e.retry_after))
+                    return response
+                try:
+                    return await handler(request, session, user_id, args)
+                except ValueError as e:
+                    return _message(400, str(e))
+
+        return endpoint
+
+    return decorator
+
+@async_view('transactions.get_transactions')
+async def get_transactions(request, session, user_id, args):
+    statement = transaction_list_statement(user_id, args)
+    serialize = TRANSACTION_SERIALIZER.serialize
+    config = request.app.state.flask_app.config
+
+    if args.get('format') == 'ndjson':
+        batch_size = config['TRANSACTIONS_STREAM_BATCH_SIZE']
+
+        # The stream outlives the handler's session, so it opens its own
+        async def generate():
+            async with request.app.state.sessionmaker() as stream_session:
+                rows = await stream_session.stream(statement.execution_options(yield_per=batch_size))
+                async for partition in rows.partitions():
+                    yield ''.join([serialize(row) + '\n' for row in partition])
+
+        return StreamingResponse(generate(), media_type='application/x-ndjson')
+
+    # Fetch one extra row to find out whether there is a next page
+    page_size = transaction_page_size(args, config)
+    result = await session.execute(statement.limit(page_size + 1))
+    transactions, next_cursor = transaction_page(result.all(), page_size)
+
+    return _json(json_envelope(
+        'transactions', TRANSACTION_SERIALIZER.serialize_many(transactions), next_cursor=next_cursor
+    ))
+
+@async_view('transactions.get_transaction_summary')
+async def get_transaction_summary(request, session, user_id, args):
+    # The summary helpers are sync code; run_sync drives them over the async connection
+    summary = await session.run_sync(transaction_summary, user_id, args)
+    return _json(json.dumps({'summary': summary}, sort_keys=True, separators=(',', ':')))
+
+@async_view('budgets.get_budgets')
+async def get_budgets(request, session, user_id, args):
+    result = await session.execute(budget_list_statement(user_id, args))
+    return _json(json_envelope('budgets', BUDGET_SERIALIZER.serialize_many(result.all())))
+
+@async_view('categories.get_categories')
+async def get_categories(request, session, user_id, args):
+    result = await session.execute(
+        select(*CATEGORY_SERIALIZER.columns).where(Category.user_id == user_id).order_by(Category.id)
+    )
+    return _json(json_envelope('categories', CATEGORY_SERIALIZER.serialize_many(result)))
+
+def create_asgi_app(config_class=Config):
+    """Starlette app serving the async handlers, with the Flask app of config_class behind them"""
+    flask_app = create_app(config_class)
+    with flask_app.app_context():
+        # Flask-SQLAlchemy has already resolved relative SQLite paths
+        url = async_database_url(db.engine.url)
+    engine = create_async_engine(url, **engine_options(flask_app.config, url))
+    if url.get_backend_name() == 'sqlite':
+        apply_sqlite_pragmas(engine.sync_engine, flask_app.config)
+
+    @asynccontextmanager
+    async def lifespan(app):
+        yield
+        await engine.dispose()
+
+    app = Starlette(
+        routes=[
+            Route('/api/transactions', get_transactions, methods=['GET']),
+            Route('/api/transactions/summary', get_transaction_summary, methods=['GET']),
+            Route('/api/budgets', get_budgets, methods=['GET']),
+            Route('/api/categories', get_categories, methods=['GET']),
+            Mount('/', app=WSGIMiddleware(flask_app))
+        ],
+        middleware=[Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'], allow_headers=['*'])],
+        lifespan=lifespan
+    )
+    app.state.flask_app = flask_app
+    app.state.sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+    return app
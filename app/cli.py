@@ -0,0 +1,56 @@
+import click
+from flask import current_app
+from flask.cli import AppGroup
+from app.utils.cache import invalidate_all_cached_responses
+from app.utils.fx import load_rates
+from app.utils.recurring import materialize_due
+from app.utils.rollups import check_daily_totals, rebuild_daily_totals
+from app.signals import rates_changed
+
+rollups_cli = AppGroup('rollups', help='Maintain the daily_category_totals rollup table.')
+
+@rollups_cli.command('rebuild')
+@click.option('--user-id', type=int, help='Only rebuild this user\'s totals.')
+def rebuild_rollups(user_id):
+    """Recompute daily_category_totals from the transactions table."""
+    rebuild_daily_totals(user_id)
+    click.echo('Daily category totals rebuilt.')
+
+@rollups_cli.command('check')
+@click.option('--user-id', type=int, help='Only check this user\'s totals.')
+def check_rollups(user_id):
+    """Report rows where daily_category_totals disagrees with the transactions."""
+    mismatches = check_daily_totals(user_id)
+    for mismatch in mismatches:
+        click.echo(f'{mismatch["key"]}: expected {mismatch["expected"]}, found {mismatch["actual"]}')
+    if mismatches:
+        raise click.ClickException(f'{len(mismatches)} inconsistent daily totals')
+    click.echo('Daily category totals are consistent.')
+
+fx_cli = AppGroup('fx', help='Manage the fx_rates exchange-rate table.')
+
+@fx_cli.command('load')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+def load_fx_rates(path):
+    """Load exchange rates from a CSV file with date, base, quote and rate columns."""
+    with open(path, 'rb') as stream:
+        try:
+            count = load_rates(stream)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+    invalidate_all_cached_responses()
+    rates_changed.send(current_app._get_current_object())
+    click.echo(f'Loaded {count} exchange rates.')
+
+recurring_cli = AppGroup('recurring', help='Generate transactions from recurring schedules.')
+
+@recurring_cli.command('materialize')
+@click.option('--date', 'until', type=click.DateTime(formats=['%Y-%m-%d']),
+              help='Materialize occurrences due on or before this day (default: today, UTC).')
+@click.option('--chunk-size', type=click.IntRange(min=1), help='Schedules per batch (default: RECURRING_CHUNK_SIZE).')
+def materialize_recurring(until, chunk_size):
+    """Insert the due occurrences of every user's recurring schedules; safe to run again."""
+    schedules, created = materialize_due(until.date() if until else None, chunk_size)
+    if created:
+        invalidate_all_cached_responses()
+    click.echo(f'Materialized {created} transactions from {schedules} recurring schedules.')
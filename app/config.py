@@ -1,3 +1,4 @@
+import json
 import os
 from datetime import timedelta
 from dotenv import load_dotenv
@@ -11,4 +12,156 @@ class Config:
     # JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'jwt-secret-key-change-this')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
     JWT_REFRESH_TOKEN_EXPIRES = timedelta(days=30)
-    JWT_TOKEN_LOCATION = ['headers']
\ No newline at end of file
+    JWT_TOKEN_LOCATION = ['headers']
+
+    # Run db.create_all() at startup; turn off where `flask db upgrade` manages the schema
+    SCHEMA_AUTO_CREATE = os.environ.get('SCHEMA_AUTO_CREATE', 'true').lower() == 'true'
+    # Serve Swagger UI at /api/docs
+    SWAGGER_UI_ENABLED = os.environ.get('SWAGGER_UI_ENABLED', 'true').lower() == 'true'
+
+    # Connection pool for server databases (SQLite manages its own connections)
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 5))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', 'true').lower() == 'true'
+    # PostgreSQL statement_timeout in milliseconds, 0 to disable
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 0))
+
+    # Optional read replica for the report and list endpoints; users who wrote
+    # within the sticky window keep reading from the primary
+    DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+    REPLICA_STICKY_SECONDS = int(os.environ.get('REPLICA_STICKY_SECONDS', 5))
+
+    # Pragmas applied to every SQLite connection; WAL lets readers run alongside a writer
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+
+    # Transaction list pagination/streaming and bulk import
+    TRANSACTIONS_PAGE_SIZE = int(os.environ.get('TRANSACTIONS_PAGE_SIZE', 100))
+    TRANSACTIONS_MAX_PAGE_SIZE = int(os.environ.get('TRANSACTIONS_MAX_PAGE_SIZE', 1000))
+    TRANSACTIONS_STREAM_BATCH_SIZE = int(os.environ.get('TRANSACTIONS_STREAM_BATCH_SIZE', 1000))
+    TRANSACTIONS_BULK_CHUNK_SIZE = int(os.environ.get('TRANSACTIONS_BULK_CHUNK_SIZE', 1000))
+
+    # Currency of amounts sent without an explicit currency code
+    DEFAULT_CURRENCY = os.environ.get('DEFAULT_CURRENCY', 'USD')
+
+    # In-process cache of single exchange-rate lookups
+    FX_RATE_CACHE_SIZE = int(os.environ.get('FX_RATE_CACHE_SIZE', 4096))
+    FX_RATE_CACHE_TIMEOUT = int(os.environ.get('FX_RATE_CACHE_TIMEOUT', 3600))
+
+    # Password hashing: a werkzeug method ('scrypt:32768:8:1', 'pbkdf2:sha256:600000') or
+    # 'argon2:<time_cost>:<memory_cost KiB>:<parallelism>' (pip install argon2-cffi). Stored
+    # hashes made with other parameters are upgraded on the next successful login.
+    PASSWORD_HASH_METHOD = os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+    # Hashes computed at once per process, and how many more may wait before logins get a 503
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', 2))
+    PASSWORD_HASH_QUEUE = int(os.environ.get('PASSWORD_HASH_QUEUE', 32))
+
+    # Per-route request metrics at /api/metrics (Prometheus text format), per worker process
+    METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() == 'true'
+    # /api/metrics is only served when this is set, to requests with 'Authorization: Bearer <token>'
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    # Statements at least this slow are logged with their parameters
+    SLOW_QUERY_MS = int(os.environ.get('SLOW_QUERY_MS', 100))
+    # A request running the same statement more often than this is logged as a likely N+1 query
+    N_PLUS_ONE_THRESHOLD = int(os.environ.get('N_PLUS_ONE_THRESHOLD', 10))
+
+    # Token bucket rate limits: {endpoint or blueprint: 'ip|user:<count>/<second|minute|hour|day>'};
+    # RATELIMIT_RULES in the environment is a JSON object merged over these, null removing a rule
+    RATELIMIT_ENABLED = os.environ.get('RATELIMIT_ENABLED', 'true').lower() == 'true'
+    RATELIMIT_RULES = {
+        'auth.login': 'ip:10/minute',
+        'auth.register': 'ip:5/minute',
+        'auth.refresh': 'user:30/minute',
+        'transactions.get_transactions': 'user:120/minute',
+        'transactions.get_transaction_summary': 'user:120/minute',
+        'transactions.export_transactions': 'user:10/minute',
+        'budgets.get_budgets': 'user:120/minute',
+        'budgets.get_budget_forecast': 'user:60/minute',
+        'reports.get_spending_report': 'user:120/minute',
+        'reports.get_cashflow_report': 'user:60/minute',
+        'recurring.create_recurring_transaction': 'user:30/minute',
+        **json.loads(os.environ.get('RATELIMIT_RULES', '{}'))
+    }
+    # 'memory' keeps buckets per worker process; 'redis' shares them between workers
+    RATELIMIT_STORAGE = os.environ.get('RATELIMIT_STORAGE', 'memory')
+    RATELIMIT_REDIS_URL = os.environ.get('RATELIMIT_REDIS_URL', 'redis://localhost:6379/0')
+    RATELIMIT_MAX_KEYS = int(os.environ.get('RATELIMIT_MAX_KEYS', 100000))
+
+    # In-process cache of the user snapshots behind token revocation checks and current_user;
+    # a revocation made by another worker applies within USER_CACHE_TIMEOUT seconds
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+    USER_CACHE_TIMEOUT = int(os.environ.get('USER_CACHE_TIMEOUT', 60))
+
+    # Seconds the per-category spending of a closed period stays memoized (in the response cache backend);
+    # capped at CACHE_DEFAULT_TIMEOUT unless CACHE_BACKEND is redis, as other workers' writes cannot reach it
+    SPENDING_MEMO_TIMEOUT = int(os.environ.get('SPENDING_MEMO_TIMEOUT', 86400))
+
+    # Budget alert counters: seconds between reconciliations with the database (0 turns them off),
+    # and how many users' counters each worker keeps
+    BUDGET_ALERTS_RECONCILE_SECONDS = int(os.environ.get('BUDGET_ALERTS_RECONCILE_SECONDS', 300))
+    BUDGET_ALERTS_MAX_USERS = int(os.environ.get('BUDGET_ALERTS_MAX_USERS', 10000))
+
+    # Budget forecasts: days of history fitted, the weight of each new week (0-1), and seconds
+    # before a worker fits a category afresh (picking up writes made through other workers)
+    FORECAST_HISTORY_DAYS = int(os.environ.get('FORECAST_HISTORY_DAYS', 364))
+    FORECAST_SMOOTHING = float(os.environ.get('FORECAST_SMOOTHING', 0.2))
+    FORECAST_MODEL_TIMEOUT = int(os.environ.get('FORECAST_MODEL_TIMEOUT', 3600))
+
+    # Flag new expenses whose robust z-score over the category's last ANOMALY_WINDOW
+    # expenses exceeds ANOMALY_THRESHOLD
+    ANOMALY_DETECTION_ENABLED = os.environ.get('ANOMALY_DETECTION_ENABLED', 'true').lower() == 'true'
+    ANOMALY_WINDOW = int(os.environ.get('ANOMALY_WINDOW', 200))
+    ANOMALY_THRESHOLD = float(os.environ.get('ANOMALY_THRESHOLD', 3.5))
+
+    # Due recurring schedules read, and occurrences inserted, per statement by `flask recurring materialize`
+    RECURRING_CHUNK_SIZE = int(os.environ.get('RECURRING_CHUNK_SIZE', 1000))
+    # Oldest start date, in days before today, that POST /api/recurring accepts; its past occurrences
+    # are all created within the request (at most one a day per schedule)
+    RECURRING_MAX_BACKFILL_DAYS = int(os.environ.get('RECURRING_MAX_BACKFILL_DAYS', 366))
+
+    # Response cache for the read endpoints: 'memory', 'redis' or 'null'. 'memory' is per process and
+    # only sees the invalidations of its own writes, so it is the default only for a single worker
+    # (WEB_CONCURRENCY, as read by gunicorn and uvicorn, unset or 1); run several workers with 'redis'
+    CACHE_BACKEND = os.environ.get(
+        'CACHE_BACKEND', 'memory' if int(os.environ.get('WEB_CONCURRENCY', 1)) <= 1 else 'null'
+    )
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_DEFAULT_TIMEOUT = int(os.environ.get('CACHE_DEFAULT_TIMEOUT', 300))
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 4096))
+
+class PostgresConfig(Config):
+    """Production profile: PostgreSQL through psycopg 3 (pip install "psycopg[binary]")"""
+    SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL', 'postgresql+psycopg://localhost/finance_tracker')
+    SCHEMA_AUTO_CREATE = os.environ.get('SCHEMA_AUTO_CREATE', 'false').lower() == 'true'
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))
+    # Statements run this many times on a connection are prepared server-side
+    DB_PREPARE_THRESHOLD = int(os.environ.get('DB_PREPARE_THRESHOLD', 5))
+    # Production runs several workers, which only share a redis cache
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'null')
+
+class TestingConfig(Config):
+    """In-memory database without startup work; tests create the schema themselves"""
+    TESTING = True
+    SQLALCHEMY_DATABASE_URI = 'sqlite:///:memory:'
+    SCHEMA_AUTO_CREATE = False
+    SWAGGER_UI_ENABLED = False
+    CACHE_BACKEND = 'memory'
+    # Deliberately weak, so that register/login fixtures stay fast
+    PASSWORD_HASH_METHOD = 'pbkdf2:sha256:1000'
+    # Fixtures log in and register freely; rate limit tests turn this back on
+    RATELIMIT_ENABLED = False
+    # No background reconciliation; budget alert tests reconcile explicitly
+    BUDGET_ALERTS_RECONCILE_SECONDS = 0
+
+# Profiles selectable with the APP_CONFIG environment variable
+CONFIGS = {
+    'default': Config,
+    'postgres': PostgresConfig,
+    'testing': TestingConfig
+}
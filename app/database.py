@@ -0,0 +1,213 @@
+import os
+import threading
+import time
+from functools import wraps
+from flask import current_app, g, has_request_context
+from flask_jwt_extended import get_jwt_identity
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.sql import Select
+
+SQLITE_JOURNAL_MODES = ('DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF')
+SQLITE_SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+def engine_options(config, url=None):
+    """SQLALCHEMY_ENGINE_OPTIONS for the configured database (or url), built from the DB_* settings"""
+    url = make_url(url or config['SQLALCHEMY_DATABASE_URI'])
+    if url.get_backend_name() == 'sqlite':
+        # Flask-SQLAlchemy picks the pool for file/in-memory SQLite itself, and
+        # the pragmas (including busy_timeout) are set when a connection opens
+        return {}
+
+    options = {
+        'pool_size': config['DB_POOL_SIZE'],
+        'max_overflow': config['DB_MAX_OVERFLOW'],
+        'pool_timeout': config['DB_POOL_TIMEOUT'],
+        'pool_recycle': config['DB_POOL_RECYCLE'],
+        'pool_pre_ping': config['DB_POOL_PRE_PING']
+    }
+    connect_args = {}
+    if url.get_backend_name() == 'postgresql':
+        if config['DB_STATEMENT_TIMEOUT_MS'] and url.get_driver_name() == 'asyncpg':
+            connect_args['server_settings'] = {'statement_timeout': str(config['DB_STATEMENT_TIMEOUT_MS'])}
+        elif config['DB_STATEMENT_TIMEOUT_MS']:
+            connect_args['options'] = f'-c statement_timeout={config["DB_STATEMENT_TIMEOUT_MS"]}'
+        # psycopg 3 prepares statements server-side once they have run this often on a connection
+        if url.get_driver_name() == 'psycopg' and config.get('DB_PREPARE_THRESHOLD') is not None:
+            connect_args['prepare_threshold'] = config['DB_PREPARE_THRESHOLD']
+    if connect_args:
+        options['connect_args'] = connect_args
+    return options
+
+def sqlite_pragmas(config):
+    """PRAGMA statements run on every new SQLite connection"""
+    journal_mode = config['SQLITE_JOURNAL_MODE'].upper()
+    synchronous = config['SQLITE_SYNCHRONOUS'].upper()
+    if journal_mode not in SQLITE_JOURNAL_MODES:
+        raise ValueError(f'Unknown SQLITE_JOURNAL_MODE: {journal_mode}')
+    if synchronous not in SQLITE_SYNCHRONOUS_MODES:
+        raise ValueError(f'Unknown SQLITE_SYNCHRONOUS: {synchronous}')
+    return [
+        f'PRAGMA journal_mode={journal_mode}',
+        f'PRAGMA synchronous={synchronous}',
+        f'PRAGMA busy_timeout={int(config["SQLITE_BUSY_TIMEOUT_MS"])}',
+        f'PRAGMA mmap_size={int(config["SQLITE_MMAP_SIZE"])}'
+    ]
+
+class RoutingSession(Session):
+    """Session that sends the reads of @use_replica views to the read replica.
+
+    Flushes and any statement that is not a SELECT always go to the primary,
+    as does everything outside a view marked with @use_replica.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and isinstance(clause, Select)
+                and has_request_context() and g.get('use_replica')):
+            return get_replica_engine()
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+@event.listens_for(RoutingSession, 'after_flush')
+def _record_flush(session, flush_context):
+    session.info['wrote'] = True
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _record_write(orm_execute_state):
+    if not orm_execute_state.is_select:
+        orm_execute_state.session.info['wrote'] = True
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _pin_writer(session):
+    if session.info.pop('wrote', False) and has_request_context():
+        try:
+            user_id = get_jwt_identity()
+        except RuntimeError:
+            return
+        if user_id is not None:
+            pin_to_primary(user_id)
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_writes(session):
+    session.info.pop('wrote', None)
+
+class PinStore:
+    """In-process store of read-your-writes pins, with the get/set API of a cache backend.
+
+    Kept apart from the response cache so that cached responses can never
+    evict a pin: an entry only goes once it has expired. Expired entries are
+    purged at most once per TTL, so the store holds about the users who
+    wrote within the last REPLICA_STICKY_SECONDS.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._next_purge = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                return None
+            return entry[1]
+
+    def set(self, key, value, ttl):
+        now = time.monotonic()
+        with self._lock:
+            self._entries[key] = (now + ttl, value)
+            if now >= self._next_purge:
+                self._entries = {key: entry for key, entry in self._entries.items() if entry[0] >= now}
+                self._next_purge = now + ttl
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+def _stickiness_backend():
+    from app.utils.cache import RedisBackend, cache
+
+    # Workers share pins through Redis when the response cache uses it; there
+    # they are separate keys that expire on their own, not entries of an LRU
+    state = current_app.extensions['replica']
+    if state['backend'] is None:
+        backend = cache.backend
+        state['backend'] = backend if isinstance(backend, RedisBackend) else PinStore()
+    return state['backend']
+
+def pin_to_primary(user_id):
+    """Serve the user's reads from the primary for REPLICA_STICKY_SECONDS, so they see their own writes"""
+    seconds = current_app.config['REPLICA_STICKY_SECONDS']
+    if get_replica_engine() is not None and seconds > 0:
+        _stickiness_backend().set(f'primary:{user_id}', '1', seconds)
+
+def is_pinned_to_primary(user_id):
+    return _stickiness_backend().get(f'primary:{user_id}') is not None
+
+def use_replica(view):
+    """Run the reads of a JWT-protected GET view on the read replica, if one is configured.
+
+    Must be applied below @jwt_required(). Users who wrote within the last
+    REPLICA_STICKY_SECONDS keep reading from the primary.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if get_replica_engine() is not None and not is_pinned_to_primary(get_jwt_identity()):
+            g.use_replica = True
+        return view(*args, **kwargs)
+
+    return wrapper
+
+def replica_url(app):
+    """DATABASE_REPLICA_URL, with relative SQLite paths resolved against the instance folder like the primary's"""
+    url = make_url(app.config['DATABASE_REPLICA_URL'])
+    if url.get_backend_name() == 'sqlite' and url.database and url.database != ':memory:' \
+            and not os.path.isabs(url.database):
+        url = url.set(database=os.path.join(app.instance_path, url.database))
+    return url
+
+def get_replica_engine():
+    """Engine of the read replica, or None when DATABASE_REPLICA_URL is not set"""
+    state = current_app.extensions.get('replica')
+    return state['engine'] if state else None
+
+def apply_sqlite_pragmas(engine, config):
+    """Run the SQLITE_* pragmas on every new connection of engine"""
+    pragmas = sqlite_pragmas(config)
+
+    @event.listens_for(engine, 'connect')
+    def apply_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for pragma in pragmas:
+            cursor.execute(pragma)
+        cursor.close()
+
+def init_database(app, db):
+    """Initialise Flask-SQLAlchemy with engine options and SQLite pragmas taken from the config.
+
+    Options set explicitly in SQLALCHEMY_ENGINE_OPTIONS win over the ones
+    derived from the DB_* settings. DATABASE_REPLICA_URL, if set, adds an
+    engine for the reads of the views marked with @use_replica.
+    """
+    app.config.setdefault('DATABASE_REPLICA_URL', None)
+    app.config.setdefault('REPLICA_STICKY_SECONDS', 5)
+
+    options = engine_options(app.config)
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+
+    db.init_app(app)
+
+    with app.app_context():
+        engines = [db.engine]
+    # The replica gets its own engine rather than a Flask-SQLAlchemy bind: it
+    # holds the same tables as the primary, not a separate set of models
+    if app.config['DATABASE_REPLICA_URL']:
+        url = replica_url(app)
+        engine = create_engine(url, **engine_options(app.config, url))
+        app.extensions['replica'] = {'engine': engine, 'backend': None}
+        engines.append(engine)
+
+    for engine in engines:
+        if engine.dialect.name == 'sqlite':
+            apply_sqlite_pragmas(engine, app.config)
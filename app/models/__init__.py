@@ -3,4 +3,7 @@
 from .user import User
 from .category import Category
 from .transaction import Transaction
-from .budget import Budget
\ No newline at end of file
+from .budget import Budget
+from .daily_category_total import DailyCategoryTotal
+from .fx_rate import FxRate
+from .recurring_transaction import RecurringTransaction
\ No newline at end of file
@@ -1,11 +1,17 @@
 from datetime import datetime
 from app import db
+from app.utils.money import DEFAULT_CURRENCY, from_cents
 
 class Budget(db.Model):
     __tablename__ = 'budgets'
+    __table_args__ = (
+        # Active budget lookups: user + start/end date
+        db.Index('ix_budgets_user_dates', 'user_id', 'start_date', 'end_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    amount = db.Column(db.Float, nullable=False)
+    amount_cents = db.Column(db.BigInteger, nullable=False)
+    currency = db.Column(db.String(3), nullable=False, default=DEFAULT_CURRENCY, server_default=DEFAULT_CURRENCY)
     start_date = db.Column(db.Date, nullable=False)
     end_date = db.Column(db.Date, nullable=False)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -16,7 +22,8 @@ class Budget(db.Model):
     def to_dict(self):
         return {
             'id': self.id,
-            'amount': self.amount,
+            'amount': from_cents(self.amount_cents),
+            'currency': self.currency,
             'start_date': self.start_date.isoformat(),
             'end_date': self.end_date.isoformat(),
             'user_id': self.user_id,
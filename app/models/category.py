@@ -8,13 +8,14 @@ class Category(db.Model):
     name = db.Column(db.String(64), nullable=False)
     description = db.Column(db.String(256))
     color = db.Column(db.String(7), default="#000000")  # Hex color code
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Relationships
     transactions = db.relationship('Transaction', backref='category', lazy='dynamic')
     budgets = db.relationship('Budget', backref='category', lazy='dynamic')
+    recurring_transactions = db.relationship('RecurringTransaction', backref='category', lazy='dynamic')
     
     def to_dict(self):
         return {
@@ -0,0 +1,29 @@
+from app import db
+from app.utils.money import from_cents
+
+class DailyCategoryTotal(db.Model):
+    """Per-day, per-category, per-currency transaction totals maintained alongside the transactions table"""
+    __tablename__ = 'daily_category_totals'
+    __table_args__ = (
+        # Date-range reports across all categories
+        db.Index('ix_daily_category_totals_user_date', 'user_id', 'date'),
+    )
+    
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), primary_key=True)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), primary_key=True)
+    type = db.Column(db.String(10), primary_key=True)  # 'income' or 'expense'
+    date = db.Column(db.Date, primary_key=True)
+    currency = db.Column(db.String(3), primary_key=True)
+    amount_cents = db.Column(db.BigInteger, nullable=False, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    
+    def to_dict(self):
+        return {
+            'user_id': self.user_id,
+            'category_id': self.category_id,
+            'type': self.type,
+            'date': self.date.isoformat(),
+            'currency': self.currency,
+            'amount': from_cents(self.amount_cents),
+            'count': self.count
+        }
@@ -0,0 +1,18 @@
+from app import db
+
+class FxRate(db.Model):
+    """Exchange rate on a given day: 1 unit of base = rate units of quote"""
+    __tablename__ = 'fx_rates'
+    
+    base = db.Column(db.String(3), primary_key=True)
+    quote = db.Column(db.String(3), primary_key=True)
+    date = db.Column(db.Date, primary_key=True)
+    rate = db.Column(db.Float, nullable=False)
+    
+    def to_dict(self):
+        return {
+            'base': self.base,
+            'quote': self.quote,
+            'date': self.date.isoformat(),
+            'rate': self.rate
+        }
@@ -0,0 +1,51 @@
+from datetime import datetime
+from app import db
+from app.utils.money import DEFAULT_CURRENCY, from_cents
+
+class RecurringTransaction(db.Model):
+    """A transaction repeated on an RRULE-style cadence: every interval days/weeks/months/years
+    from start_date, until end_date or max_occurrences, whichever comes first"""
+    __tablename__ = 'recurring_transactions'
+    __table_args__ = (
+        # Materializer: schedules due on or before a day, in a stable order
+        db.Index('ix_recurring_transactions_next_date', 'next_date', 'id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    amount_cents = db.Column(db.BigInteger, nullable=False)
+    currency = db.Column(db.String(3), nullable=False, default=DEFAULT_CURRENCY, server_default=DEFAULT_CURRENCY)
+    description = db.Column(db.String(256))
+    type = db.Column(db.String(10), nullable=False)  # 'income' or 'expense'
+    frequency = db.Column(db.String(10), nullable=False)  # 'daily', 'weekly', 'monthly' or 'yearly'
+    interval = db.Column(db.Integer, nullable=False, default=1, server_default='1')
+    start_date = db.Column(db.Date, nullable=False)
+    end_date = db.Column(db.Date)
+    max_occurrences = db.Column(db.Integer)
+    # Occurrences materialized so far, and the date of the next one (NULL once the schedule has ended)
+    occurrences = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    next_date = db.Column(db.Date)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True, nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'amount': from_cents(self.amount_cents),
+            'currency': self.currency,
+            'description': self.description,
+            'type': self.type,
+            'frequency': self.frequency,
+            'interval': self.interval,
+            'start_date': self.start_date.isoformat(),
+            'end_date': self.end_date.isoformat() if self.end_date else None,
+            'max_occurrences': self.max_occurrences,
+            'occurrences': self.occurrences,
+            'next_date': self.next_date.isoformat() if self.next_date else None,
+            'user_id': self.user_id,
+            'category_id': self.category_id,
+            'category_name': self.category.name if self.category else None,
+            'created_at': self.created_at.isoformat(),
+            'updated_at': self.updated_at.isoformat()
+        }
@@ -1,11 +1,41 @@
+import hashlib
 from datetime import datetime
+from sqlalchemy import event
 from app import db
+from app.utils.money import DEFAULT_CURRENCY, format_cents, from_cents
+
+def dedup_hash(date, amount_cents, type, description):
+    """Fingerprint of a transaction as it appears on a bank statement.
+    
+    Imports use it to recognise rows that are already stored: the date, the
+    signed amount and the normalised description.
+    """
+    signed_cents = -amount_cents if type == 'expense' else amount_cents
+    key = f'{date.isoformat()}|{format_cents(signed_cents)}|{(description or "").strip().lower()}'
+    return hashlib.sha1(key.encode()).hexdigest()
+
+def _default_dedup_hash(context):
+    params = context.get_current_parameters()
+    if not params.get('date') or params.get('amount_cents') is None:
+        return None
+    return dedup_hash(params['date'], params['amount_cents'], params.get('type'), params.get('description'))
 
 class Transaction(db.Model):
     __tablename__ = 'transactions'
+    __table_args__ = (
+        # Transaction list and summary: user + date range, ordered by (date, id)
+        db.Index('ix_transactions_user_date', 'user_id', 'date', 'id'),
+        # Budget spend and spending summary: user + type + category + date range
+        db.Index('ix_transactions_user_type_category_date', 'user_id', 'type', 'category_id', 'date'),
+        # Import deduplication
+        db.Index('ix_transactions_user_dedup_hash', 'user_id', 'dedup_hash'),
+        # One transaction per schedule and day, so materializing again inserts nothing
+        db.Index('ix_transactions_recurring_date', 'recurring_id', 'date', unique=True),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
-    amount = db.Column(db.Float, nullable=False)
+    amount_cents = db.Column(db.BigInteger, nullable=False)
+    currency = db.Column(db.String(3), nullable=False, default=DEFAULT_CURRENCY, server_default=DEFAULT_CURRENCY)
     description = db.Column(db.String(256))
     date = db.Column(db.Date, nullable=False, default=datetime.utcnow().date)
     type = db.Column(db.String(10), nullable=False)  # 'income' or 'expense'
@@ -13,11 +43,15 @@ class Transaction(db.Model):
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    dedup_hash = db.Column(db.String(40), default=_default_dedup_hash)
+    # The schedule that generated the transaction, if any
+    recurring_id = db.Column(db.Integer, db.ForeignKey('recurring_transactions.id', ondelete='SET NULL'))
     
     def to_dict(self):
         return {
             'id': self.id,
-            'amount': self.amount,
+            'amount': from_cents(self.amount_cents),
+            'currency': self.currency,
             'description': self.description,
             'date': self.date.isoformat(),
             'type': self.type,
@@ -26,4 +60,10 @@ class Transaction(db.Model):
             'category_name': self.category.name if self.category else None,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
-        }
\ No newline at end of file
+        }
+
+@event.listens_for(Transaction, 'before_update')
+def _refresh_dedup_hash(mapper, connection, transaction):
+    transaction.dedup_hash = dedup_hash(
+        transaction.date, transaction.amount_cents, transaction.type, transaction.description
+    )
\ No newline at end of file
@@ -1,6 +1,7 @@
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
 from app import db
+from app.utils.money import DEFAULT_CURRENCY
+from app.utils.passwords import password_hasher
 
 class User(db.Model):
     __tablename__ = 'users'
@@ -8,7 +9,11 @@ class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(64), unique=True, index=True, nullable=False)
     email = db.Column(db.String(120), unique=True, index=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
+    # Method and parameters are stored with the hash, e.g. scrypt:32768:8:1$<salt>$<hash>
+    password_hash = db.Column(db.String(256), nullable=False)
+    reporting_currency = db.Column(db.String(3), nullable=False, default=DEFAULT_CURRENCY, server_default=DEFAULT_CURRENCY)
+    # Embedded in tokens; bumping it revokes every token issued before
+    token_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -16,18 +21,28 @@ class User(db.Model):
     transactions = db.relationship('Transaction', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     categories = db.relationship('Category', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     budgets = db.relationship('Budget', backref='user', lazy='dynamic', cascade='all, delete-orphan')
+    recurring_transactions = db.relationship('RecurringTransaction', backref='user', lazy='dynamic',
+                                             cascade='all, delete-orphan')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
         
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return password_hasher.verify(self.password_hash, password)
+    
+    def password_needs_rehash(self):
+        """Whether the stored hash was made with other parameters than PASSWORD_HASH_METHOD"""
+        return password_hasher.needs_rehash(self.password_hash)
+    
+    def revoke_tokens(self):
+        self.token_version = (self.token_version or 0) + 1
     
     def to_dict(self):
         return {
             'id': self.id,
             'username': self.username,
             'email': self.email,
+            'reporting_currency': self.reporting_currency,
             'created_at': self.created_at.isoformat(),
             'updated_at': self.updated_at.isoformat()
         }
\ No newline at end of file
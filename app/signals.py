@@ -0,0 +1,29 @@
+from blinker import Namespace
+
+_signals = Namespace()
+
+# Sent by the app after a commit that changed transactions, with changes: a
+# list of dicts holding the user_id, category_id, type, date and currency of
+# a daily total and the amount_cents and count added to it (negative when
+# transactions were removed or moved away)
+transactions_changed = _signals.signal('transactions-changed')
+
+# Sent by the app just before that commit, with the same changes. The session
+# has already committed by the time transactions_changed is sent, so receivers
+# that need to query for it (e.g. exchange rates) do so here
+transactions_committing = _signals.signal('transactions-committing')
+
+# Sent by the app once daily_category_totals has been rebuilt, with user_id
+# (None when every user's totals were rebuilt)
+daily_totals_rebuilt = _signals.signal('daily-totals-rebuilt')
+
+# Sent by the app when a budget's spending rises past an alert threshold,
+# with user_id and alert (a dict as returned by helpers.budget_alert)
+budget_alert_raised = _signals.signal('budget-alert-raised')
+
+# Sent by the app after committing a transaction that anomaly detection flagged,
+# with user_id, transaction_id and anomaly (see app.utils.anomalies)
+transaction_flagged = _signals.signal('transaction-flagged')
+
+# Sent by the app after exchange rates were loaded
+rates_changed = _signals.signal('rates-changed')
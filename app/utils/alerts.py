@@ -0,0 +1,249 @@
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+from flask import current_app
+from app.signals import (budget_alert_raised, daily_totals_rebuilt, rates_changed, transactions_changed,
+                         transactions_committing)
+from app.utils.fx import rate_cache
+from app.utils.helpers import budget_alert, budget_alert_level, budget_spending_statement
+from app import db
+
+logger = logging.getLogger(__name__)
+
+class BudgetCounter:
+    """Running spend of one budget, in integer cents of the budget's currency"""
+
+    __slots__ = ('id', 'category_id', 'category_name', 'currency', 'start_date', 'end_date',
+                 'amount_cents', 'spent_cents')
+
+    def __init__(self, row):
+        self.id = row.id
+        self.category_id = row.category_id
+        self.category_name = row.category_name
+        self.currency = row.currency
+        self.start_date = row.start_date
+        self.end_date = row.end_date
+        self.amount_cents = row.amount
+        self.spent_cents = row.spent
+
+    @property
+    def percentage_used(self):
+        return self.spent_cents * 100 / self.amount_cents if self.amount_cents > 0 else 0
+
+    def covers(self, category_id, on_date):
+        return self.category_id == category_id and self.start_date <= on_date <= self.end_date
+
+class BudgetAlerts:
+    """In-memory spend counters of current and upcoming budgets, for alerts without SQL.
+
+    A user's counters are loaded with one budget spending query the first
+    time their alerts are read. From then on, commits that change their
+    expenses update the matching counters in place (see the
+    transactions_changed signal), converting amounts at the cached rate of
+    their day. Those rates are looked up before the commit (see
+    transactions_committing), as no query can run once it is done; should
+    one have left the cache since, the user's counters are marked stale and
+    reloaded on their next read. A counter that rises past 80% or 100% of
+    its budget sends budget_alert_raised. A background thread reloads every loaded user
+    each BUDGET_ALERTS_RECONCILE_SECONDS, which corrects rounding drift,
+    applies writes made by other worker processes and raises the alerts
+    they cause. Counters of at most BUDGET_ALERTS_MAX_USERS users are kept.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault('BUDGET_ALERTS_RECONCILE_SECONDS', 300)
+        app.config.setdefault('BUDGET_ALERTS_MAX_USERS', 10000)
+        app.extensions['budget_alerts'] = {
+            # user id -> {budget id: BudgetCounter}, least recently read first
+            'users': OrderedDict(),
+            # Users whose counters missed a change, to be reloaded on their next read
+            'stale': set(),
+            'lock': threading.Lock(),
+            'reconciler': None,
+            'stop': threading.Event()
+        }
+
+    @property
+    def _state(self):
+        return current_app.extensions['budget_alerts']
+
+    def budgets(self, user_id):
+        """BudgetCounters of the user's current and upcoming budgets, by budget id"""
+        self._start_reconciler()
+        state = self._state
+        with state['lock']:
+            counters = state['users'].get(user_id)
+            if counters is not None:
+                state['users'].move_to_end(user_id)
+        if counters is None or user_id in state['stale']:
+            counters = self.reload_user(user_id)
+        return sorted(counters.values(), key=lambda counter: counter.id)
+
+    def alerts(self, user_id):
+        """Alerts of the user's active budgets, as check_budget_status returns them"""
+        today = datetime.utcnow().date()
+        alerts = []
+        for counter in self.budgets(user_id):
+            if counter.start_date <= today <= counter.end_date:
+                alert = budget_alert(counter.id, counter.category_name, counter.percentage_used)
+                if alert:
+                    alerts.append(alert)
+        return alerts
+
+    def reload_user(self, user_id):
+        """Recompute the user's counters from the database, raising alerts for budgets that moved up a level"""
+        today = datetime.utcnow().date()
+        state = self._state
+        # Before the query, so that a change missed while it runs marks the user stale again
+        with state['lock']:
+            state['stale'].discard(user_id)
+        counters = {
+            row.id: BudgetCounter(row)
+            for row in db.session.execute(budget_spending_statement(user_id)).all()
+            if row.end_date >= today
+        }
+
+        with state['lock']:
+            previous = state['users'].get(user_id)
+            state['users'][user_id] = counters
+            state['users'].move_to_end(user_id)
+            while len(state['users']) > current_app.config['BUDGET_ALERTS_MAX_USERS']:
+                state['users'].popitem(last=False)
+
+        if previous is not None:
+            for counter in counters.values():
+                old = previous.get(counter.id)
+                self._raise_if_crossed(user_id, counter, old.percentage_used if old else 0)
+        return counters
+
+    def refresh_user(self, user_id):
+        """Reload the user's counters if they are loaded; call after committing a change to their budgets"""
+        state = self._state
+        if user_id in state['users']:
+            self.reload_user(user_id)
+
+    def forget_user(self, user_id):
+        """Drop the user's counters; call after committing a change to their categories"""
+        state = self._state
+        with state['lock']:
+            state['users'].pop(user_id, None)
+            state['stale'].discard(user_id)
+
+    def forget_all(self):
+        state = self._state
+        with state['lock']:
+            state['users'].clear()
+            state['stale'].clear()
+
+    def reconcile(self):
+        """Reload the counters of every loaded user"""
+        state = self._state
+        with state['lock']:
+            user_ids = list(state['users'])
+        for user_id in user_ids:
+            self.reload_user(user_id)
+
+    def _matching_counters(self, changes):
+        """(change, counter) for each expense change and loaded counter it falls in"""
+        state = self._state
+        for change in changes:
+            if change['type'] != 'expense':
+                continue
+            counters = state['users'].get(change['user_id'])
+            if not counters:
+                continue
+            for counter in list(counters.values()):
+                if counter.covers(change['category_id'], change['date']):
+                    yield change, counter
+
+    def prefetch_rates(self, changes):
+        """Cache the rates that apply_changes will need once these changes are committed"""
+        for change, counter in self._matching_counters(changes):
+            rate_cache.get_rate(change['currency'], counter.currency, change['date'])
+
+    def apply_changes(self, changes):
+        """Add rollup deltas (as sent with transactions_changed) to the matching loaded counters.
+
+        Runs after the commit, when the session can't query: rates come from
+        the cache only, and a missing one marks the user stale instead.
+        """
+        state = self._state
+        for change, counter in self._matching_counters(changes):
+            cached = rate_cache.cached_rate(change['currency'], counter.currency, change['date'])
+            if cached is None:
+                with state['lock']:
+                    state['stale'].add(change['user_id'])
+                continue
+            # Like the SQL conversion, days without a known rate don't count
+            if cached[0] is None:
+                continue
+            before = counter.percentage_used
+            with state['lock']:
+                counter.spent_cents += round(change['amount_cents'] * cached[0])
+            self._raise_if_crossed(change['user_id'], counter, before)
+
+    @staticmethod
+    def _raise_if_crossed(user_id, counter, before):
+        if budget_alert_level(counter.percentage_used) > budget_alert_level(before):
+            alert = budget_alert(counter.id, counter.category_name, counter.percentage_used)
+            budget_alert_raised.send(current_app._get_current_object(), user_id=user_id, alert=alert)
+
+    def _start_reconciler(self):
+        state = self._state
+        interval = current_app.config['BUDGET_ALERTS_RECONCILE_SECONDS']
+        if interval <= 0 or state['reconciler'] is not None:
+            return
+        with state['lock']:
+            if state['reconciler'] is not None:
+                return
+            # Started on first use rather than in create_app, so it runs in each
+            # worker process after a pre-forking server has forked
+            app = current_app._get_current_object()
+            state['reconciler'] = threading.Thread(
+                target=self._reconcile_forever, args=(app, interval, state['stop']), name='budget-alerts', daemon=True
+            )
+            state['reconciler'].start()
+
+    def stop(self):
+        """Stop the background reconciliation, if it is running"""
+        state = self._state
+        state['stop'].set()
+        if state['reconciler'] is not None:
+            state['reconciler'].join()
+
+    def _reconcile_forever(self, app, interval, stop):
+        while not stop.wait(interval):
+            with app.app_context():
+                try:
+                    self.reconcile()
+                except Exception:
+                    logger.exception('Budget alert reconciliation failed')
+                finally:
+                    db.session.remove()
+
+budget_alerts = BudgetAlerts()
+
+@transactions_committing.connect
+def _prefetch_rates(app, changes):
+    if 'budget_alerts' in app.extensions:
+        budget_alerts.prefetch_rates(changes)
+
+@transactions_changed.connect
+def _apply_changes(app, changes):
+    if 'budget_alerts' in app.extensions:
+        budget_alerts.apply_changes(changes)
+
+@daily_totals_rebuilt.connect
+def _forget_rebuilt_totals(app, user_id):
+    if 'budget_alerts' not in app.extensions:
+        return
+    if user_id is None:
+        budget_alerts.forget_all()
+    else:
+        budget_alerts.forget_user(user_id)
+
+@rates_changed.connect
+def _forget_converted_totals(app):
+    if 'budget_alerts' in app.extensions:
+        budget_alerts.forget_all()
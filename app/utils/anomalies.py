@@ -0,0 +1,189 @@
+import threading
+import time
+from collections import OrderedDict, deque
+from statistics import median
+from flask import current_app
+from sqlalchemy import select
+from app.models.transaction import Transaction
+from app.signals import daily_totals_rebuilt, transaction_flagged, transactions_changed
+from app.utils.money import from_cents
+from app import db
+
+# Scales the median absolute deviation to the standard deviation of a normal distribution
+MAD_SCALE = 0.6745
+# Same for the mean absolute deviation, used when over half the amounts are identical
+MEAN_AD_SCALE = 0.7979
+
+class CategoryAmounts:
+    """Recent expense amounts of one (user, category, currency), with their median and spread"""
+
+    __slots__ = ('amounts', 'loaded_at', 'median', 'scale')
+
+    def __init__(self, amounts, window):
+        self.amounts = deque(amounts, maxlen=window)
+        self.loaded_at = time.monotonic()
+        self.median = None
+        self.scale = None
+
+    def add(self, amount_cents):
+        self.amounts.append(amount_cents)
+        self.median = None
+
+    def score(self, amount_cents):
+        """Robust z-score of an amount, or None when the amounts don't vary"""
+        if self.median is None:
+            amounts = list(self.amounts)
+            center = median(amounts)
+            deviations = [abs(amount - center) for amount in amounts]
+            mad = median(deviations)
+            self.scale = mad / MAD_SCALE if mad else sum(deviations) / len(deviations) / MEAN_AD_SCALE
+            self.median = center
+        if not self.scale:
+            return None
+        return (amount_cents - self.median) / self.scale
+
+class AnomalyDetector:
+    """Flags expenses far above what the user usually spends in their category.
+
+    A transaction's score is its robust z-score, (amount - median) / (1.4826 * MAD),
+    over the last ANOMALY_WINDOW expenses of the same user, category and
+    currency. Scores above ANOMALY_THRESHOLD (3.5, after Iglewicz and
+    Hoaglin) are anomalies, once ANOMALY_MIN_HISTORY amounts are known.
+
+    The amounts are read with one indexed query the first time a category
+    is scored, then kept in memory: commits that add a single expense to a
+    day append it (see the transactions_changed signal), other changes to a
+    category's expenses drop its amounts to be read again. Scoring a
+    transaction is thus a median over a few hundred integers, without SQL.
+    Amounts are re-read after ANOMALY_MODEL_TIMEOUT seconds, which picks up
+    writes made through other worker processes. An edited expense is scored
+    against amounts read afresh without its own, since the loaded ones still
+    hold its old amount.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault('ANOMALY_DETECTION_ENABLED', True)
+        app.config.setdefault('ANOMALY_WINDOW', 200)
+        app.config.setdefault('ANOMALY_MIN_HISTORY', 10)
+        app.config.setdefault('ANOMALY_THRESHOLD', 3.5)
+        app.config.setdefault('ANOMALY_MODEL_TIMEOUT', 3600)
+        app.config.setdefault('ANOMALY_MAX_MODELS', 10000)
+        app.extensions['anomalies'] = {
+            # (user id, category id, currency) -> CategoryAmounts, least recently used first
+            'models': OrderedDict(),
+            'lock': threading.Lock()
+        }
+
+    @property
+    def _state(self):
+        return current_app.extensions['anomalies']
+
+    def check(self, transaction):
+        """Anomaly dict for a new or edited expense, or None.
+
+        Call before the session is flushed; the amounts are read without
+        autoflush and without the transaction itself.
+        """
+        config = current_app.config
+        if not config['ANOMALY_DETECTION_ENABLED'] or transaction.type != 'expense':
+            return None
+
+        model = self._model(transaction)
+        if len(model.amounts) < config['ANOMALY_MIN_HISTORY']:
+            return None
+        score = model.score(transaction.amount_cents)
+        if score is None or score <= config['ANOMALY_THRESHOLD']:
+            return None
+        return {
+            'score': round(score, 1),
+            'typical_amount': from_cents(round(model.median)),
+            'message': f'Unusually large expense for this category '
+                       f'(typically {from_cents(round(model.median)):.2f} {transaction.currency})'
+        }
+
+    def announce(self, transaction, anomaly):
+        """Send transaction_flagged for a committed transaction that check() flagged"""
+        transaction_flagged.send(
+            current_app._get_current_object(),
+            user_id=transaction.user_id, transaction_id=transaction.id, anomaly=anomaly
+        )
+
+    def _model(self, transaction):
+        state = self._state
+        config = current_app.config
+        key = (transaction.user_id, transaction.category_id, transaction.currency)
+        if transaction.id is None:
+            with state['lock']:
+                model = state['models'].get(key)
+                if model is not None:
+                    state['models'].move_to_end(key)
+            if model is not None and time.monotonic() - model.loaded_at < config['ANOMALY_MODEL_TIMEOUT']:
+                return model
+
+        query = select(Transaction.amount_cents).where(
+            Transaction.user_id == transaction.user_id,
+            Transaction.type == 'expense',
+            Transaction.category_id == transaction.category_id,
+            Transaction.currency == transaction.currency
+        )
+        if transaction.id is not None:
+            query = query.where(Transaction.id != transaction.id)
+        with db.session.no_autoflush:
+            amounts = db.session.execute(
+                query.order_by(Transaction.date.desc(), Transaction.id.desc()).limit(config['ANOMALY_WINDOW'])
+            ).scalars().all()
+
+        # Oldest first, so that new amounts push the oldest out of the window
+        model = CategoryAmounts(reversed(amounts), config['ANOMALY_WINDOW'])
+        if transaction.id is not None:
+            # Without the edited expense, these amounts are only good for scoring it
+            return model
+        with state['lock']:
+            state['models'][key] = model
+            while len(state['models']) > config['ANOMALY_MAX_MODELS']:
+                state['models'].popitem(last=False)
+        return model
+
+    def apply_changes(self, changes):
+        """Keep loaded amounts in step with rollup deltas (as sent with transactions_changed)"""
+        state = self._state
+        with state['lock']:
+            for change in changes:
+                if change['type'] != 'expense':
+                    continue
+                key = (change['user_id'], change['category_id'], change['currency'])
+                model = state['models'].get(key)
+                if model is None:
+                    continue
+                # One more expense on the day: its amount is the delta
+                if change['count'] == 1 and change['amount_cents'] > 0:
+                    model.add(change['amount_cents'])
+                else:
+                    del state['models'][key]
+
+    def forget_user(self, user_id):
+        state = self._state
+        with state['lock']:
+            for key in [key for key in state['models'] if key[0] == user_id]:
+                del state['models'][key]
+
+    def forget_all(self):
+        state = self._state
+        with state['lock']:
+            state['models'].clear()
+
+anomaly_detector = AnomalyDetector()
+
+@transactions_changed.connect
+def _apply_changes(app, changes):
+    if 'anomalies' in app.extensions:
+        anomaly_detector.apply_changes(changes)
+
+@daily_totals_rebuilt.connect
+def _forget_rebuilt_totals(app, user_id):
+    if 'anomalies' not in app.extensions:
+        return
+    if user_id is None:
+        anomaly_detector.forget_all()
+    else:
+        anomaly_detector.forget_user(user_id)
@@ -0,0 +1,73 @@
+from collections import namedtuple
+from flask import current_app
+from app import db, jwt
+from app.models.user import User
+from app.utils.cache import MemoryBackend
+from app.utils.ratelimit import rate_limiter
+
+# What the JWT checks need to know about a user, without going back to the database
+CachedUser = namedtuple('CachedUser', ['id', 'username', 'email', 'token_version', 'profile'])
+
+def token_claims(user):
+    """Identity claims embedded in access and refresh tokens; user is a User or a CachedUser"""
+    return {'username': user.username, 'email': user.email, 'ver': user.token_version}
+
+class UserCache:
+    """Bounded in-process cache of CachedUser snapshots, keyed by user id.
+
+    Every JWT-protected request checks the token's version claim against
+    the user's token_version and loads current_user from here, so a warm
+    request costs no query. Entries live in an LRU of USER_CACHE_SIZE
+    entries and expire after USER_CACHE_TIMEOUT seconds: a revocation made
+    in another process takes effect within that window, one made in this
+    process at once (see forget()).
+    """
+
+    def init_app(self, app):
+        app.config.setdefault('USER_CACHE_SIZE', 1024)
+        app.config.setdefault('USER_CACHE_TIMEOUT', 60)
+        app.extensions['user_cache'] = MemoryBackend(app.config['USER_CACHE_SIZE'])
+
+    @property
+    def backend(self):
+        return current_app.extensions['user_cache']
+
+    def get(self, user_id):
+        """CachedUser for user_id, or None if there is no such user"""
+        entry = self.peek(user_id)
+        if entry is None:
+            entry = self.put(user_id, db.session.get(User, user_id))
+        return entry[0]
+
+    def peek(self, user_id):
+        """The cached (CachedUser or None,) entry for user_id, or None on a cache miss"""
+        return self.backend.get(user_id)
+
+    def put(self, user_id, user):
+        """Cache the snapshot of user (a User, or None if there is none) and return its entry"""
+        # Missing users are cached too, as a 1-tuple holding None
+        entry = (self.snapshot(user) if user is not None else None,)
+        self.backend.set(user_id, entry, current_app.config['USER_CACHE_TIMEOUT'])
+        return entry
+
+    def forget(self, user_id):
+        """Drop a user's snapshot; call after committing a change to the user"""
+        self.backend.delete(user_id)
+
+    @staticmethod
+    def snapshot(user):
+        return CachedUser(user.id, user.username, user.email, user.token_version, user.to_dict())
+
+user_cache = UserCache()
+
+@jwt.token_in_blocklist_loader
+def token_is_revoked(jwt_header, jwt_payload):
+    # Runs once per request with a verified token, which makes it the place for per-user limits
+    rate_limiter.limit_user(jwt_payload['sub'])
+    # Tokens from before token versions existed carry no claim and count as version 0
+    user = user_cache.get(jwt_payload['sub'])
+    return user is None or jwt_payload.get('ver', 0) != user.token_version
+
+@jwt.user_lookup_loader
+def load_current_user(jwt_header, jwt_data):
+    return user_cache.get(jwt_data['sub'])
@@ -0,0 +1,133 @@
+import io
+import json
+from datetime import datetime
+from sqlalchemy import insert, select
+from app.models.category import Category
+from app.models.transaction import Transaction
+from app.utils.money import DEFAULT_CURRENCY, parse_currency, to_cents
+from app.utils.rollups import RollupEntry, update_daily_totals
+from app import db
+
+class RowError(ValueError):
+    """A single input row that can't be imported"""
+
+def iter_ndjson(stream):
+    """Yield one parsed object per non-blank line of a binary NDJSON stream"""
+    # Werkzeug's request stream is unbuffered, and line iteration on it reads byte by byte
+    if isinstance(stream, io.RawIOBase):
+        stream = io.BufferedReader(stream, 64 * 1024)
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError:
+            yield RowError('Invalid JSON')
+
+def parse_transaction(data, default_date, default_currency=DEFAULT_CURRENCY):
+    """Validate one input object and turn it into a transactions row (without user/category checks)"""
+    if isinstance(data, RowError):
+        raise data
+    if not isinstance(data, dict):
+        raise RowError('Each transaction must be a JSON object')
+    if not data.get('amount') or not data.get('type') or not data.get('category_id'):
+        raise RowError('Missing required fields')
+    if data['type'] not in ['income', 'expense']:
+        raise RowError('Transaction type must be either "income" or "expense"')
+    try:
+        amount_cents = to_cents(data['amount'])
+        category_id = int(data['category_id'])
+    except (TypeError, ValueError):
+        raise RowError('amount and category_id must be numbers')
+    try:
+        currency = parse_currency(data.get('currency'), default_currency)
+    except ValueError as e:
+        raise RowError(str(e))
+
+    transaction_date = default_date
+    if data.get('date'):
+        try:
+            transaction_date = datetime.strptime(data['date'], '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            raise RowError('Invalid date format. Use YYYY-MM-DD')
+
+    return {
+        'amount_cents': amount_cents,
+        'currency': currency,
+        'description': data.get('description', ''),
+        'date': transaction_date,
+        'type': data['type'],
+        'category_id': category_id
+    }
+
+class TransactionBulkInserter:
+    """Validates and inserts transaction rows for one user in fixed-size chunks.
+
+    Category ownership is checked once per distinct category_id and each
+    chunk is written with a single executemany INSERT plus one rollup
+    update. The caller commits.
+    """
+
+    def __init__(self, user_id, chunk_size, currency=DEFAULT_CURRENCY):
+        self.user_id = user_id
+        self.chunk_size = chunk_size
+        self.currency = currency
+        self.created = 0
+        self.errors = []
+        self._pending = []
+        self._categories = {}  # category_id -> owned by user?
+        self._today = datetime.utcnow().date()
+
+    def add(self, index, data):
+        """Queue one input object; invalid rows are recorded in errors"""
+        try:
+            row = parse_transaction(data, self._today, self.currency)
+        except RowError as e:
+            self.errors.append({'index': index, 'message': str(e)})
+            return
+        self.add_row(index, row)
+
+    def add_row(self, index, row):
+        """Queue an already-parsed transactions row"""
+        self._pending.append((index, row))
+        if len(self._pending) >= self.chunk_size:
+            self.flush()
+
+    def _check_categories(self, category_ids):
+        unknown = category_ids - self._categories.keys()
+        if not unknown:
+            return
+        owned = set(db.session.execute(
+            select(Category.id).where(Category.user_id == self.user_id, Category.id.in_(unknown))
+        ).scalars())
+        for category_id in unknown:
+            self._categories[category_id] = category_id in owned
+
+    def flush(self):
+        """Insert the queued rows"""
+        if not self._pending:
+            return
+        self._check_categories({row['category_id'] for _, row in self._pending})
+
+        now = datetime.utcnow()
+        rows = []
+        for index, row in self._pending:
+            if not self._categories[row['category_id']]:
+                self.errors.append({'index': index, 'message': 'Category not found'})
+                continue
+            row['user_id'] = self.user_id
+            row['created_at'] = now
+            row['updated_at'] = now
+            rows.append(row)
+        self._pending = []
+
+        if rows:
+            db.session.execute(insert(Transaction.__table__), rows)
+            update_daily_totals(added=[
+                RollupEntry(
+                    self.user_id, row['category_id'], row['type'], row['date'], row['currency'], row['amount_cents']
+                )
+                for row in rows
+            ])
+            self.created += len(rows)
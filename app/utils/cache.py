@@ -0,0 +1,250 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from urllib.parse import urlencode
+from flask import current_app, request
+from flask_jwt_extended import get_jwt_identity
+
+class MemoryBackend:
+    """Thread-safe in-process LRU cache with a TTL per entry.
+
+    Version counters are kept apart from the LRU entries so that evicting
+    cached responses can never roll a user's version back.
+    """
+
+    def __init__(self, max_entries=4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._counters:
+                return self._counters[key]
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def add_counter(self, key, value):
+        with self._lock:
+            self._counters.setdefault(key, value)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+class RedisBackend:
+    """Cache backend for a Redis client, or anything with the same get/set/incr API"""
+
+    def __init__(self, client, prefix='finance-tracker:'):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        if isinstance(value, bytes):
+            value = value.decode()
+        return value
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def add_counter(self, key, value):
+        self.client.set(self.prefix + key, value, nx=True)
+
+    def incr(self, key):
+        return self.client.incr(self.prefix + key)
+
+class NullBackend:
+    """Backend that never stores anything"""
+
+    def get(self, key):
+        return None
+
+    def set(self, key, value, ttl):
+        pass
+
+    def add_counter(self, key, value):
+        pass
+
+    def incr(self, key):
+        return 0
+
+class CacheStats:
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self._lock = threading.Lock()
+
+    def record(self, hit, not_modified):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+            if not_modified:
+                self.not_modified += 1
+
+    def to_dict(self):
+        lookups = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+            'hit_ratio': self.hits / lookups if lookups else 0.0
+        }
+
+class ResponseCache:
+    """Per-user cache of GET responses with write-driven invalidation.
+
+    Keys combine the user, the user's current version counter, the endpoint
+    and the normalised query arguments. Write handlers bump the version via
+    invalidate_user(), which orphans every cached response of that user at
+    once; orphans age out through the TTL/LRU. invalidate_all() bumps a
+    global counter that is part of every key, for changes such as new
+    exchange rates that affect all users.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault('CACHE_BACKEND', 'memory')
+        app.config.setdefault('CACHE_DEFAULT_TIMEOUT', 300)
+        app.config.setdefault('CACHE_MAX_ENTRIES', 4096)
+        app.config.setdefault('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+        app.config.setdefault('CACHE_REDIS_CLIENT', None)
+
+        backend_name = app.config['CACHE_BACKEND']
+        if backend_name == 'memory':
+            backend = MemoryBackend(app.config['CACHE_MAX_ENTRIES'])
+        elif backend_name == 'redis':
+            client = app.config['CACHE_REDIS_CLIENT']
+            if client is None:
+                import redis
+                client = redis.Redis.from_url(app.config['CACHE_REDIS_URL'])
+            backend = RedisBackend(client)
+        elif backend_name == 'null':
+            backend = NullBackend()
+        else:
+            raise ValueError(f'Unknown CACHE_BACKEND: {backend_name}')
+
+        app.extensions['response_cache'] = {'backend': backend, 'stats': CacheStats()}
+
+    @property
+    def _state(self):
+        return current_app.extensions['response_cache']
+
+    @property
+    def backend(self):
+        return self._state['backend']
+
+    @property
+    def stats(self):
+        return self._state['stats']
+
+    def version(self, name):
+        """Current value of the version counter name, for building cache keys"""
+        key = f'version:{name}'
+        version = self.backend.get(key)
+        if version is None:
+            # Seed with the clock so a lost counter never reuses an old version
+            self.backend.add_counter(key, time.time_ns() // 1000)
+            version = self.backend.get(key)
+        return int(version or 0)
+
+    def bump(self, name):
+        """Advance the version counter name, orphaning the keys built from it"""
+        self.version(name)
+        self.backend.incr(f'version:{name}')
+
+    def user_version(self, user_id):
+        return self.version(user_id)
+
+    def invalidate_user(self, user_id):
+        self.bump(user_id)
+
+    def invalidate_all(self):
+        self.user_version('all')
+        self.backend.incr('version:all')
+
+    def key(self, user_id, endpoint, view_args, args):
+        normalized = urlencode(sorted(list((view_args or {}).items()) + list(args.items(multi=True))))
+        version = f'{self.user_version("all")}.{self.user_version(user_id)}'
+        return f'response:{user_id}:{version}:{endpoint}:{normalized}'
+
+    def get(self, key):
+        value = self.backend.get(key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, entry):
+        self.backend.set(key, json.dumps(entry), current_app.config['CACHE_DEFAULT_TIMEOUT'])
+
+cache = ResponseCache()
+
+def invalidate_cached_responses(user_id):
+    """Drop every cached response of a user; call after committing a write"""
+    cache.invalidate_user(user_id)
+
+def invalidate_all_cached_responses():
+    """Drop every cached response of every user"""
+    cache.invalidate_all()
+
+def cached_response(view):
+    """Cache a JWT-protected GET view per user and answer If-None-Match with 304.
+
+    Must be applied below @jwt_required(). Only complete 200 responses are
+    cached; streamed responses pass through untouched.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        key = cache.key(get_jwt_identity(), request.endpoint, request.view_args, request.args)
+        entry = cache.get(key)
+        hit = entry is not None
+
+        if not hit:
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code != 200 or response.is_streamed:
+                return response
+            body = response.get_data(as_text=True)
+            entry = {
+                'body': body,
+                'mimetype': response.mimetype,
+                'etag': hashlib.sha1(body.encode()).hexdigest()
+            }
+            cache.set(key, entry)
+
+        response = current_app.response_class(entry['body'], mimetype=entry['mimetype'])
+        response.set_etag(entry['etag'])
+        response.headers['Cache-Control'] = 'private, no-cache'
+        response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+        response.make_conditional(request)
+        cache.stats.record(hit, response.status_code == 304)
+        return response
+
+    return wrapper
@@ -0,0 +1,175 @@
+"""Cash flow series computed with NumPy over the daily_category_totals rollup.
+
+Imported on first use rather than at startup, so workers don't pay for
+importing NumPy until a cash flow report is asked for.
+"""
+from datetime import datetime, timedelta
+import numpy as np
+from sqlalchemy import cast, func, select
+from app.models.category import Category
+from app.models.daily_category_total import DailyCategoryTotal
+from app.utils.fx import converted_cents
+from app.utils.helpers import income_expense_sums, missing_rate_currencies
+from app.utils.money import CENTS_PER_UNIT
+from app.utils.reports import shift_months
+from app import db
+
+CASHFLOW_GROUPINGS = ('day', 'week', 'month')
+
+# Trailing windows, in days, of the per-category rolling averages
+ROLLING_WINDOWS = (30, 90)
+
+# Longest date range a report may cover (about 20 years), which bounds the per-day arrays: income
+# and expense take 8 bytes a day each (under 120 KB). Per-category figures take memory in proportion
+# to the rows loaded and to categories x periods, as the response itself does
+MAX_CASHFLOW_DAYS = 7305
+
+def cashflow_params(args):
+    """(start_date, end_date, group_by) of a cash flow request.
+
+    Defaults to the last 12 months (this month included) by month. Raises
+    ValueError with a message for the client on a bad value.
+    """
+    group_by = args.get('group_by', 'month')
+    if group_by not in CASHFLOW_GROUPINGS:
+        raise ValueError(f'group_by must be one of: {", ".join(CASHFLOW_GROUPINGS)}')
+
+    try:
+        end_date = datetime.strptime(args['end_date'], '%Y-%m-%d').date() \
+            if args.get('end_date') else datetime.utcnow().date()
+        start_date = datetime.strptime(args['start_date'], '%Y-%m-%d').date() \
+            if args.get('start_date') else shift_months(end_date.replace(day=1), -11)
+    except ValueError:
+        raise ValueError('Invalid date format. Use YYYY-MM-DD')
+
+    if end_date < start_date:
+        raise ValueError('end_date must not be before start_date')
+    if (end_date - start_date).days >= MAX_CASHFLOW_DAYS:
+        raise ValueError(f'The date range may cover at most {MAX_CASHFLOW_DAYS} days')
+
+    return start_date, end_date, group_by
+
+def daily_rows(user_id, start_date, end_date, currency):
+    """(date strings, category ids, types, cents) columns of a user's daily totals, converted to currency.
+
+    A day and category appears once per currency; they are summed by the caller.
+    """
+    amount = converted_cents(
+        DailyCategoryTotal.amount_cents, DailyCategoryTotal.currency, currency, DailyCategoryTotal.date
+    )
+    # Dates come back as 'YYYY-MM-DD' text, which NumPy parses in one pass
+    statement = select(
+        cast(DailyCategoryTotal.date, db.String),
+        DailyCategoryTotal.category_id,
+        DailyCategoryTotal.type,
+        func.coalesce(amount, 0)
+    ).where(
+        DailyCategoryTotal.user_id == user_id,
+        DailyCategoryTotal.date >= start_date,
+        DailyCategoryTotal.date <= end_date
+    )
+    # Run on the session's connection (the replica in @use_replica views) without
+    # the ORM's result handling, which would take longer than the query itself
+    rows = db.session.connection(bind_arguments={'clause': statement}).execute(statement).all()
+    return tuple(zip(*rows)) if rows else ((), (), (), ())
+
+def net_before(user_id, before, currency):
+    """Income minus expenses, in cents of currency, of everything dated before a day"""
+    income, expense = db.session.execute(select(*income_expense_sums(currency)).where(
+        DailyCategoryTotal.user_id == user_id,
+        DailyCategoryTotal.date < before
+    )).one()
+    return int(income - expense)
+
+def period_keys(days, group_by):
+    """First day of the day/week/month of each datetime64[D] in days; weeks start on Monday"""
+    if group_by == 'week':
+        # 1970-01-01, day 0, was a Thursday
+        return days - (days.astype(np.int64) + 3) % 7
+    if group_by == 'month':
+        return days.astype('datetime64[M]').astype('datetime64[D]')
+    return days
+
+def _units(cents):
+    return (np.round(cents) / CENTS_PER_UNIT).tolist()
+
+def cashflow_report(user_id, start_date, end_date, group_by, currency):
+    """Income, expense, net and running balance per period, with rolling per-category averages.
+
+    The daily totals from the longest rolling window before start_date up to
+    end_date are loaded as columns and spread over dense per-day arrays;
+    per category and type, only the days with totals are kept, as sorted
+    keys with their cumulative sums. Period sums are then one reduceat per
+    series, and rolling averages differences of cumulative sums looked up
+    with searchsorted, so the cost doesn't depend on how many transactions
+    the days hold, nor the memory on how many categories are idle. The
+    balance starts from the net of everything before start_date. Days
+    without a known exchange rate are left out, and their currencies listed
+    under missing_rates.
+    """
+    history = max(ROLLING_WINDOWS) - 1
+    load_start = start_date - timedelta(days=history)
+    day_count = (end_date - load_start).days + 1
+
+    dates, category_ids, types, amounts = daily_rows(user_id, load_start, end_date, currency)
+    days = (np.array(dates, dtype='datetime64[D]') - np.datetime64(load_start, 'D')).astype(np.int64)
+    amounts = np.array(amounts, dtype=np.float64)
+    is_income = np.array(types, dtype=object) == 'income'
+
+    # Daily totals over every day of the range, zero where nothing was recorded
+    income = np.bincount(days, weights=np.where(is_income, amounts, 0), minlength=day_count)
+    expense = np.bincount(days, weights=np.where(is_income, 0, amounts), minlength=day_count)
+
+    # Days with totals of each (category, type), as sorted pair * day_count + day keys, and the
+    # running sum before each key; a dense (pair, day) array would take pairs x days memory
+    pair_keys, pairs = np.unique(np.array(category_ids, dtype=np.int64) * 2 + is_income, return_inverse=True)
+    day_keys, merged = np.unique(pairs * day_count + days, return_inverse=True)
+    running = np.concatenate(([0.0], np.cumsum(np.bincount(merged, weights=amounts, minlength=len(day_keys)))))
+
+    # Periods of the requested days: where each starts and ends, as indexes into the daily arrays
+    calendar = np.datetime64(start_date, 'D') + np.arange(day_count - history)
+    keys = period_keys(calendar, group_by)
+    firsts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    lasts = np.append(firsts[1:], len(keys)) - 1 + history
+
+    period_income = np.add.reduceat(income[history:], firsts)
+    period_expense = np.add.reduceat(expense[history:], firsts)
+    period_net = period_income - period_expense
+    opening = net_before(user_id, load_start, currency) + income[:history].sum() - expense[:history].sum()
+
+    names = dict(db.session.execute(
+        select(Category.id, Category.name).where(Category.user_id == user_id)
+    ).all())
+    categories = []
+    for row, key in enumerate(pair_keys.tolist()):
+        category_id = key // 2
+        entry = {
+            'category_id': category_id,
+            'category_name': names.get(category_id),
+            'type': 'income' if key % 2 else 'expense'
+        }
+        # running at the position of key row * day_count + i holds the pair's totals before day i, plus
+        # those of the pairs before it, which cancel out in the differences
+        ends = running[np.searchsorted(day_keys, row * day_count + lasts + 1)]
+        for window in ROLLING_WINDOWS:
+            totals = ends - running[np.searchsorted(day_keys, row * day_count + lasts + 1 - window)]
+            entry[f'average_{window}d'] = _units(totals / window)
+        categories.append(entry)
+
+    return {
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'group_by': group_by,
+        'currency': currency,
+        # Everything up to end_date feeds the opening balance, the series or the averages
+        'missing_rates': missing_rate_currencies(user_id, currency, end_date=end_date),
+        'opening_balance': _units(opening),
+        'series': {
+            'period': keys[firsts].astype(str).tolist(),
+            'income': _units(period_income),
+            'expense': _units(period_expense),
+            'net': _units(period_net),
+            'balance': _units(opening + np.cumsum(period_net))
+        },
+        'categories': categories
+    }
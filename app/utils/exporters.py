@@ -0,0 +1,128 @@
+import csv
+import importlib.util
+import io
+import json
+from app.models.category import Category
+from app.models.transaction import Transaction
+from app.utils.money import from_cents
+from app import db
+
+EXPORT_FORMATS = ('csv', 'ndjson', 'parquet')
+
+EXPORT_MIMETYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+EXPORT_COLUMNS = [
+    Transaction.id,
+    Transaction.date,
+    Transaction.type,
+    Transaction.amount_cents.label('amount'),
+    Transaction.currency,
+    Transaction.description,
+    Transaction.category_id,
+    Category.name.label('category_name'),
+    Transaction.created_at,
+    Transaction.updated_at
+]
+
+EXPORT_FIELDS = [column.key for column in EXPORT_COLUMNS]
+
+def parquet_available():
+    return importlib.util.find_spec('pyarrow') is not None
+
+def iter_export_batches(query, batch_size):
+    """Stream the rows of a filtered Transaction query as plain tuples, batch_size at a time.
+
+    Only the exported columns are selected (joined with the category name),
+    and rows are fetched through a server-side cursor, so no ORM objects are
+    built and memory stays bounded by the batch size.
+    """
+    statement = query.join(
+        Category, Transaction.category_id == Category.id
+    ).with_entities(*EXPORT_COLUMNS).order_by(
+        Transaction.date.desc(), Transaction.id.desc()
+    ).statement.execution_options(yield_per=batch_size)
+
+    for partition in db.session.execute(statement).partitions():
+        yield [
+            (row.id, row.date.isoformat(), row.type, from_cents(row.amount), row.currency, row.description,
+             row.category_id, row.category_name,
+             row.created_at.isoformat() if row.created_at else None,
+             row.updated_at.isoformat() if row.updated_at else None)
+            for row in partition
+        ]
+
+def csv_chunks(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+def ndjson_chunks(batches):
+    for batch in batches:
+        yield ''.join(json.dumps(dict(zip(EXPORT_FIELDS, row))) + '\n' for row in batch)
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands its buffered bytes out on demand"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+def parquet_chunks(batches):
+    """Write each batch as a Parquet row group and yield the bytes as they are produced"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([
+        ('id', pa.int64()),
+        ('date', pa.string()),
+        ('type', pa.string()),
+        ('amount', pa.float64()),
+        ('currency', pa.string()),
+        ('description', pa.string()),
+        ('category_id', pa.int64()),
+        ('category_name', pa.string()),
+        ('created_at', pa.string()),
+        ('updated_at', pa.string())
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for batch in batches:
+            columns = [list(column) for column in zip(*batch)]
+            writer.write_table(pa.Table.from_arrays(columns, schema=schema))
+            yield sink.take()
+    finally:
+        writer.close()
+    yield sink.take()
+
+EXPORT_WRITERS = {
+    'csv': csv_chunks,
+    'ndjson': ndjson_chunks,
+    'parquet': parquet_chunks
+}
@@ -0,0 +1,225 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import cast, func, select
+from app.models.daily_category_total import DailyCategoryTotal
+from app.signals import daily_totals_rebuilt, rates_changed, transactions_changed
+from app.utils.alerts import budget_alerts
+from app.utils.fx import converted_cents
+from app.utils.money import from_cents
+from app import db
+
+class WeekdayLevels:
+    """Exponentially weighted average daily spend of one (user, category, currency) per weekday.
+
+    Each weekday keeps a weighted sum and a sum of weights, decayed by
+    1 - FORECAST_SMOOTHING per week, so new days fold in without refitting
+    and a short history is not pulled towards zero. through is the last
+    day included, loaded_at the time of the full fit.
+    """
+
+    __slots__ = ('sums', 'weights', 'through', 'loaded_at')
+
+    def __init__(self, through):
+        self.sums = [0.0] * 7
+        self.weights = [0.0] * 7
+        self.through = through
+        self.loaded_at = time.monotonic()
+
+    def copy(self):
+        levels = WeekdayLevels(self.through)
+        levels.sums, levels.weights, levels.loaded_at = list(self.sums), list(self.weights), self.loaded_at
+        return levels
+
+    def update(self, first_day, daily_cents, alpha):
+        """Fold in the daily totals of consecutive days starting on first_day"""
+        import numpy as np
+
+        count = len(daily_cents)
+        if count:
+            offsets = np.arange(count)
+            weekdays = (first_day.weekday() + offsets) % 7
+            # Later days of the same weekday decay the earlier ones once per week
+            decay = (1 - alpha) ** ((count - 1 - offsets) // 7)
+            seen = np.bincount(weekdays, minlength=7)
+            carried = (1 - alpha) ** seen
+            sums = np.array(self.sums) * carried + np.bincount(weekdays, weights=decay * daily_cents, minlength=7)
+            weights = np.array(self.weights) * carried + np.bincount(weekdays, weights=decay, minlength=7)
+            self.sums, self.weights = sums.tolist(), weights.tolist()
+        self.through = first_day + timedelta(days=count - 1)
+
+    def daily(self, weekday):
+        """Expected spend, in cents, on a day of the week (Monday is 0)"""
+        return self.sums[weekday] / self.weights[weekday] if self.weights[weekday] else 0.0
+
+    def total(self, start, end):
+        """Expected spend from start to end inclusive"""
+        days = (end - start).days + 1
+        if days <= 0:
+            return 0.0
+        weeks, extra = divmod(days, 7)
+        return sum(self.daily(weekday) * (weeks + ((weekday - start.weekday()) % 7 < extra))
+                   for weekday in range(7))
+
+class SpendForecaster:
+    """Projects each current budget's spend to the end of its period.
+
+    The expected spend of each remaining day is the exponentially weighted
+    average spend of that weekday in the category (see WeekdayLevels),
+    fitted with NumPy over the last FORECAST_HISTORY_DAYS days of
+    daily_category_totals, converted to the budget's currency. Fitted
+    levels are kept per worker and stop at yesterday: on a later day only
+    the days since are read and folded in. A commit that changes expenses
+    dated before that drops the levels of their category, to be fitted
+    again. Levels are fitted afresh after FORECAST_MODEL_TIMEOUT seconds,
+    which picks up writes made through other worker processes. Spend to
+    date comes from the budget alert counters.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault('FORECAST_HISTORY_DAYS', 364)
+        app.config.setdefault('FORECAST_SMOOTHING', 0.2)
+        app.config.setdefault('FORECAST_MODEL_TIMEOUT', 3600)
+        app.config.setdefault('FORECAST_MAX_MODELS', 10000)
+        app.extensions['forecast'] = {
+            # (user id, category id) -> {currency: WeekdayLevels}, least recently used first
+            'models': OrderedDict(),
+            'lock': threading.Lock()
+        }
+
+    @property
+    def _state(self):
+        return current_app.extensions['forecast']
+
+    def forecasts(self, user_id):
+        """Projected end-of-period spend of the user's current and upcoming budgets"""
+        today = datetime.utcnow().date()
+        forecasts = []
+        for counter in budget_alerts.budgets(user_id):
+            levels = self.levels(user_id, counter.category_id, counter.currency, today)
+            # Today is still under way, so the forecast covers the days after it
+            projected = counter.spent_cents + round(levels.total(max(counter.start_date, today + timedelta(days=1)),
+                                                                 counter.end_date))
+            forecasts.append({
+                'budget_id': counter.id,
+                'category_id': counter.category_id,
+                'category_name': counter.category_name,
+                'currency': counter.currency,
+                'start_date': counter.start_date.isoformat(),
+                'end_date': counter.end_date.isoformat(),
+                'amount': from_cents(counter.amount_cents),
+                'spent': from_cents(counter.spent_cents),
+                'projected_spend': from_cents(projected),
+                'projected_percentage': round(projected * 100 / counter.amount_cents, 1) if counter.amount_cents > 0 else 0,
+                'projected_overspend': from_cents(max(projected - counter.amount_cents, 0))
+            })
+        return forecasts
+
+    def levels(self, user_id, category_id, currency, today):
+        """WeekdayLevels fitted up to the day before today, reading only the days not folded in yet"""
+        state = self._state
+        config = current_app.config
+        key = (user_id, category_id)
+        yesterday = today - timedelta(days=1)
+        with state['lock']:
+            levels = state['models'].get(key, {}).get(currency)
+            if levels is not None:
+                state['models'].move_to_end(key)
+        if levels is not None and time.monotonic() - levels.loaded_at >= config['FORECAST_MODEL_TIMEOUT']:
+            levels = None
+
+        if levels is None:
+            first_day = today - timedelta(days=config['FORECAST_HISTORY_DAYS'])
+            levels = WeekdayLevels(first_day - timedelta(days=1))
+            dates, daily_cents = self._daily_spend(user_id, category_id, currency, first_day, yesterday)
+            # Days before the category's first expense would only drag the averages down
+            if dates:
+                first_day = datetime.strptime(dates[0], '%Y-%m-%d').date()
+        elif levels.through < yesterday:
+            # Other requests may be reading the shared levels: fold the new days into a copy, swapped in below
+            levels = levels.copy()
+            first_day = levels.through + timedelta(days=1)
+            dates, daily_cents = self._daily_spend(user_id, category_id, currency, first_day, yesterday)
+        else:
+            return levels
+        levels.update(first_day, self._dense(dates, daily_cents, first_day, yesterday), config['FORECAST_SMOOTHING'])
+
+        with state['lock']:
+            state['models'].setdefault(key, {})[currency] = levels
+            state['models'].move_to_end(key)
+            while len(state['models']) > config['FORECAST_MAX_MODELS']:
+                state['models'].popitem(last=False)
+        return levels
+
+    @staticmethod
+    def _daily_spend(user_id, category_id, currency, start, end):
+        """('YYYY-MM-DD' dates, cents) of the days with expenses in a category, oldest first"""
+        amount = converted_cents(
+            DailyCategoryTotal.amount_cents, DailyCategoryTotal.currency, currency, DailyCategoryTotal.date
+        )
+        rows = db.session.execute(select(
+            cast(DailyCategoryTotal.date, db.String),
+            func.coalesce(func.sum(amount), 0)
+        ).where(
+            DailyCategoryTotal.user_id == user_id,
+            DailyCategoryTotal.category_id == category_id,
+            DailyCategoryTotal.type == 'expense',
+            DailyCategoryTotal.date >= start,
+            DailyCategoryTotal.date <= end
+        ).group_by(DailyCategoryTotal.date).order_by(DailyCategoryTotal.date)).all()
+        return [row[0] for row in rows], [row[1] for row in rows]
+
+    @staticmethod
+    def _dense(dates, daily_cents, start, end):
+        """Daily totals from start to end, zero on days without expenses"""
+        import numpy as np
+
+        days = np.zeros(max((end - start).days + 1, 0))
+        offsets = (np.array(dates, dtype='datetime64[D]') - np.datetime64(start, 'D')).astype(np.int64)
+        days[offsets] = np.array(daily_cents, dtype=np.float64)
+        return days
+
+    def apply_changes(self, changes):
+        """Drop the levels of categories whose already folded-in days changed"""
+        state = self._state
+        with state['lock']:
+            for change in changes:
+                if change['type'] != 'expense':
+                    continue
+                by_currency = state['models'].get((change['user_id'], change['category_id']))
+                if by_currency and any(change['date'] <= levels.through for levels in by_currency.values()):
+                    del state['models'][change['user_id'], change['category_id']]
+
+    def forget_user(self, user_id):
+        state = self._state
+        with state['lock']:
+            for key in [key for key in state['models'] if key[0] == user_id]:
+                del state['models'][key]
+
+    def forget_all(self):
+        state = self._state
+        with state['lock']:
+            state['models'].clear()
+
+spend_forecaster = SpendForecaster()
+
+@transactions_changed.connect
+def _apply_changes(app, changes):
+    if 'forecast' in app.extensions:
+        spend_forecaster.apply_changes(changes)
+
+@daily_totals_rebuilt.connect
+def _forget_rebuilt_totals(app, user_id):
+    if 'forecast' not in app.extensions:
+        return
+    if user_id is None:
+        spend_forecaster.forget_all()
+    else:
+        spend_forecaster.forget_user(user_id)
+
+@rates_changed.connect
+def _forget_converted_totals(app):
+    if 'forecast' in app.extensions:
+        spend_forecaster.forget_all()
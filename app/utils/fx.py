@@ -0,0 +1,139 @@
+import csv
+import io
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import case, cast, func, select
+from app.models.fx_rate import FxRate
+from app.utils.cache import MemoryBackend
+from app.utils.money import parse_currency
+from app import db
+
+def rate_expression(base, quote, on_date):
+    """SQL scalar subquery for the latest base->quote rate on or before on_date.
+
+    Taking the latest earlier rate forward-fills weekends and other days
+    missing from the rate files. Served by the fx_rates primary key.
+    """
+    return select(FxRate.rate).where(
+        FxRate.base == base,
+        FxRate.quote == quote,
+        FxRate.date <= on_date
+    ).order_by(FxRate.date.desc()).limit(1).scalar_subquery()
+
+def converted_cents(amount_cents, currency, target, on_date):
+    """SQL expression converting amount_cents from currency to target at the rate of on_date.
+
+    The arguments are column expressions (or literals), so the conversion
+    runs inside the query that sums the amounts. The result is NULL when
+    no rate is known, which leaves the amount out of SUM().
+    """
+    return case(
+        (currency == target, amount_cents),
+        else_=cast(func.round(amount_cents * rate_expression(currency, target, on_date)), db.BigInteger)
+    )
+
+def _upsert_statement(dialect_name):
+    """INSERT ... ON CONFLICT statement that replaces an existing rate"""
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+
+    stmt = dialect_insert(FxRate.__table__)
+    return stmt.on_conflict_do_update(
+        index_elements=['base', 'quote', 'date'],
+        set_={'rate': stmt.excluded.rate}
+    )
+
+def _write_rates(rates):
+    rows = [
+        {'base': base, 'quote': quote, 'date': date, 'rate': rate}
+        for (base, quote, date), rate in rates.items()
+    ]
+    upsert = _upsert_statement(db.session.get_bind().dialect.name)
+    if upsert is not None:
+        db.session.execute(upsert, rows)
+    else:
+        for row in rows:
+            db.session.merge(FxRate(**row))
+        db.session.flush()
+
+def load_rates(stream, chunk_size=1000):
+    """Upsert the rates of a CSV file with date, base, quote and rate columns.
+
+    The inverse of every rate is stored as well, unless the same chunk
+    lists that pair explicitly. Rows are written chunk_size at a time and
+    committed at the end; returns the number of rates read.
+    """
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    if not reader.fieldnames or not {'date', 'base', 'quote', 'rate'} <= set(reader.fieldnames):
+        raise ValueError('Rate file must have date, base, quote and rate columns')
+
+    count = 0
+    explicit = {}
+    inverse = {}
+    for line, row in enumerate(reader, start=2):
+        try:
+            rate_date = datetime.strptime(row['date'].strip(), '%Y-%m-%d').date()
+            base = parse_currency(row['base'], None)
+            quote = parse_currency(row['quote'], None)
+            rate = float(row['rate'])
+            if not base or not quote or rate <= 0:
+                raise ValueError('base, quote and a positive rate are required')
+        except (AttributeError, ValueError) as e:
+            raise ValueError(f'Line {line}: {e}')
+
+        explicit[(base, quote, rate_date)] = rate
+        inverse[(quote, base, rate_date)] = 1 / rate
+        count += 1
+        if len(explicit) >= chunk_size:
+            _write_rates({**inverse, **explicit})
+            explicit, inverse = {}, {}
+
+    if explicit:
+        _write_rates({**inverse, **explicit})
+    db.session.commit()
+    rate_cache.clear()
+    return count
+
+class FxRateCache:
+    """Bounded in-process cache for single rate lookups, keyed by (date, base, quote).
+
+    Entries live in an LRU of FX_RATE_CACHE_SIZE entries and expire after
+    FX_RATE_CACHE_TIMEOUT seconds, so rates loaded by another process are
+    picked up eventually. Reports don't go through it: they convert in SQL.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault('FX_RATE_CACHE_SIZE', 4096)
+        app.config.setdefault('FX_RATE_CACHE_TIMEOUT', 3600)
+        app.extensions['fx_rate_cache'] = MemoryBackend(app.config['FX_RATE_CACHE_SIZE'])
+
+    @property
+    def backend(self):
+        return current_app.extensions['fx_rate_cache']
+
+    def get_rate(self, base, quote, on_date):
+        """Rate from base to quote on on_date, or None if no rate is known"""
+        if base == quote:
+            return 1.0
+        key = (on_date, base, quote)
+        entry = self.backend.get(key)
+        if entry is None:
+            # Misses are cached too, as a 1-tuple holding None
+            entry = (db.session.execute(select(rate_expression(base, quote, on_date))).scalar(),)
+            self.backend.set(key, entry, current_app.config['FX_RATE_CACHE_TIMEOUT'])
+        return entry[0]
+
+    def cached_rate(self, base, quote, on_date):
+        """(rate,) as get_rate would return it, without SQL; None when the lookup isn't cached"""
+        if base == quote:
+            return (1.0,)
+        return self.backend.get((on_date, base, quote))
+
+    def clear(self):
+        self.backend.clear()
+
+rate_cache = FxRateCache()
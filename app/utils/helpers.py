@@ -1,9 +1,15 @@
 from datetime import datetime, timedelta
-from app.models.transaction import Transaction
 from app.models.budget import Budget
-from sqlalchemy import func
+from app.models.category import Category
+from app.models.daily_category_total import DailyCategoryTotal
+from app.utils.fx import converted_cents, rate_expression
+from app.utils.money import DEFAULT_CURRENCY, from_cents
+from app.utils.serializers import BUDGET_SERIALIZER
+from sqlalchemy import and_, case, cast, func, select
 from app import db
 
+SUMMARY_GROUPINGS = ('day', 'week', 'month', 'category')
+
 def get_date_range(period):
     """Get start and end dates for different periods"""
     today = datetime.utcnow().date()
@@ -27,71 +33,233 @@ def get_date_range(period):
     elif period == 'this_year':
         start_of_year = today.replace(month=1, day=1)
         return start_of_year, today
+    elif period == 'last_year':
+        return today.replace(year=today.year - 1, month=1, day=1), today.replace(year=today.year - 1, month=12, day=31)
     else:
         # Default to current month
         start_of_month = today.replace(day=1)
         return start_of_month, today
 
-def get_spending_summary(user_id, start_date=None, end_date=None):
-    """Get spending summary by category for a date range"""
+def missing_rate_currencies(user_id, currency, start_date=None, end_date=None, type=None, session=None):
+    """Sorted currencies of a user's daily totals with no rate to currency on some of their days.
+
+    Those days are left out of converted sums, so reports list these
+    currencies to show that their totals are incomplete.
+    """
+    session = session or db.session
+    filters = [DailyCategoryTotal.user_id == user_id]
+    if start_date:
+        filters.append(DailyCategoryTotal.date >= start_date)
+    if end_date:
+        filters.append(DailyCategoryTotal.date <= end_date)
+    if type:
+        filters.append(DailyCategoryTotal.type == type)
+    
+    return session.execute(select(DailyCategoryTotal.currency).where(
+        *filters,
+        DailyCategoryTotal.currency != currency,
+        rate_expression(DailyCategoryTotal.currency, currency, DailyCategoryTotal.date).is_(None)
+    ).distinct().order_by(DailyCategoryTotal.currency)).scalars().all()
+
+def get_spending_summary(user_id, start_date=None, end_date=None, currency=DEFAULT_CURRENCY):
+    """Get spending summary by category for a date range, as (category_id, total_cents) rows.
+    
+    Amounts are converted to currency at the rate of their day; days
+    without a known rate are left out.
+    """
     if not start_date:
         start_date = datetime.utcnow().date().replace(day=1)  # First day of current month
     if not end_date:
         end_date = datetime.utcnow().date()
     
-    # Get expenses by category
+    # Get expenses by category from the daily rollup
+    amount = converted_cents(
+        DailyCategoryTotal.amount_cents, DailyCategoryTotal.currency, currency, DailyCategoryTotal.date
+    )
     expenses_by_category = db.session.query(
-        Transaction.category_id,
-        func.sum(Transaction.amount).label('total')
+        DailyCategoryTotal.category_id,
+        func.coalesce(func.sum(amount), 0).label('total_cents')
     ).filter(
-        Transaction.user_id == user_id,
-        Transaction.type == 'expense',
-        Transaction.date >= start_date,
-        Transaction.date <= end_date
-    ).group_by(Transaction.category_id).all()
+        DailyCategoryTotal.user_id == user_id,
+        DailyCategoryTotal.type == 'expense',
+        DailyCategoryTotal.date >= start_date,
+        DailyCategoryTotal.date <= end_date
+    ).group_by(DailyCategoryTotal.category_id).all()
     
     return expenses_by_category
 
+def period_start(date_column, period, dialect_name=None):
+    """SQL expression for the first day of the day/week/month containing date_column"""
+    if period == 'day':
+        return date_column
+    if (dialect_name or db.engine.dialect.name) == 'postgresql':
+        return cast(func.date_trunc(period, date_column), db.Date)
+    # SQLite: weeks start on Monday, like date_trunc('week', ...) in PostgreSQL
+    if period == 'week':
+        return func.date(date_column, 'weekday 0', '-6 days', type_=db.Date)
+    return func.date(date_column, 'start of month', type_=db.Date)
+
+def income_expense_sums(currency):
+    """Income and expense SUM(CASE ...) columns over daily_category_totals, in integer cents of currency"""
+    amount = converted_cents(
+        DailyCategoryTotal.amount_cents, DailyCategoryTotal.currency, currency, DailyCategoryTotal.date
+    )
+    income = func.coalesce(func.sum(case((DailyCategoryTotal.type == 'income', amount), else_=0)), 0)
+    expense = func.coalesce(func.sum(case((DailyCategoryTotal.type == 'expense', amount), else_=0)), 0)
+    return income.label('income'), expense.label('expense')
+
+def get_income_expense_summary(user_id, start_date=None, end_date=None, group_by=None, currency=DEFAULT_CURRENCY,
+                               session=None):
+    """Get income/expense totals, per-category totals and optional grouped series.
+    
+    Reads daily_category_totals, so the cost grows with days x categories
+    rather than with the number of transactions. Amounts in other
+    currencies are converted to currency in the same queries, at the rate
+    of their day; days without a known rate are left out and their
+    currencies listed under missing_rates. Runs on db.session unless another
+    session is given.
+    """
+    session = session or db.session
+    filters = [DailyCategoryTotal.user_id == user_id]
+    if start_date:
+        filters.append(DailyCategoryTotal.date >= start_date)
+    if end_date:
+        filters.append(DailyCategoryTotal.date <= end_date)
+    
+    # One grouped query gives the per-category totals; overall totals are summed from them
+    category_rows = session.query(
+        Category.id,
+        Category.name,
+        *income_expense_sums(currency)
+    ).join(
+        Category, DailyCategoryTotal.category_id == Category.id
+    ).filter(*filters).group_by(Category.id, Category.name).all()
+    
+    missing_rates = missing_rate_currencies(user_id, currency, start_date, end_date, session=session)
+    
+    # Totals are summed as integer cents and only converted for the response
+    total_income = sum(row.income for row in category_rows)
+    total_expense = sum(row.expense for row in category_rows)
+    
+    # Categories that share a name are reported together
+    by_category = {}
+    for row in category_rows:
+        totals = by_category.setdefault(row.name, {'income': 0, 'expense': 0})
+        totals['income'] += row.income
+        totals['expense'] += row.expense
+    
+    summary = {
+        'currency': currency,
+        'missing_rates': missing_rates,
+        'total_income': from_cents(total_income),
+        'total_expense': from_cents(total_expense),
+        'net': from_cents(total_income - total_expense),
+        'by_category': {
+            name: {'income': from_cents(totals['income']), 'expense': from_cents(totals['expense'])}
+            for name, totals in by_category.items()
+        }
+    }
+    
+    if group_by == 'category':
+        summary['groups'] = [{
+            'category_id': row.id,
+            'category_name': row.name,
+            **_income_expense_dict(row)
+        } for row in category_rows]
+    elif group_by:
+        period = period_start(DailyCategoryTotal.date, group_by, session.get_bind().dialect.name).label('period')
+        period_rows = session.query(
+            period,
+            *income_expense_sums(currency)
+        ).filter(*filters).group_by(period).order_by(period).all()
+        summary['groups'] = [{
+            'period': row.period.isoformat(),
+            **_income_expense_dict(row)
+        } for row in period_rows]
+    
+    return summary
+
+def _income_expense_dict(row):
+    return {
+        'income': from_cents(row.income),
+        'expense': from_cents(row.expense),
+        'net': from_cents(row.income - row.expense)
+    }
+
+def budget_spending_statement(user_id, active_on=None, category_id=None, budget_id=None):
+    """SELECT of a user's budgets with their spent/remaining/percentage_used figures.
+    
+    Daily expense totals are matched to each budget by category and the
+    budget's date range. Rows carry the columns of BUDGET_SERIALIZER, with
+    amount, spent and remaining in integer cents; unconverted_days counts
+    the days whose spending in another currency had no exchange rate and
+    is missing from spent.
+    """
+    query = select(*BUDGET_SERIALIZER.columns).join(
+        Category, Budget.category_id == Category.id
+    ).outerjoin(DailyCategoryTotal, and_(
+        DailyCategoryTotal.user_id == Budget.user_id,
+        DailyCategoryTotal.type == 'expense',
+        DailyCategoryTotal.category_id == Budget.category_id,
+        DailyCategoryTotal.date >= Budget.start_date,
+        DailyCategoryTotal.date <= Budget.end_date
+    )).where(Budget.user_id == user_id)
+    
+    if active_on:
+        query = query.where(Budget.start_date <= active_on, Budget.end_date >= active_on)
+    if category_id:
+        query = query.where(Budget.category_id == category_id)
+    if budget_id:
+        query = query.where(Budget.id == budget_id)
+    
+    return query.group_by(Budget.id, Category.id).order_by(Budget.id)
+
+def get_budget_spending(user_id, active_on=None, category_id=None, budget_id=None):
+    """Get a user's budgets with their spending figures in a single query (see budget_spending_statement)"""
+    return db.session.execute(budget_spending_statement(user_id, active_on, category_id, budget_id)).all()
+
+def budget_alert_level(percentage_used):
+    """0 below 80% of the budget, 1 from 80%, 2 once it is exceeded (100%)"""
+    if percentage_used >= 100:
+        return 2
+    if percentage_used >= 80:
+        return 1
+    return 0
+
+def budget_alert(budget_id, category_name, percentage_used):
+    """Alert for a budget at percentage_used, or None below 80%"""
+    level = budget_alert_level(percentage_used)
+    if level == 2:
+        return {
+            'budget_id': budget_id,
+            'category_name': category_name,
+            'severity': 'high',
+            'percentage_used': percentage_used,
+            'message': f'Budget for {category_name} has been exceeded ({percentage_used:.1f}%)'
+        }
+    if level == 1:
+        return {
+            'budget_id': budget_id,
+            'category_name': category_name,
+            'severity': 'medium',
+            'percentage_used': percentage_used,
+            'message': f'Budget for {category_name} is at {percentage_used:.1f}% of limit'
+        }
+    return None
+
 def check_budget_status(user_id):
-    """Check status of active budgets and return alerts for those close to or exceeding limits"""
-    today = datetime.utcnow().date()
+    """Check status of active budgets and return alerts for those close to or exceeding limits.
     
-    # Get active budgets
-    active_budgets = Budget.query.filter(
-        Budget.user_id == user_id,
-        Budget.start_date <= today,
-        Budget.end_date >= today
-    ).all()
+    Sums every active budget's spending in SQL; GET /api/budgets/alerts
+    serves the same alerts from the running counters in app.utils.alerts.
+    """
+    today = datetime.utcnow().date()
     
     alerts = []
     
-    for budget in active_budgets:
-        # Calculate spending for this budget period
-        spending = db.session.query(func.sum(Transaction.amount)).filter(
-            Transaction.user_id == user_id,
-            Transaction.category_id == budget.category_id,
-            Transaction.type == 'expense',
-            Transaction.date >= budget.start_date,
-            Transaction.date <= budget.end_date
-        ).scalar() or 0
-        
-        # Calculate percentage used
-        percentage_used = (spending / budget.amount) * 100 if budget.amount > 0 else 0
-        
-        # Generate alerts based on percentage used
-        if percentage_used >= 100:
-            alerts.append({
-                'budget_id': budget.id,
-                'category_name': budget.category.name,
-                'severity': 'high',
-                'message': f'Budget for {budget.category.name} has been exceeded ({percentage_used:.1f}%)'
-            })
-        elif percentage_used >= 80:
-            alerts.append({
-                'budget_id': budget.id,
-                'category_name': budget.category.name,
-                'severity': 'medium',
-                'message': f'Budget for {budget.category.name} is at {percentage_used:.1f}% of limit'
-            })
+    for budget in get_budget_spending(user_id, active_on=today):
+        alert = budget_alert(budget.id, budget.category_name, budget.percentage_used)
+        if alert:
+            alerts.append(alert)
     
     return alerts
\ No newline at end of file
@@ -0,0 +1,223 @@
+import csv
+import io
+import re
+from datetime import datetime
+from sqlalchemy import func, select
+from app.models.category import Category
+from app.models.transaction import Transaction, dedup_hash
+from app.utils.money import DEFAULT_CURRENCY, to_cents
+from app.utils.bulk import RowError, TransactionBulkInserter
+from app import db
+
+IMPORT_FORMATS = ('csv', 'ofx')
+
+# Default CSV header for each transaction field
+DEFAULT_CSV_COLUMNS = {
+    'date': 'date',
+    'amount': 'amount',
+    'description': 'description',
+    'type': 'type',
+    'category': 'category'
+}
+
+OFX_TAG = re.compile(r'<(/?)([A-Za-z0-9.]+)>([^<]*)')
+
+def parse_amount(value):
+    """Parse a statement amount such as '-1,234.50' or '(12.00)' into integer cents"""
+    value = (value or '').strip().replace(',', '').replace('$', '')
+    if value.startswith('(') and value.endswith(')'):
+        value = '-' + value[1:-1]
+    try:
+        return to_cents(value)
+    except ValueError:
+        raise RowError(f'Invalid amount: {value!r}')
+
+def iter_csv(stream, columns=None, date_format='%Y-%m-%d'):
+    """Return an iterator of raw records, one per CSV data row, without reading the whole file"""
+    columns = {**DEFAULT_CSV_COLUMNS, **(columns or {})}
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    if not reader.fieldnames or columns['date'] not in reader.fieldnames or columns['amount'] not in reader.fieldnames:
+        raise ValueError(f'CSV must have "{columns["date"]}" and "{columns["amount"]}" columns')
+    return (_csv_record(row, columns, date_format) for row in reader)
+
+def _csv_record(row, columns, date_format):
+    try:
+        transaction_date = datetime.strptime((row.get(columns['date']) or '').strip(), date_format).date()
+    except ValueError:
+        return RowError(f'Invalid date, expected format {date_format}')
+    try:
+        amount_cents = parse_amount(row.get(columns['amount']))
+    except RowError as e:
+        return e
+    return {
+        'date': transaction_date,
+        'amount_cents': amount_cents,
+        'description': (row.get(columns['description']) or '').strip(),
+        'type': (row.get(columns['type']) or '').strip().lower() or None,
+        'category': (row.get(columns['category']) or '').strip() or None
+    }
+
+def iter_ofx(stream):
+    """Yield one raw record per <STMTTRN> block of an OFX/QFX statement.
+
+    Handles both SGML (OFX 1.x, no closing tags) and XML (OFX 2.x) files,
+    reading them line by line.
+    """
+    fields = None
+    for line in io.TextIOWrapper(stream, encoding='utf-8', errors='replace'):
+        for closing, tag, value in OFX_TAG.findall(line):
+            tag = tag.upper()
+            if tag == 'STMTTRN':
+                if closing:
+                    yield _ofx_record(fields or {})
+                    fields = None
+                else:
+                    fields = {}
+            elif fields is not None and not closing:
+                fields[tag] = value.strip()
+
+def _ofx_record(fields):
+    try:
+        transaction_date = datetime.strptime(fields.get('DTPOSTED', '')[:8], '%Y%m%d').date()
+    except ValueError:
+        return RowError('Invalid DTPOSTED')
+    try:
+        amount_cents = parse_amount(fields.get('TRNAMT'))
+    except RowError as e:
+        return e
+    description = fields.get('NAME') or fields.get('MEMO') or ''
+    return {
+        'date': transaction_date,
+        'amount_cents': amount_cents,
+        'description': description,
+        'type': None,
+        'category': None
+    }
+
+class CategoryResolver:
+    """Maps category names from an import to the user's category ids.
+
+    The user's categories are loaded once; names are matched case-insensitively
+    and cached for the rest of the import.
+    """
+
+    def __init__(self, user_id, default_category_id=None, create_missing=False):
+        self.user_id = user_id
+        self.default_category_id = default_category_id
+        self.create_missing = create_missing
+        self._by_name = {
+            name.lower(): category_id
+            for category_id, name in db.session.execute(
+                select(Category.id, Category.name).where(Category.user_id == user_id)
+            )
+        }
+        self._ids = set(self._by_name.values())
+
+    def resolve(self, name):
+        if not name:
+            if self.default_category_id in self._ids:
+                return self.default_category_id
+            raise RowError('No category given and no valid default_category_id')
+
+        key = name.lower()
+        if key not in self._by_name:
+            if not self.create_missing:
+                raise RowError(f'Unknown category: {name}')
+            category = Category(name=name, user_id=self.user_id)
+            db.session.add(category)
+            db.session.flush()
+            self._by_name[key] = category.id
+            self._ids.add(category.id)
+        return self._by_name[key]
+
+class StatementImporter:
+    """Imports parsed statement records in chunks, skipping rows already stored.
+
+    Each chunk costs one lookup of the (user_id, dedup_hash) index for the
+    hashes not seen earlier in the import, one INSERT and one rollup update.
+    A row counts as a duplicate while the import has seen its hash no more
+    times than it already occurs in the database, so identical purchases on
+    the same day are still imported once each.
+    """
+
+    def __init__(self, user_id, categories, chunk_size, currency=DEFAULT_CURRENCY):
+        self.user_id = user_id
+        self.categories = categories
+        self.chunk_size = chunk_size
+        self.currency = currency
+        self.inserter = TransactionBulkInserter(user_id, chunk_size, currency)
+        self.duplicates = 0
+        self._chunk = []
+        self._existing = {}  # dedup_hash -> rows stored before this import
+        self._seen = {}  # dedup_hash -> rows of this import so far
+
+    @property
+    def imported(self):
+        return self.inserter.created
+
+    @property
+    def errors(self):
+        return sorted(self.inserter.errors, key=lambda error: error['index'])
+
+    def add(self, index, record):
+        if isinstance(record, RowError):
+            self.inserter.errors.append({'index': index, 'message': str(record)})
+            return
+        try:
+            row = self._to_row(record)
+        except RowError as e:
+            self.inserter.errors.append({'index': index, 'message': str(e)})
+            return
+        self._chunk.append((index, row))
+        if len(self._chunk) >= self.chunk_size:
+            self.flush()
+
+    def _to_row(self, record):
+        amount_cents = record['amount_cents']
+        transaction_type = record['type']
+        if transaction_type in ('credit', 'deposit'):
+            transaction_type = 'income'
+        elif transaction_type in ('debit', 'withdrawal'):
+            transaction_type = 'expense'
+        elif transaction_type is None:
+            transaction_type = 'expense' if amount_cents < 0 else 'income'
+        elif transaction_type not in ('income', 'expense'):
+            raise RowError('Transaction type must be either "income" or "expense"')
+        amount_cents = abs(amount_cents)
+        if not amount_cents:
+            raise RowError('Amount must not be zero')
+
+        return {
+            'amount_cents': amount_cents,
+            'currency': self.currency,
+            'description': record['description'][:256],
+            'date': record['date'],
+            'type': transaction_type,
+            'category_id': self.categories.resolve(record['category']),
+            'dedup_hash': dedup_hash(record['date'], amount_cents, transaction_type, record['description'][:256])
+        }
+
+    def flush(self):
+        if not self._chunk:
+            return
+
+        new_hashes = {row['dedup_hash'] for _, row in self._chunk} - self._existing.keys()
+        if new_hashes:
+            counts = dict(db.session.execute(
+                select(Transaction.dedup_hash, func.count()).where(
+                    Transaction.user_id == self.user_id,
+                    Transaction.dedup_hash.in_(new_hashes)
+                ).group_by(Transaction.dedup_hash)
+            ).all())
+            for row_hash in new_hashes:
+                self._existing[row_hash] = counts.get(row_hash, 0)
+
+        for index, row in self._chunk:
+            row_hash = row['dedup_hash']
+            self._seen[row_hash] = self._seen.get(row_hash, 0) + 1
+            if self._seen[row_hash] <= self._existing[row_hash]:
+                self.duplicates += 1
+            else:
+                self.inserter.add_row(index, row)
+        self._chunk = []
+        self.inserter.flush()
@@ -0,0 +1,227 @@
+import bisect
+import hmac
+import logging
+import threading
+import time
+from collections import Counter
+from flask import current_app, g, jsonify, request
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+STATEMENT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+# Slow query log lines show at most this much of the statement's parameters
+MAX_LOGGED_PARAMETERS = 200
+
+class Histogram:
+    """Cumulative-bucket histogram per label set, in the Prometheus text format"""
+
+    def __init__(self, name, help_text, buckets, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = buckets
+        self.label_names = label_names
+        # labels -> [count per bucket (the last one is +Inf), sum]
+        self.series = {}
+
+    def observe(self, labels, value):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0]
+        series[0][bisect.bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total) in sorted(self.series.items()):
+            label_text = _labels(self.label_names, labels)
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                lines.append(f'{self.name}_bucket{{{label_text},le="{bound}"}} {cumulative}')
+            lines.append(f'{self.name}_sum{{{label_text}}} {total}')
+            lines.append(f'{self.name}_count{{{label_text}}} {cumulative}')
+        return lines
+
+class CounterMetric:
+    def __init__(self, name, help_text, label_names):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.series = Counter()
+
+    def inc(self, labels, value=1):
+        self.series[labels] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self.series.items()):
+            label_text = _labels(self.label_names, labels)
+            lines.append(f'{self.name}{{{label_text}}} {value}' if label_text else f'{self.name} {value}')
+        return lines
+
+def _labels(names, values):
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"') for value in values)
+    return ','.join(f'{name}="{value}"' for name, value in zip(names, escaped))
+
+def _describe_parameters(parameters, executemany):
+    """Statement parameters for a log line: a count for executemany, else a truncated repr"""
+    if executemany:
+        return f'{len(parameters)} parameter sets'
+    text = repr(parameters)
+    if len(text) > MAX_LOGGED_PARAMETERS:
+        return f'{text[:MAX_LOGGED_PARAMETERS]}... ({len(text)} characters)'
+    return text
+
+class RequestStats:
+    """What one request did: its start time and the SQL statements it ran"""
+
+    __slots__ = ('start', 'statements', 'sql_count', 'sql_time')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.statements = Counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+
+class MetricsRegistry:
+    def __init__(self):
+        route = ('method', 'route')
+        self.requests = CounterMetric('http_requests_total', 'Requests handled', ('method', 'route', 'status'))
+        self.latency = Histogram('http_request_duration_seconds', 'Time to produce the response',
+                                 LATENCY_BUCKETS, route)
+        self.sql_statements = Histogram('http_request_sql_statements', 'SQL statements run per request',
+                                        STATEMENT_BUCKETS, route)
+        self.sql_time = Histogram('http_request_sql_duration_seconds', 'Time spent in SQL per request',
+                                  LATENCY_BUCKETS, route)
+        self.response_size = Histogram('http_response_size_bytes', 'Response body size (streamed bodies excluded)',
+                                       SIZE_BUCKETS, route)
+        self.n_plus_one = CounterMetric('http_request_n_plus_one_total',
+                                        'Requests that repeated one SQL statement over N_PLUS_ONE_THRESHOLD times',
+                                        route)
+        self.slow_queries = CounterMetric('sql_slow_queries_total',
+                                          'SQL statements slower than SLOW_QUERY_MS', ())
+        self.lock = threading.Lock()
+
+    def record(self, method, route, status, elapsed, stats, size, repeated):
+        labels = (method, route)
+        with self.lock:
+            self.requests.inc((method, route, status))
+            self.latency.observe(labels, elapsed)
+            self.sql_statements.observe(labels, stats.sql_count)
+            self.sql_time.observe(labels, stats.sql_time)
+            if size is not None:
+                self.response_size.observe(labels, size)
+            if repeated:
+                self.n_plus_one.inc(labels)
+
+    def record_slow_query(self):
+        with self.lock:
+            self.slow_queries.inc(())
+
+    def render(self):
+        with self.lock:
+            metrics = (self.requests, self.latency, self.sql_statements, self.sql_time,
+                       self.response_size, self.n_plus_one, self.slow_queries)
+            return [line for metric in metrics for line in metric.render()]
+
+class RequestMetrics:
+    """Per-route request latency, SQL statement count and time, and response size.
+
+    Statements are timed through the engines' cursor events and attributed
+    to the request in progress. Statements slower than SLOW_QUERY_MS are
+    logged with their parameters (truncated), and a request that runs the
+    same statement more than N_PLUS_ONE_THRESHOLD times is logged as a
+    likely N+1 query. Everything is exposed in the Prometheus text format at
+    /api/metrics, but only once METRICS_TOKEN is set, to scrapers sending it
+    as a bearer token. Figures are per worker process.
+    """
+
+    def init_app(self, app, db):
+        app.config.setdefault('METRICS_ENABLED', True)
+        app.config.setdefault('SLOW_QUERY_MS', 100)
+        app.config.setdefault('N_PLUS_ONE_THRESHOLD', 10)
+        app.config.setdefault('METRICS_TOKEN', None)
+        if not app.config['METRICS_ENABLED']:
+            return
+
+        registry = app.extensions['metrics'] = MetricsRegistry()
+        with app.app_context():
+            engines = list(db.engines.values())
+        replica = app.extensions.get('replica')
+        if replica:
+            engines.append(replica['engine'])
+        for engine in engines:
+            self._instrument(engine, registry, app.config['SLOW_QUERY_MS'] / 1000)
+
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        if app.config['METRICS_TOKEN']:
+            app.add_url_rule('/api/metrics', 'metrics', self._metrics_view, methods=['GET'])
+
+    @staticmethod
+    def _instrument(engine, registry, slow_seconds):
+        @event.listens_for(engine, 'before_cursor_execute')
+        def start_statement(conn, cursor, statement, parameters, context, executemany):
+            context.metrics_start = time.perf_counter()
+
+        @event.listens_for(engine, 'after_cursor_execute')
+        def finish_statement(conn, cursor, statement, parameters, context, executemany):
+            elapsed = time.perf_counter() - context.metrics_start
+            stats = g.get('request_stats') if g else None
+            if stats is not None:
+                stats.sql_count += 1
+                stats.sql_time += elapsed
+                stats.statements[statement] += 1
+            if elapsed >= slow_seconds:
+                registry.record_slow_query()
+                logger.warning('Slow query (%.1f ms): %s; parameters: %s', elapsed * 1000, statement,
+                               _describe_parameters(parameters, executemany))
+
+    @staticmethod
+    def _start_request():
+        g.request_stats = RequestStats()
+
+    @staticmethod
+    def _finish_request(response):
+        stats = g.pop('request_stats', None)
+        if stats is None:
+            return response
+        elapsed = time.perf_counter() - stats.start
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+
+        threshold = current_app.config['N_PLUS_ONE_THRESHOLD']
+        repeated = [(statement, count) for statement, count in stats.statements.items() if count > threshold]
+        for statement, count in repeated:
+            logger.warning('Possible N+1 query in %s %s: ran %d times: %s', request.method, route, count, statement)
+
+        # Streamed bodies run their queries after this point, and have no length yet
+        size = None if response.is_streamed else response.calculate_content_length()
+        current_app.extensions['metrics'].record(
+            request.method, route, response.status_code, elapsed, stats, size, bool(repeated)
+        )
+        return response
+
+    @staticmethod
+    def _metrics_view():
+        from app.utils.cache import cache
+
+        # Scrapers authenticate with the shared token, not a user's JWT
+        expected = f'Bearer {current_app.config["METRICS_TOKEN"]}'
+        if not hmac.compare_digest(request.headers.get('Authorization', '').encode(), expected.encode()):
+            return jsonify({'message': 'Invalid metrics token'}), 401
+
+        lines = current_app.extensions['metrics'].render()
+        # The response cache keeps its own counters
+        stats = cache.stats.to_dict()
+        for name, help_text in (('hits', 'Responses served from the response cache'),
+                                ('misses', 'Cacheable responses that had to be computed'),
+                                ('not_modified', 'Cached responses answered with 304 Not Modified')):
+            lines.append(f'# HELP response_cache_{name}_total {help_text}')
+            lines.append(f'# TYPE response_cache_{name}_total counter')
+            lines.append(f'response_cache_{name}_total {stats[name]}')
+        return current_app.response_class('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,40 @@
+import re
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+
+# Amounts are stored as integer hundredths of the currency unit ("cents"),
+# so sums and differences are exact in SQL and in Python
+CENTS_PER_UNIT = 100
+
+DEFAULT_CURRENCY = 'USD'
+
+CURRENCY_CODE = re.compile(r'^[A-Z]{3}$')
+
+def to_cents(value):
+    """Convert an amount in currency units (number or numeric string) to integer cents, rounding half up"""
+    if isinstance(value, bool):
+        raise ValueError(f'Invalid amount: {value!r}')
+    try:
+        # str() first, so a float like 0.1 is read as the decimal it prints as
+        amount = value if isinstance(value, Decimal) else Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f'Invalid amount: {value!r}')
+    if not amount.is_finite():
+        raise ValueError(f'Invalid amount: {value!r}')
+    return int((amount * CENTS_PER_UNIT).to_integral_value(rounding=ROUND_HALF_UP))
+
+def from_cents(cents):
+    """Amount in currency units as a float, for JSON responses"""
+    return cents / CENTS_PER_UNIT
+
+def format_cents(cents):
+    """Exact decimal string for an amount in cents, e.g. -1234 -> '-12.34'"""
+    return str(Decimal(cents).scaleb(-2))
+
+def parse_currency(value, default=DEFAULT_CURRENCY):
+    """Validate an ISO 4217 currency code, falling back to default when none is given"""
+    if value is None or value == '':
+        return default
+    code = str(value).strip().upper()
+    if not CURRENCY_CODE.match(code):
+        raise ValueError(f'Invalid currency code: {value!r}')
+    return code
@@ -0,0 +1,30 @@
+import base64
+import json
+from datetime import date
+
+
+class InvalidCursor(ValueError):
+    """Raised when a pagination cursor can't be decoded"""
+
+
+def encode_cursor(row_date, row_id):
+    """Encode the (date, id) key of the last row on a page as an opaque cursor"""
+    payload = json.dumps([row_date.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Decode a cursor produced by encode_cursor back into a (date, id) pair"""
+    padded = cursor + '=' * (-len(cursor) % 4)
+    try:
+        row_date, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return date.fromisoformat(row_date), int(row_id)
+    except (ValueError, TypeError):
+        raise InvalidCursor('Invalid cursor')
+
+
+def get_page_size(requested, default, maximum):
+    """Clamp a requested page size to the configured bounds"""
+    if not requested or requested < 1:
+        return default
+    return min(requested, maximum)
@@ -0,0 +1,112 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from flask import current_app, jsonify
+from werkzeug.security import check_password_hash, generate_password_hash
+
+ARGON2_PREFIX = '$argon2'
+
+class PasswordHasherBusy(Exception):
+    """Raised when PASSWORD_HASH_QUEUE hash/verify jobs are already waiting"""
+
+class UnsupportedPasswordHash(Exception):
+    """Raised when a stored hash needs a library this deployment doesn't have"""
+
+def _argon2_hasher(method):
+    # argon2:<time_cost>:<memory_cost in KiB>:<parallelism>; needs pip install argon2-cffi
+    from argon2 import PasswordHasher
+    _, time_cost, memory_cost, parallelism = method.split(':')
+    return PasswordHasher(time_cost=int(time_cost), memory_cost=int(memory_cost), parallelism=int(parallelism))
+
+def hash_password(method, password):
+    """Hash password with a werkzeug method string ('scrypt:32768:8:1', 'pbkdf2:sha256:600000')
+    or 'argon2:t:m:p'. The parameters are stored as part of the hash."""
+    if method.startswith('argon2'):
+        return _argon2_hasher(method).hash(password)
+    return generate_password_hash(password, method=method)
+
+def verify_password(password_hash, password):
+    """Check password against a hash made by any supported method"""
+    if password_hash.startswith(ARGON2_PREFIX):
+        try:
+            from argon2 import PasswordHasher
+            from argon2.exceptions import InvalidHashError, VerificationError
+        except ImportError:
+            raise UnsupportedPasswordHash('argon2 password hashes need argon2-cffi (pip install argon2-cffi)')
+        try:
+            return PasswordHasher().verify(password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    return check_password_hash(password_hash, password)
+
+@lru_cache(maxsize=None)
+def _method_prefix(method):
+    # werkzeug fills in defaults ('scrypt' hashes start with 'scrypt:32768:8:1'),
+    # so take the prefix of a real hash rather than the configured string
+    return generate_password_hash('', method=method).split('$', 1)[0]
+
+def needs_rehash(method, password_hash):
+    """Whether password_hash was made with other parameters than method"""
+    if method.startswith('argon2'):
+        return not password_hash.startswith(ARGON2_PREFIX) or _argon2_hasher(method).check_needs_rehash(password_hash)
+    return password_hash.split('$', 1)[0] != _method_prefix(method)
+
+class PasswordHasher:
+    """Runs password hashing and verification on a bounded thread pool.
+
+    They are the most CPU-expensive work the API does. PASSWORD_HASH_WORKERS
+    caps how many run at once in a process, so a burst of logins can't take
+    every CPU from the other endpoints. Once PASSWORD_HASH_QUEUE more jobs
+    are waiting, further requests get a 503 instead of piling up.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+        app.config.setdefault('PASSWORD_HASH_WORKERS', 2)
+        app.config.setdefault('PASSWORD_HASH_QUEUE', 32)
+
+        workers = app.config['PASSWORD_HASH_WORKERS']
+        app.extensions['password_hasher'] = {
+            'executor': ThreadPoolExecutor(workers, thread_name_prefix='password-hash'),
+            'slots': threading.BoundedSemaphore(workers + app.config['PASSWORD_HASH_QUEUE'])
+        }
+        app.register_error_handler(PasswordHasherBusy, self._busy_response)
+        app.register_error_handler(UnsupportedPasswordHash, self._unsupported_response)
+
+    @staticmethod
+    def _busy_response(error):
+        response = jsonify({'message': 'Too many logins in progress, try again shortly'})
+        response.status_code = 503
+        response.headers['Retry-After'] = '1'
+        return response
+
+    @staticmethod
+    def _unsupported_response(error):
+        current_app.logger.error('Cannot verify a stored password hash: %s', error)
+        response = jsonify({'message': 'Password verification is not available for this account, contact support'})
+        response.status_code = 500
+        return response
+
+    def _run(self, function, *args):
+        state = current_app.extensions['password_hasher']
+        if not state['slots'].acquire(blocking=False):
+            raise PasswordHasherBusy()
+        try:
+            return state['executor'].submit(function, *args).result()
+        finally:
+            state['slots'].release()
+
+    @property
+    def method(self):
+        return current_app.config['PASSWORD_HASH_METHOD']
+
+    def hash(self, password):
+        return self._run(hash_password, self.method, password)
+
+    def verify(self, password_hash, password):
+        return self._run(verify_password, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return needs_rehash(self.method, password_hash)
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,211 @@
+import math
+import time
+from collections import namedtuple
+from flask import current_app, has_request_context, jsonify, request
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+# scope is 'ip' or 'user'; name is the RATELIMIT_RULES key, which is also the bucket's namespace
+RateLimit = namedtuple('RateLimit', ['name', 'scope', 'count', 'period'])
+
+class RateLimitExceeded(Exception):
+    def __init__(self, retry_after):
+        super().__init__(f'Rate limit exceeded, retry in {retry_after:.1f}s')
+        self.retry_after = retry_after
+
+def parse_rate_limit(name, spec):
+    """RateLimit for a rule such as 'ip:10/minute' or 'user:120/minute'"""
+    scope, _, limit = spec.partition(':')
+    count, _, period = limit.partition('/')
+    if scope not in ('ip', 'user') or period not in PERIODS or not count.isdigit() or int(count) < 1:
+        raise ValueError(f'Invalid rate limit for {name}: {spec!r}')
+    return RateLimit(name, scope, int(count), PERIODS[period])
+
+def take_token(tat, now, interval, period):
+    """One step of a token bucket holding period / interval tokens, kept as a single number.
+
+    tat is the time at which the bucket will be full again (GCRA's
+    "theoretical arrival time"), or None for a full bucket. Returns
+    (new tat, 0) when a token was taken, (tat, seconds until one is
+    available) when the bucket is empty.
+    """
+    if tat is None or tat < now:
+        tat = now
+    wait = tat + interval - now - period
+    if wait > 0:
+        return tat, wait
+    return tat + interval, 0
+
+class MemoryBucketStore:
+    """Buckets of this process in a plain dict, without a lock.
+
+    Each bucket is one float, read and replaced with single dict operations
+    that the GIL makes atomic. Two threads taking from the same bucket at
+    the same instant can both succeed, so a limit may be overshot by one
+    request per concurrent thread; that is the price of not serialising
+    every request on a lock. Once max_keys buckets exist, those that have
+    refilled (and so hold no state) are dropped.
+    """
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = {}
+
+    def take(self, key, interval, period):
+        now = time.monotonic()
+        tat, wait = take_token(self._buckets.get(key), now, interval, period)
+        if not wait:
+            self._buckets[key] = tat
+            if len(self._buckets) > self.max_keys:
+                self._prune(now)
+        return wait
+
+    def _prune(self, now):
+        buckets = {key: tat for key, tat in list(self._buckets.items()) if tat > now}
+        # Still full of live buckets (e.g. a flood of distinct IPs): start over rather than grow
+        self._buckets = buckets if len(buckets) <= self.max_keys else {}
+
+    def clear(self):
+        self._buckets.clear()
+
+class RedisBucketStore:
+    """Buckets shared by every worker, for a Redis client or anything with the same eval API.
+
+    The token bucket step runs as a Lua script against the server clock, so
+    concurrent workers never overshoot a limit.
+    """
+
+    SCRIPT = """
+local now = redis.call('TIME')
+now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+local tat = tonumber(redis.call('GET', KEYS[1]))
+if tat == nil or tat < now then tat = now end
+local wait = tat + tonumber(ARGV[1]) - now - tonumber(ARGV[2])
+if wait > 0 then return tostring(wait) end
+tat = tat + tonumber(ARGV[1])
+redis.call('SET', KEYS[1], tostring(tat), 'EX', math.ceil(tat - now))
+return '0'
+"""
+
+    def __init__(self, client, prefix='finance-tracker:ratelimit:'):
+        self.client = client
+        self.prefix = prefix
+
+    def take(self, key, interval, period):
+        wait = self.client.eval(self.SCRIPT, 1, self.prefix + key, repr(interval), repr(period))
+        if isinstance(wait, bytes):
+            wait = wait.decode()
+        return float(wait)
+
+class RateLimiter:
+    """Token bucket limits per client IP or per user, configured per route or blueprint.
+
+    RATELIMIT_RULES maps an endpoint ('auth.login') or a blueprint ('auth')
+    to a rule such as 'ip:10/minute'; an endpoint rule takes precedence over
+    its blueprint's, and all routes of a blueprint rule share one bucket per
+    client. 'ip' rules are checked before the request is dispatched. 'user'
+    rules are checked by the JWT loader once the access token has been
+    verified (see app.utils.auth), so they only apply to JWT-protected
+    routes and cost no extra token decoding. Requests over a limit get a
+    429 with Retry-After.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault('RATELIMIT_ENABLED', True)
+        app.config.setdefault('RATELIMIT_STORAGE', 'memory')
+        app.config.setdefault('RATELIMIT_RULES', {})
+        app.config.setdefault('RATELIMIT_MAX_KEYS', 100000)
+        app.config.setdefault('RATELIMIT_REDIS_URL', 'redis://localhost:6379/0')
+        app.config.setdefault('RATELIMIT_REDIS_CLIENT', None)
+
+        storage = app.config['RATELIMIT_STORAGE']
+        if storage == 'memory':
+            store = MemoryBucketStore(app.config['RATELIMIT_MAX_KEYS'])
+        elif storage == 'redis':
+            client = app.config['RATELIMIT_REDIS_CLIENT']
+            if client is None:
+                import redis
+                client = redis.Redis.from_url(app.config['RATELIMIT_REDIS_URL'])
+            store = RedisBucketStore(client)
+        else:
+            raise ValueError(f'Unknown RATELIMIT_STORAGE: {storage}')
+
+        rules = {
+            name: parse_rate_limit(name, spec)
+            for name, spec in app.config['RATELIMIT_RULES'].items() if spec
+        }
+        enabled = app.config['RATELIMIT_ENABLED'] and bool(rules)
+        state = app.extensions['rate_limiter'] = {
+            'enabled': enabled,
+            'store': store,
+            'rules': rules,
+            # endpoint -> RateLimit or None, filled in as endpoints are first seen
+            'resolved': {}
+        }
+        if enabled:
+            app.before_request(self._request_hook(state))
+        app.register_error_handler(RateLimitExceeded, self._limited_response)
+
+    @property
+    def _state(self):
+        return current_app.extensions['rate_limiter']
+
+    @property
+    def store(self):
+        return self._state['store']
+
+    def rule(self, endpoint):
+        """The RateLimit that applies to endpoint, or None"""
+        return self._rule(self._state, endpoint)
+
+    @staticmethod
+    def _rule(state, endpoint):
+        resolved = state['resolved']
+        try:
+            return resolved[endpoint]
+        except KeyError:
+            rules = state['rules']
+            rule = rules.get(endpoint) or rules.get(endpoint.rpartition('.')[0])
+            resolved[endpoint] = rule
+            return rule
+
+    def hit(self, endpoint, scope, identity):
+        """Take a token for identity if endpoint has a scope rule; raises RateLimitExceeded"""
+        state = self._state
+        if not state['enabled'] or endpoint is None:
+            return
+        rule = self._rule(state, endpoint)
+        if rule is not None and rule.scope == scope:
+            self._take(state, rule, identity)
+
+    @staticmethod
+    def _take(state, rule, identity):
+        wait = state['store'].take(f'{rule.name}:{identity}', rule.period / rule.count, rule.period)
+        if wait:
+            raise RateLimitExceeded(wait)
+
+    def limit_user(self, user_id):
+        """Apply the current endpoint's 'user' rule; called once the request's token is verified"""
+        if has_request_context():
+            self.hit(request.endpoint, 'user', user_id)
+
+    def _request_hook(self, state):
+        def limit_request():
+            # Runs before every request, so state is bound here and the request proxy resolved once
+            current = request._get_current_object()
+            if current.url_rule is None:
+                return
+            rule = self._rule(state, current.url_rule.endpoint)
+            if rule is not None and rule.scope == 'ip':
+                self._take(state, rule, current.remote_addr)
+
+        return limit_request
+
+    @staticmethod
+    def _limited_response(error):
+        response = jsonify({'message': 'Too many requests'})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(math.ceil(error.retry_after))
+        return response
+
+rate_limiter = RateLimiter()
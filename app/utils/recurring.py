@@ -0,0 +1,144 @@
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import bindparam, insert, select, tuple_, update
+from app.models.recurring_transaction import RecurringTransaction
+from app.models.transaction import Transaction, dedup_hash
+from app.utils.reports import shift_months
+from app.utils.rollups import RollupEntry, update_daily_totals
+from app import db
+
+FREQUENCIES = ('daily', 'weekly', 'monthly', 'yearly')
+
+# What the materializer reads of each due schedule
+SCHEDULE_COLUMNS = [
+    'id', 'user_id', 'category_id', 'type', 'currency', 'amount_cents', 'description',
+    'frequency', 'interval', 'start_date', 'end_date', 'max_occurrences', 'occurrences', 'next_date'
+]
+
+def occurrence_date(start_date, frequency, interval, index):
+    """Date of the index-th occurrence (0 is start_date) of a cadence.
+
+    Monthly and yearly occurrences keep the day of the month of start_date,
+    clamped to the length of shorter months, so a schedule starting on
+    January 31st falls on February 28th (or 29th) and March 31st.
+    """
+    if frequency == 'daily':
+        return start_date + timedelta(days=interval * index)
+    if frequency == 'weekly':
+        return start_date + timedelta(weeks=interval * index)
+    if frequency == 'monthly':
+        return shift_months(start_date, interval * index)
+    if frequency == 'yearly':
+        return shift_months(start_date, 12 * interval * index)
+    raise ValueError(f'frequency must be one of {", ".join(FREQUENCIES)}')
+
+def next_occurrence(schedule, index):
+    """Date of a schedule's index-th occurrence, or None if it ends before that"""
+    if schedule.max_occurrences is not None and index >= schedule.max_occurrences:
+        return None
+    day = occurrence_date(schedule.start_date, schedule.frequency, schedule.interval, index)
+    if schedule.end_date is not None and day > schedule.end_date:
+        return None
+    return day
+
+def _insert_statement(dialect_name):
+    """INSERT that skips occurrences already materialized and returns the rows it wrote"""
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+
+    table = Transaction.__table__
+    return dialect_insert(table).on_conflict_do_nothing(
+        index_elements=['recurring_id', 'date']
+    ).returning(*(table.c[column] for column in RollupEntry._fields))
+
+def _insert_new(rows):
+    """Insert the rows without a transaction for the same (recurring_id, date); returns their RollupEntry"""
+    statement = _insert_statement(db.session.get_bind().dialect.name)
+    if statement is not None:
+        return [RollupEntry(*row) for row in db.session.execute(statement, rows)]
+
+    table = Transaction.__table__
+    existing = set(db.session.execute(
+        select(table.c.recurring_id, table.c.date).where(
+            tuple_(table.c.recurring_id, table.c.date).in_([(row['recurring_id'], row['date']) for row in rows])
+        )
+    ).tuples())
+    rows = [row for row in rows if (row['recurring_id'], row['date']) not in existing]
+    if rows:
+        db.session.execute(insert(table), rows)
+    return [RollupEntry(*(row[column] for column in RollupEntry._fields)) for row in rows]
+
+def materialize(schedules, today, chunk_size):
+    """Insert the occurrences of schedules due on or before today and move them to their next date.
+
+    schedules are rows (or RecurringTransaction objects) with the
+    SCHEDULE_COLUMNS. Occurrences are inserted with one executemany INSERT
+    per chunk_size rows and rolled up once; an occurrence that already
+    exists is skipped, so running again, or concurrently, adds nothing. The
+    caller commits. Returns the number of transactions created.
+    """
+    now = datetime.utcnow()
+    rows = []
+    advanced = []
+    for schedule in schedules:
+        index, day = schedule.occurrences, schedule.next_date
+        while day is not None and day <= today:
+            rows.append({
+                'amount_cents': schedule.amount_cents,
+                'currency': schedule.currency,
+                'description': schedule.description,
+                'date': day,
+                'type': schedule.type,
+                'user_id': schedule.user_id,
+                'category_id': schedule.category_id,
+                'recurring_id': schedule.id,
+                'dedup_hash': dedup_hash(day, schedule.amount_cents, schedule.type, schedule.description),
+                'created_at': now,
+                'updated_at': now
+            })
+            index += 1
+            day = next_occurrence(schedule, index)
+        advanced.append({'schedule_id': schedule.id, 'occurrences': index, 'next_date': day, 'updated_at': now})
+
+    added = []
+    for start in range(0, len(rows), chunk_size):
+        added.extend(_insert_new(rows[start:start + chunk_size]))
+    update_daily_totals(added=added)
+
+    if advanced:
+        table = RecurringTransaction.__table__
+        db.session.execute(update(table).where(table.c.id == bindparam('schedule_id')), advanced)
+    return len(added)
+
+def materialize_due(today=None, chunk_size=None):
+    """Materialize every schedule due on or before today, for all users, in chunks.
+
+    Due schedules are read chunk_size at a time in (next_date, id) order
+    through ix_recurring_transactions_next_date, and each chunk is committed
+    on its own. Materialized schedules move past today, so the next read
+    picks up where the last chunk left off. On PostgreSQL rows locked by a
+    concurrent run are skipped. Returns (schedules, transactions created).
+    """
+    today = today or datetime.utcnow().date()
+    chunk_size = chunk_size or current_app.config['RECURRING_CHUNK_SIZE']
+    table = RecurringTransaction.__table__
+
+    schedules = created = 0
+    while True:
+        due = db.session.execute(
+            select(*(table.c[column] for column in SCHEDULE_COLUMNS))
+            .where(table.c.next_date <= today)
+            .order_by(table.c.next_date, table.c.id)
+            .limit(chunk_size)
+            .with_for_update(skip_locked=True)
+        ).all()
+        if not due:
+            break
+        created += materialize(due, today, chunk_size)
+        db.session.commit()
+        schedules += len(due)
+    return schedules, created
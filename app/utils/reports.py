@@ -0,0 +1,137 @@
+import json
+import re
+from calendar import monthrange
+from datetime import date, datetime, timedelta
+from flask import current_app
+from app.signals import daily_totals_rebuilt, rates_changed, transactions_changed
+from app.utils.cache import RedisBackend, cache
+from app.utils.helpers import get_date_range, get_spending_summary, missing_rate_currencies
+
+REPORT_PERIODS = ('today', 'yesterday', 'this_week', 'this_month', 'last_month', 'this_year', 'last_year')
+
+YEAR = re.compile(r'^\d{4}$')
+MONTH = re.compile(r'^\d{4}-\d{2}$')
+
+def shift_months(day, months):
+    """day moved by a number of months, clamped to the length of the target month"""
+    year, month = divmod(day.year * 12 + day.month - 1 + months, 12)
+    return date(year, month + 1, min(day.day, monthrange(year, month + 1)[1]))
+
+def report_period(period):
+    """((start, end), (previous start, previous end)) of a report period.
+
+    period is one of REPORT_PERIODS, a year ('2023') or a month ('2023-04').
+    The previous period is the same span one step back, so month-to-date
+    is compared with the same days of the month before. Raises ValueError
+    with a message for the client on an unknown period.
+    """
+    if period in REPORT_PERIODS:
+        start, end = get_date_range(period)
+    elif YEAR.match(period) and int(period) > 1:
+        start, end = date(int(period), 1, 1), date(int(period), 12, 31)
+    elif MONTH.match(period) and int(period[:4]) > 1 and 1 <= int(period[5:]) <= 12:
+        year, month = int(period[:4]), int(period[5:])
+        start, end = date(year, month, 1), date(year, month, monthrange(year, month)[1])
+    else:
+        raise ValueError(f'period must be one of: {", ".join(REPORT_PERIODS)}, a year (YYYY) or a month (YYYY-MM)')
+
+    if period in ('today', 'yesterday', 'this_week'):
+        step = timedelta(days=7 if period == 'this_week' else 1)
+        return (start, end), (start - step, end - step)
+
+    months = 1 if period in ('this_month', 'last_month') or MONTH.match(period) else 12
+    previous_end = shift_months(end, -months)
+    # A period that runs to the end of a month is compared with a whole month too
+    if end.day == monthrange(end.year, end.month)[1]:
+        previous_end = previous_end.replace(day=monthrange(previous_end.year, previous_end.month)[1])
+    return (start, end), (shift_months(start, -months), previous_end)
+
+def _months(start, end):
+    """'YYYY-MM' of every month from start to end"""
+    month = start.replace(day=1)
+    while month <= end:
+        yield month.strftime('%Y-%m')
+        month = shift_months(month, 1)
+
+class SpendingMemo:
+    """Memo of per-category spending totals for closed periods, per user.
+
+    A period that ended before today only changes when a transaction dated
+    inside it is written, so its totals are kept in the response cache
+    backend for SPENDING_MEMO_TIMEOUT seconds. Keys carry a version counter
+    per (user, month) that commits touching that month's expenses advance
+    (see the transactions_changed signal). A purchase made today thus leaves
+    last month's and last year's totals cached, while a backdated one drops
+    just the periods containing its date. Periods that include today are
+    always computed; the daily_category_totals index keeps that cheap.
+
+    Only a Redis backend shares the version counters between processes. With
+    any other backend a write handled by one worker cannot reach another's
+    memo, so the timeout is capped at CACHE_DEFAULT_TIMEOUT, the staleness
+    already accepted for cached responses.
+    """
+
+    def init_app(self, app):
+        app.config.setdefault('SPENDING_MEMO_TIMEOUT', 86400)
+
+    def timeout(self):
+        timeout = current_app.config['SPENDING_MEMO_TIMEOUT']
+        if isinstance(cache.backend, RedisBackend):
+            return timeout
+        return min(timeout, current_app.config['CACHE_DEFAULT_TIMEOUT'])
+
+    def key(self, user_id, start, end, currency):
+        versions = [cache.version('spending'), cache.version(f'spending:{user_id}')]
+        versions.extend(cache.version(f'spending:{user_id}:{month}') for month in _months(start, end))
+        return f'spending:{user_id}:{currency}:{start.isoformat()}:{end.isoformat()}:' + \
+            '.'.join(str(version) for version in versions)
+
+    def totals(self, user_id, start, end, currency):
+        """({category_id: expense cents}, currencies without a rate) for a user and date range,
+        memoized once the range is closed"""
+        if end >= datetime.utcnow().date():
+            return self._compute(user_id, start, end, currency)
+
+        key = self.key(user_id, start, end, currency)
+        value = cache.backend.get(key)
+        if value is not None:
+            value = json.loads(value)
+            return {int(category_id): cents for category_id, cents in value['totals'].items()}, value['missing_rates']
+
+        totals, missing_rates = self._compute(user_id, start, end, currency)
+        cache.backend.set(key, json.dumps({'totals': totals, 'missing_rates': missing_rates}), self.timeout())
+        return totals, missing_rates
+
+    @staticmethod
+    def _compute(user_id, start, end, currency):
+        totals = {row.category_id: row.total_cents for row in get_spending_summary(user_id, start, end, currency)}
+        return totals, missing_rate_currencies(user_id, currency, start, end, type='expense')
+
+    def forget_months(self, user_id, months):
+        for month in months:
+            cache.bump(f'spending:{user_id}:{month}')
+
+    def forget_user(self, user_id):
+        cache.bump(f'spending:{user_id}')
+
+    def forget_all(self):
+        cache.bump('spending')
+
+spending_memo = SpendingMemo()
+
+@transactions_changed.connect
+def _forget_changed_months(app, changes):
+    months = {(change['user_id'], change['date'].strftime('%Y-%m')) for change in changes if change['type'] == 'expense'}
+    for user_id, month in months:
+        spending_memo.forget_months(user_id, [month])
+
+@daily_totals_rebuilt.connect
+def _forget_rebuilt_totals(app, user_id):
+    if user_id is None:
+        spending_memo.forget_all()
+    else:
+        spending_memo.forget_user(user_id)
+
+@rates_changed.connect
+def _forget_converted_totals(app):
+    spending_memo.forget_all()
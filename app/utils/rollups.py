@@ -0,0 +1,177 @@
+from collections import defaultdict, namedtuple
+from flask import current_app
+from sqlalchemy import delete, event, func, insert, select
+from app.database import RoutingSession
+from app.models.daily_category_total import DailyCategoryTotal
+from app.models.transaction import Transaction
+from app.signals import daily_totals_rebuilt, transactions_changed, transactions_committing
+from app import db
+
+# The part of a transaction that the daily_category_totals table depends on
+RollupEntry = namedtuple('RollupEntry', ['user_id', 'category_id', 'type', 'date', 'currency', 'amount_cents'])
+
+KEY_COLUMNS = ['user_id', 'category_id', 'type', 'date', 'currency']
+
+def rollup_entry(transaction):
+    """Snapshot the rollup key and amount of a transaction"""
+    return RollupEntry(
+        transaction.user_id,
+        transaction.category_id,
+        transaction.type,
+        transaction.date,
+        transaction.currency,
+        transaction.amount_cents
+    )
+
+def _upsert_statement(dialect_name):
+    """INSERT ... ON CONFLICT statement that adds to an existing daily total"""
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        return None
+
+    table = DailyCategoryTotal.__table__
+    stmt = dialect_insert(table)
+    return stmt.on_conflict_do_update(
+        index_elements=KEY_COLUMNS,
+        set_={
+            'amount_cents': table.c.amount_cents + stmt.excluded.amount_cents,
+            'count': table.c.count + stmt.excluded.count
+        }
+    )
+
+def update_daily_totals(added=(), removed=()):
+    """Apply added/removed RollupEntry rows to daily_category_totals.
+
+    Runs in the caller's session, so the totals are committed (or rolled
+    back) together with the transaction rows they describe. Entries are
+    merged per key first, so a batch costs one statement per distinct
+    (user, category, type, date, currency). The changes are announced
+    through the transactions_committing signal just before the session
+    commits, and the transactions_changed signal once it has.
+    """
+    deltas = defaultdict(lambda: [0, 0])
+    for entry in added:
+        delta = deltas[entry[:5]]
+        delta[0] += entry.amount_cents
+        delta[1] += 1
+    for entry in removed:
+        delta = deltas[entry[:5]]
+        delta[0] -= entry.amount_cents
+        delta[1] -= 1
+
+    # A move within the same key (e.g. an amount-only edit) may cancel out
+    rows = [
+        dict(zip(KEY_COLUMNS, key), amount_cents=amount_cents, count=count)
+        for key, (amount_cents, count) in deltas.items()
+        if amount_cents or count
+    ]
+    if not rows:
+        return
+    db.session.info.setdefault('rollup_changes', []).extend(rows)
+
+    upsert = _upsert_statement(db.session.get_bind().dialect.name)
+    if upsert is not None:
+        db.session.execute(upsert, rows)
+    else:
+        for row in rows:
+            total = db.session.get(DailyCategoryTotal, tuple(row[column] for column in KEY_COLUMNS))
+            if total:
+                total.amount_cents += row['amount_cents']
+                total.count += row['count']
+            else:
+                db.session.add(DailyCategoryTotal(**row))
+        db.session.flush()
+
+    # Drop the days whose last transaction was removed
+    db.session.execute(delete(DailyCategoryTotal).where(
+        DailyCategoryTotal.user_id.in_({row['user_id'] for row in rows}),
+        DailyCategoryTotal.count <= 0
+    ))
+
+@event.listens_for(RoutingSession, 'before_commit')
+def _prepare_changes(session):
+    changes = session.info.get('rollup_changes')
+    if changes:
+        transactions_committing.send(current_app._get_current_object(), changes=changes)
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _announce_changes(session):
+    changes = session.info.pop('rollup_changes', None)
+    if changes:
+        transactions_changed.send(current_app._get_current_object(), changes=changes)
+
+@event.listens_for(RoutingSession, 'after_rollback')
+def _forget_changes(session):
+    session.info.pop('rollup_changes', None)
+
+def _grouped_transactions(user_id=None):
+    """SELECT that computes daily_category_totals rows from the transactions table"""
+    query = select(
+        Transaction.user_id,
+        Transaction.category_id,
+        Transaction.type,
+        Transaction.date,
+        Transaction.currency,
+        func.sum(Transaction.amount_cents),
+        func.count()
+    ).group_by(
+        Transaction.user_id,
+        Transaction.category_id,
+        Transaction.type,
+        Transaction.date,
+        Transaction.currency
+    )
+    if user_id is not None:
+        query = query.where(Transaction.user_id == user_id)
+    return query
+
+def rebuild_daily_totals(user_id=None):
+    """Recompute daily_category_totals from the transactions table (one user or everyone)"""
+    clear = delete(DailyCategoryTotal)
+    if user_id is not None:
+        clear = clear.where(DailyCategoryTotal.user_id == user_id)
+    db.session.execute(clear)
+    db.session.execute(insert(DailyCategoryTotal).from_select(
+        KEY_COLUMNS + ['amount_cents', 'count'],
+        _grouped_transactions(user_id)
+    ))
+    db.session.commit()
+    daily_totals_rebuilt.send(current_app._get_current_object(), user_id=user_id)
+
+def check_daily_totals(user_id=None):
+    """Compare daily_category_totals against the transactions table.
+
+    Returns a list of mismatches; an empty list means the rollup is
+    consistent. Users are checked one at a time to keep memory bounded.
+    """
+    if user_id is not None:
+        user_ids = [user_id]
+    else:
+        user_ids = db.session.execute(
+            select(Transaction.user_id).union(select(DailyCategoryTotal.user_id))
+        ).scalars().all()
+
+    mismatches = []
+    for uid in user_ids:
+        expected = {
+            tuple(row[:5]): (row[5], row[6])
+            for row in db.session.execute(_grouped_transactions(uid))
+        }
+        actual = {
+            (row.user_id, row.category_id, row.type, row.date, row.currency): (row.amount_cents, row.count)
+            for row in DailyCategoryTotal.query.filter_by(user_id=uid)
+        }
+        for key in expected.keys() | actual.keys():
+            expected_amount, expected_count = expected.get(key, (0, 0))
+            actual_amount, actual_count = actual.get(key, (0, 0))
+            if (expected_amount, expected_count) != (actual_amount, actual_count):
+                mismatches.append({
+                    'key': dict(zip(KEY_COLUMNS, key)),
+                    'expected': {'amount_cents': expected_amount, 'count': expected_count},
+                    'actual': {'amount_cents': actual_amount, 'count': actual_count}
+                })
+
+    return mismatches
@@ -0,0 +1,122 @@
+import json
+from json.encoder import encode_basestring_ascii
+from flask import current_app
+from sqlalchemy import Float, and_, case, cast, distinct, func
+from app.models.budget import Budget
+from app.models.category import Category
+from app.models.daily_category_total import DailyCategoryTotal
+from app.models.transaction import Transaction
+from app.utils.fx import converted_cents, rate_expression
+from app.utils.money import CENTS_PER_UNIT
+
+# JSON expression for each field type, formatted with the row item to encode
+_ENCODERS = {
+    'int': 'str({value})',
+    'float': '_number({value})',
+    'cents': '_number({value} / ' + str(CENTS_PER_UNIT) + ')',
+    'str': '_string({value})',
+    'date': '\'"\' + {value}.isoformat() + \'"\''
+}
+
+def _number(value):
+    # Matches json.dumps: floats via repr, whole numbers (e.g. from SUM) as ints
+    return float.__repr__(value) if isinstance(value, float) else str(value)
+
+class RowSerializer:
+    """Writes SQL result rows straight to JSON text, without building ORM objects or dicts.
+
+    Fields are (column, type) pairs, where type is one of int, float,
+    cents (integer cents written as currency units), str or date (also
+    used for datetimes). The pairs are compiled once into a
+    function that concatenates the JSON for a row; keys come out sorted,
+    so the output is byte-for-byte what jsonify() gives for the same dict.
+    """
+
+    def __init__(self, fields):
+        self.columns = [column for column, _ in fields]
+        self.names = [column.key for column in self.columns]
+        self._serialize = self._compile([field_type for _, field_type in fields])
+
+    def _compile(self, types):
+        members = []
+        for name, index in sorted((name, index) for index, name in enumerate(self.names)):
+            value = f'row[{index}]'
+            encoded = _ENCODERS[types[index]].format(value=value)
+            members.append(f'{json.dumps(json.dumps(name) + ":")} + ("null" if {value} is None else {encoded})')
+        source = 'def serialize(row):\n    return "{" + ' + ' + "," + '.join(members) + ' + "}"\n'
+        namespace = {'_number': _number, '_string': encode_basestring_ascii}
+        exec(source, namespace)
+        return namespace['serialize']
+
+    def serialize(self, row):
+        """JSON object for one row"""
+        return self._serialize(row)
+
+    def serialize_many(self, rows):
+        """JSON array for a sequence of rows"""
+        serialize = self._serialize
+        return '[' + ','.join([serialize(row) for row in rows]) + ']'
+
+def json_envelope(key, rows_json, **extra):
+    """JSON text wrapping an already serialized JSON array as {key: [...], **extra}"""
+    members = {key: rows_json}
+    members.update({name: json.dumps(value) for name, value in extra.items()})
+    return '{' + ','.join(f'{json.dumps(name)}:{members[name]}' for name in sorted(members)) + '}'
+
+def json_response(key, rows_json, status=200, **extra):
+    """Response wrapping an already serialized JSON array as {key: [...], **extra}"""
+    return current_app.response_class(json_envelope(key, rows_json, **extra), status=status, mimetype='application/json')
+
+TRANSACTION_SERIALIZER = RowSerializer([
+    (Transaction.id, 'int'),
+    (Transaction.amount_cents.label('amount'), 'cents'),
+    (Transaction.currency, 'str'),
+    (Transaction.description, 'str'),
+    (Transaction.date, 'date'),
+    (Transaction.type, 'str'),
+    (Transaction.user_id, 'int'),
+    (Transaction.category_id, 'int'),
+    (Category.name.label('category_name'), 'str'),
+    (Transaction.created_at, 'date'),
+    (Transaction.updated_at, 'date')
+])
+
+CATEGORY_SERIALIZER = RowSerializer([
+    (Category.id, 'int'),
+    (Category.name, 'str'),
+    (Category.description, 'str'),
+    (Category.color, 'str'),
+    (Category.user_id, 'int'),
+    (Category.created_at, 'date'),
+    (Category.updated_at, 'date')
+])
+
+# Budget spending is aggregated from the daily rollup rows joined to each budget,
+# converted to the budget's currency
+_budget_spent = func.coalesce(func.sum(converted_cents(
+    DailyCategoryTotal.amount_cents, DailyCategoryTotal.currency, Budget.currency, DailyCategoryTotal.date
+)), 0)
+# Days left out of the spending above for lack of a rate
+_budget_unconverted_days = func.count(distinct(case((and_(
+    DailyCategoryTotal.currency != Budget.currency,
+    rate_expression(DailyCategoryTotal.currency, Budget.currency, DailyCategoryTotal.date).is_(None)
+), DailyCategoryTotal.date))))
+
+BUDGET_SERIALIZER = RowSerializer([
+    (Budget.id, 'int'),
+    (Budget.amount_cents.label('amount'), 'cents'),
+    (Budget.currency, 'str'),
+    (Budget.start_date, 'date'),
+    (Budget.end_date, 'date'),
+    (Budget.user_id, 'int'),
+    (Budget.category_id, 'int'),
+    (Category.name.label('category_name'), 'str'),
+    (Budget.created_at, 'date'),
+    (Budget.updated_at, 'date'),
+    (_budget_spent.label('spent'), 'cents'),
+    ((Budget.amount_cents - _budget_spent).label('remaining'), 'cents'),
+    (case(
+        (Budget.amount_cents > 0, cast(_budget_spent, Float) * 100 / Budget.amount_cents), else_=0
+    ).label('percentage_used'), 'float'),
+    (_budget_unconverted_days.label('unconverted_days'), 'int')
+])
@@ -0,0 +1,5 @@
+import os
+from app.asgi import create_asgi_app
+from app.config import CONFIGS
+
+app = create_asgi_app(CONFIGS[os.environ.get('APP_CONFIG', 'default')])
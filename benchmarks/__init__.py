@@ -0,0 +1,2 @@
+# Standalone performance benchmarks; run them from the repository root with
+# `python -m benchmarks.<name>`
@@ -0,0 +1,49 @@
+"""Cost of anomaly scoring on POST /api/transactions.
+
+Times AnomalyDetector.check with the category's amounts loaded (a full
+ANOMALY_WINDOW, recomputing the median after each new amount as a write
+would), then the whole create request with detection off and on.
+
+    python -m benchmarks.anomaly_detection [requests]
+"""
+import random
+import sys
+import time
+from app.models.transaction import Transaction
+from app.utils.anomalies import anomaly_detector
+from benchmarks.common import benchmark_app, register_user
+
+def main(count=500):
+    for enabled in (False, True):
+        with benchmark_app(ANOMALY_DETECTION_ENABLED=enabled, RATELIMIT_ENABLED=False, METRICS_ENABLED=False) as app:
+            client = app.test_client()
+            headers, category_id = register_user(client)
+            client.post('/api/transactions/bulk', json=[
+                {'amount': random.randint(10, 90), 'type': 'expense', 'category_id': category_id,
+                 'date': f'2024-{month:02d}-{day:02d}'}
+                for month in range(1, 13) for day in range(1, 29)
+            ], headers=headers)
+
+            if enabled:
+                with app.test_request_context():
+                    transaction = Transaction(user_id=1, category_id=category_id, type='expense',
+                                              currency='USD', amount_cents=5000)
+                    anomaly_detector.check(transaction)
+                    model = anomaly_detector._model(transaction)
+                    start = time.perf_counter()
+                    for _ in range(count):
+                        model.add(5000)
+                        anomaly_detector.check(transaction)
+                    print(f'{"check (median refreshed)":<32} {(time.perf_counter() - start) / count * 1e6:8.1f} us')
+
+            start = time.perf_counter()
+            for _ in range(count):
+                client.post('/api/transactions', json={
+                    'amount': random.randint(10, 90), 'type': 'expense', 'category_id': category_id,
+                    'date': '2024-12-31'
+                }, headers=headers)
+            label = f'create ({"detection on" if enabled else "detection off"})'
+            print(f'{label:<32} {(time.perf_counter() - start) / count * 1000:8.2f} ms')
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,88 @@
+"""Requests/sec and latency of the read endpoints: gunicorn sync workers vs the ASGI app under uvicorn.
+
+Seeds a throwaway SQLite file, then serves it with `gunicorn run:app` and
+`uvicorn asgi:app` (same worker count) and hits the transaction list and
+summary from many concurrent keep-alive clients. The response cache is
+disabled so every request reaches the database.
+
+    python -m benchmarks.async_serving [workers] [clients] [requests per client] [rows]
+"""
+import http.client
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app import create_app
+from app.config import Config
+from benchmarks.bulk_import import make_rows
+from benchmarks.common import register_user
+from benchmarks.concurrent_writes import free_port, request, wait_until_up
+
+ENDPOINTS = ['/api/transactions?limit=100', '/api/transactions/summary?group_by=month']
+
+def seed(path, count):
+    class SeedConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + path
+
+    client = create_app(SeedConfig).test_client()
+    headers, category_id = register_user(client)
+    rows = make_rows(count, category_id)
+    for start in range(0, count, 50000):
+        client.post('/api/transactions/bulk', json=rows[start:start + 50000], headers=headers)
+
+def client_loop(port, headers, url, count):
+    """Issue count GETs over one keep-alive connection; returns (latencies, failures)"""
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    latencies = []
+    failures = 0
+    for _ in range(count):
+        start = time.perf_counter()
+        status, _ = request(conn, 'GET', url, headers=headers)
+        latencies.append(time.perf_counter() - start)
+        if status != 200:
+            failures += 1
+    return latencies, failures
+
+def run(label, command, env, clients, per_client):
+    port = free_port()
+    server = subprocess.Popen([arg.format(port=port) for arg in command], env=env)
+    try:
+        wait_until_up(port)
+        conn = http.client.HTTPConnection('127.0.0.1', port)
+        _, data = request(conn, 'POST', '/api/auth/login', {'username': 'bench', 'password': 'password123'})
+        headers = {'Authorization': f'Bearer {data["access_token"]}'}
+
+        for url in ENDPOINTS:
+            start = time.perf_counter()
+            with ThreadPoolExecutor(clients) as pool:
+                results = list(pool.map(lambda _: client_loop(port, headers, url, per_client), range(clients)))
+            elapsed = time.perf_counter() - start
+
+            latencies = sorted(latency for result in results for latency in result[0])
+            failures = sum(result[1] for result in results)
+            p50 = latencies[len(latencies) // 2] * 1000
+            p99 = latencies[int(len(latencies) * 0.99)] * 1000
+            print(f'{label:<10} {url:<42} {len(latencies) / elapsed:8,.0f} req/s  '
+                  f'p50 {p50:7.1f} ms  p99 {p99:7.1f} ms  {failures} failed')
+    finally:
+        server.terminate()
+        server.wait()
+
+def main(workers=4, clients=64, per_client=50, rows=100000):
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'bench.db')
+    seed(path, rows)
+
+    env = {**os.environ, 'DATABASE_URL': 'sqlite:///' + path, 'CACHE_BACKEND': 'null'}
+    print(f'{rows:,} transactions, {workers} workers, {clients} clients x {per_client} requests')
+    run('gunicorn', [
+        'gunicorn', '-w', str(workers), '-b', '127.0.0.1:{port}', '--log-level', 'warning', 'run:app'
+    ], env, clients, per_client)
+    run('uvicorn', [
+        'uvicorn', 'asgi:app', '--workers', str(workers), '--port', '{port}', '--log-level', 'warning', '--no-access-log'
+    ], env, clients, per_client)
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:5]))
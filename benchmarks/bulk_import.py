@@ -0,0 +1,44 @@
+"""Throughput of POST /api/transactions/bulk against one-request-per-row inserts.
+
+    python -m benchmarks.bulk_import [rows]
+"""
+import json
+import sys
+from datetime import date, timedelta
+from benchmarks.common import benchmark_app, register_user, timed, to_ndjson
+
+def make_rows(count, category_id):
+    start = date(2015, 1, 1)
+    return [{
+        'amount': round(5 + (i % 500) * 0.37, 2),
+        'type': 'expense' if i % 7 else 'income',
+        'category_id': category_id,
+        'date': (start + timedelta(days=i % 3650)).isoformat(),
+        'description': f'Bank sync row {i}'
+    } for i in range(count)]
+
+def main(count=50000):
+    with benchmark_app() as app:
+        client = app.test_client()
+        headers, category_id = register_user(client)
+        rows = make_rows(count, category_id)
+
+        body = json.dumps(rows)
+        with timed(f'bulk JSON array ({count:,} rows)', count):
+            response = client.post('/api/transactions/bulk', data=body, headers=headers,
+                                   content_type='application/json')
+        assert response.get_json()['created'] == count
+
+        body = to_ndjson(rows)
+        with timed(f'bulk NDJSON ({count:,} rows)', count):
+            response = client.post('/api/transactions/bulk', data=body, headers=headers,
+                                   content_type='application/x-ndjson')
+        assert response.get_json()['created'] == count
+
+        single = rows[:1000]
+        with timed(f'POST /api/transactions ({len(single):,} rows)', len(single)):
+            for row in single:
+                client.post('/api/transactions', json=row, headers=headers)
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000)
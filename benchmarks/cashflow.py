@@ -0,0 +1,65 @@
+"""Time of GET /api/reports/cashflow over years of daily totals.
+
+Seeds daily_category_totals directly with one expense row per category and
+day, plus a monthly income, then times cashflow_report alone and the whole
+request (with the response cache off) for each grouping over the full range.
+
+    python -m benchmarks.cashflow [years] [categories]
+"""
+import random
+import sys
+import time
+from datetime import date, timedelta
+from sqlalchemy import insert
+from app import db
+from app.models.daily_category_total import DailyCategoryTotal
+from benchmarks.common import benchmark_app, register_user
+
+def seed(user_id, category_ids, start, days):
+    rows = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        for category_id in category_ids[1:]:
+            rows.append({'user_id': user_id, 'category_id': category_id, 'type': 'expense', 'date': day,
+                         'currency': 'USD', 'amount_cents': random.randint(100, 20000), 'count': 1})
+        if day.day == 1:
+            rows.append({'user_id': user_id, 'category_id': category_ids[0], 'type': 'income', 'date': day,
+                         'currency': 'USD', 'amount_cents': 500000, 'count': 1})
+    db.session.execute(insert(DailyCategoryTotal), rows)
+    db.session.commit()
+    return len(rows)
+
+def best_ms(function, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+def main(years=10, categories=8):
+    from app.utils.cashflow import cashflow_report
+
+    with benchmark_app(CACHE_BACKEND='null', RATELIMIT_ENABLED=False, METRICS_ENABLED=False) as app:
+        client = app.test_client()
+        headers, category_id = register_user(client)
+        category_ids = [category_id]
+        for number in range(categories):
+            response = client.post('/api/categories', json={'name': f'Category {number}'}, headers=headers)
+            category_ids.append(response.get_json()['category']['id'])
+
+        end = date(2024, 12, 31)
+        start = end - timedelta(days=365 * years)
+        with app.app_context():
+            count = seed(1, category_ids, start, (end - start).days + 1)
+        print(f'{count:,} daily total rows over {years} years and {categories + 1} categories')
+
+        for group_by in ('month', 'week', 'day'):
+            with app.app_context():
+                compute = best_ms(lambda: cashflow_report(1, start, end, group_by, 'USD'))
+            url = f'/api/reports/cashflow?start_date={start}&end_date={end}&group_by={group_by}'
+            request = best_ms(lambda: client.get(url, headers=headers))
+            print(f'{group_by:<8} cashflow_report {compute:7.1f} ms   request {request:7.1f} ms')
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
@@ -0,0 +1,54 @@
+import json
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from app import create_app, db
+from app.config import Config
+
+@contextmanager
+def benchmark_app(**config):
+    """Create an app backed by a throwaway SQLite file"""
+    directory = tempfile.mkdtemp()
+
+    class BenchmarkConfig(Config):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + os.path.join(directory, 'bench.db')
+
+    for key, value in config.items():
+        setattr(BenchmarkConfig, key, value)
+
+    app = create_app(BenchmarkConfig)
+    with app.app_context():
+        db.create_all()
+    try:
+        yield app
+    finally:
+        with app.app_context():
+            db.drop_all()
+            db.engine.dispose()
+
+def register_user(client, username='bench'):
+    """Register and log in a user; returns (auth headers, category id)"""
+    client.post('/api/auth/register', json={
+        'username': username,
+        'email': f'{username}@example.com',
+        'password': 'password123'
+    })
+    response = client.post('/api/auth/login', json={'username': username, 'password': 'password123'})
+    headers = {'Authorization': f'Bearer {response.get_json()["access_token"]}'}
+    response = client.post('/api/categories', json={'name': 'Groceries'}, headers=headers)
+    return headers, response.get_json()['category']['id']
+
+@contextmanager
+def timed(label, count=None, unit='rows'):
+    """Print the wall time (and throughput) of the enclosed block"""
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    if count:
+        print(f'{label:<40} {elapsed:8.3f}s  {count / elapsed:12,.0f} {unit}/s')
+    else:
+        print(f'{label:<40} {elapsed:8.3f}s')
+
+def to_ndjson(rows):
+    return '\n'.join(json.dumps(row) for row in rows)
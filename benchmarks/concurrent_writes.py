@@ -0,0 +1,120 @@
+"""Write throughput of POST /api/transactions under concurrent gunicorn workers.
+
+Starts gunicorn on a throwaway SQLite file (or DATABASE_URL, if set) and
+posts transactions from several client threads, once with the default
+SQLite pragmas (WAL, synchronous=NORMAL, busy_timeout) and once with
+SQLite's own defaults, which is how the app ran before.
+
+    python -m benchmarks.concurrent_writes [workers] [clients] [requests per client]
+"""
+import http.client
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+LEGACY_SQLITE = {
+    'SQLITE_JOURNAL_MODE': 'DELETE',
+    'SQLITE_SYNCHRONOUS': 'FULL',
+    'SQLITE_BUSY_TIMEOUT_MS': '0'
+}
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def request(conn, method, path, body=None, headers=None):
+    conn.request(method, path, json.dumps(body) if body is not None else None,
+                 {'Content-Type': 'application/json', **(headers or {})})
+    response = conn.getresponse()
+    body = response.read()
+    if response.getheader('Content-Type', '').startswith('application/json'):
+        return response.status, json.loads(body)
+    return response.status, None
+
+def wait_until_up(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            if request(conn, 'GET', '/api/health')[0] == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError('gunicorn did not start')
+
+def setup_user(port):
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    request(conn, 'POST', '/api/auth/register', {
+        'username': 'bench', 'email': 'bench@example.com', 'password': 'password123'
+    })
+    _, data = request(conn, 'POST', '/api/auth/login', {'username': 'bench', 'password': 'password123'})
+    headers = {'Authorization': f'Bearer {data["access_token"]}'}
+    _, data = request(conn, 'POST', '/api/categories', {'name': 'Groceries'}, headers)
+    return headers, data['category']['id']
+
+def client_loop(port, headers, category_id, count):
+    """Post count transactions over one keep-alive connection; returns {status: n}"""
+    conn = http.client.HTTPConnection('127.0.0.1', port)
+    statuses = {}
+    for i in range(count):
+        status, _ = request(conn, 'POST', '/api/transactions', {
+            'amount': 1 + i % 50,
+            'type': 'expense',
+            'category_id': category_id,
+            'date': f'2024-01-{1 + i % 28:02d}'
+        }, headers)
+        statuses[status] = statuses.get(status, 0) + 1
+    return statuses
+
+def run(label, workers, clients, per_client, extra_env):
+    directory = tempfile.mkdtemp()
+    env = {
+        **os.environ,
+        'DATABASE_URL': os.environ.get('DATABASE_URL', 'sqlite:///' + os.path.join(directory, 'bench.db')),
+        'CACHE_BACKEND': 'null',
+        **extra_env
+    }
+    # Create the schema once, before the workers race to do it
+    subprocess.run([sys.executable, '-c', 'import run'], env=env, check=True)
+
+    port = free_port()
+    server = subprocess.Popen(
+        ['gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}', '--log-level', 'warning', 'run:app'],
+        env=env
+    )
+    try:
+        wait_until_up(port)
+        headers, category_id = setup_user(port)
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(clients) as pool:
+            results = list(pool.map(
+                lambda _: client_loop(port, headers, category_id, per_client), range(clients)
+            ))
+        elapsed = time.perf_counter() - start
+    finally:
+        server.terminate()
+        server.wait()
+
+    statuses = {}
+    for result in results:
+        for status, count in result.items():
+            statuses[status] = statuses.get(status, 0) + count
+    created = statuses.get(201, 0)
+    failed = sum(count for status, count in statuses.items() if status != 201)
+    print(f'{label:<28} {created / elapsed:8,.0f} writes/s  {created:6,} created  {failed:6,} failed')
+
+def main(workers=4, clients=16, per_client=200):
+    print(f'{workers} gunicorn workers, {clients} clients x {per_client} requests')
+    run('WAL + busy_timeout', workers, clients, per_client, {})
+    if not os.environ.get('DATABASE_URL'):
+        run('SQLite defaults', workers, clients, per_client, LEGACY_SQLITE)
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,47 @@
+"""Time-to-first-byte, throughput and peak Python memory of GET /api/transactions/export.
+
+    python -m benchmarks.export [rows]
+"""
+import sys
+import time
+import tracemalloc
+from benchmarks.bulk_import import make_rows
+from benchmarks.common import benchmark_app, register_user
+
+def stream(client, url, headers):
+    """Consume a streamed response; returns (seconds to first chunk, total seconds, bytes)"""
+    start = time.perf_counter()
+    response = client.get(url, headers=headers, buffered=False)
+    first_byte = None
+    size = 0
+    for chunk in response.response:
+        if first_byte is None:
+            first_byte = time.perf_counter() - start
+        size += len(chunk)
+    response.close()
+    return first_byte, time.perf_counter() - start, size
+
+def main(count=200000):
+    with benchmark_app() as app:
+        client = app.test_client()
+        headers, category_id = register_user(client)
+        rows = make_rows(count, category_id)
+        for start in range(0, count, 50000):
+            client.post('/api/transactions/bulk', json=rows[start:start + 50000], headers=headers)
+        del rows
+
+        for export_format in ('csv', 'ndjson', 'parquet'):
+            url = f'/api/transactions/export?format={export_format}'
+            first_byte, elapsed, size = stream(client, url, headers)
+
+            # Separate pass for memory: tracemalloc slows everything down
+            tracemalloc.start()
+            stream(client, url, headers)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            print(f'{export_format:<8} {count:,} rows  first byte {first_byte * 1000:7.1f} ms  '
+                  f'total {elapsed:6.2f}s  {size / 2**20:7.1f} MiB out  peak {peak / 2**20:6.1f} MiB')
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200000)
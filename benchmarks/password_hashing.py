@@ -0,0 +1,79 @@
+"""Cost of each password hashing method, and login throughput under concurrent clients.
+
+First times hash and verify for each method on a single thread, then sends
+concurrent logins to an in-process app (one test client per thread) for
+each method and reports logins/sec, latency and how many were refused
+with a 503 because the hashing queue was full. argon2 methods are skipped
+unless argon2-cffi is installed.
+
+    python -m benchmarks.password_hashing [clients] [logins per client]
+"""
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.common import benchmark_app, register_user
+from app.utils.passwords import hash_password, verify_password
+
+METHODS = ['pbkdf2:sha256:600000', 'scrypt:32768:8:1', 'argon2:3:65536:4', 'argon2:2:19456:1']
+
+def available(method):
+    if not method.startswith('argon2'):
+        return True
+    try:
+        import argon2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+def time_method(method, rounds=10):
+    """(ms per hash, ms per verify) on one thread"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        password_hash = hash_password(method, 'password123')
+    hashed = time.perf_counter()
+    for _ in range(rounds):
+        verify_password(password_hash, 'password123')
+    verified = time.perf_counter()
+    return (hashed - start) / rounds * 1000, (verified - hashed) / rounds * 1000
+
+def client_loop(app, count):
+    """Log in count times; returns (latencies, refused)"""
+    client = app.test_client()
+    latencies = []
+    refused = 0
+    for _ in range(count):
+        start = time.perf_counter()
+        response = client.post('/api/auth/login', json={'username': 'bench', 'password': 'password123'})
+        latencies.append(time.perf_counter() - start)
+        if response.status_code == 503:
+            refused += 1
+    return latencies, refused
+
+def logins(method, clients, per_client):
+    with benchmark_app(PASSWORD_HASH_METHOD=method) as app:
+        register_user(app.test_client())
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(clients) as pool:
+            results = list(pool.map(lambda _: client_loop(app, per_client), range(clients)))
+        elapsed = time.perf_counter() - start
+
+    latencies = sorted(latency for result in results for latency in result[0])
+    refused = sum(result[1] for result in results)
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f'{method:<24} {(len(latencies) - refused) / elapsed:8,.1f} logins/s  '
+          f'p50 {p50:7.1f} ms  p99 {p99:7.1f} ms  {refused} refused')
+
+def main(clients=8, per_client=10):
+    methods = [method for method in METHODS if available(method)]
+    for method in methods:
+        hash_ms, verify_ms = time_method(method)
+        print(f'{method:<24} hash {hash_ms:7.1f} ms  verify {verify_ms:7.1f} ms')
+
+    print(f'{clients} clients x {per_client} logins')
+    for method in methods:
+        logins(method, clients, per_client)
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:3]))
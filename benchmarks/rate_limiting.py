@@ -0,0 +1,42 @@
+"""Per-request cost of the rate limiter.
+
+Times the token bucket step of the in-process store, then the app's
+before_request hooks (preprocess_request) inside a request context, for a
+route without a rule and for a limited one (with a limit high enough
+never to trip), with rate limiting disabled and enabled.
+
+    python -m benchmarks.rate_limiting [iterations]
+"""
+import sys
+import time
+from app import create_app
+from app.config import TestingConfig
+from app.utils.ratelimit import MemoryBucketStore
+
+def per_call_us(function, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+def make_app(enabled):
+    class BenchmarkConfig(TestingConfig):
+        RATELIMIT_ENABLED = enabled
+        RATELIMIT_RULES = {'auth.login': f'ip:{10 ** 9}/second'}
+
+    return create_app(BenchmarkConfig)
+
+def main(iterations=200000):
+    store = MemoryBucketStore()
+    print(f'{"MemoryBucketStore.take":<40} {per_call_us(lambda: store.take("bench", 1e-9, 1), iterations):6.2f} us')
+
+    for enabled in (False, True):
+        app = make_app(enabled)
+        for path in ('/api/health', '/api/auth/login'):
+            with app.test_request_context(path, method='POST', environ_base={'REMOTE_ADDR': '10.0.0.1'}):
+                cost = per_call_us(app.preprocess_request, iterations)
+            label = f'{path} ({"enabled" if enabled else "disabled"})'
+            print(f'{label:<40} {cost:6.2f} us')
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:2]))
@@ -0,0 +1,57 @@
+"""Throughput of `flask recurring materialize` over many schedules.
+
+Seeds recurring_transactions directly, spread over users and cadences and
+all due from the first of a month, then times materialize_due for that
+month, and a second run over the same day, which should find nothing due.
+
+    python -m benchmarks.recurring [schedules] [users] [chunk size]
+"""
+import random
+import sys
+from datetime import date, datetime
+from sqlalchemy import insert
+from app import db
+from app.models.category import Category
+from app.models.recurring_transaction import RecurringTransaction
+from app.models.user import User
+from app.utils.recurring import materialize_due
+from benchmarks.common import benchmark_app, timed
+
+START = date(2024, 3, 1)
+UNTIL = date(2024, 3, 31)
+
+def seed(schedules, users):
+    now = datetime.utcnow()
+    db.session.execute(insert(User), [
+        {'username': f'user{user_id}', 'email': f'user{user_id}@example.com', 'password_hash': 'x',
+         'created_at': now, 'updated_at': now}
+        for user_id in range(1, users + 1)
+    ])
+    db.session.execute(insert(Category), [
+        {'name': 'Bills', 'user_id': user_id, 'created_at': now, 'updated_at': now}
+        for user_id in range(1, users + 1)
+    ])
+    rows = []
+    for index in range(schedules):
+        user_id = index % users + 1
+        frequency = random.choice(('daily', 'weekly', 'weekly', 'monthly', 'monthly', 'monthly'))
+        start_date = START.replace(day=random.randint(1, 28)) if frequency == 'monthly' else START
+        rows.append({'amount_cents': random.randint(500, 200000), 'currency': 'USD', 'description': f'Bill {index}',
+                     'type': 'expense', 'frequency': frequency, 'interval': 1, 'start_date': start_date,
+                     'occurrences': 0, 'next_date': start_date, 'user_id': user_id, 'category_id': user_id,
+                     'created_at': now, 'updated_at': now})
+    db.session.execute(insert(RecurringTransaction), rows)
+    db.session.commit()
+
+def main(schedules=100000, users=10000, chunk_size=1000):
+    with benchmark_app(METRICS_ENABLED=False) as app:
+        with app.app_context():
+            seed(schedules, users)
+            with timed(f'materialize {schedules} schedules', schedules, 'schedules'):
+                _, created = materialize_due(UNTIL, chunk_size)
+            print(f'{"":<40} {created:,} transactions')
+            with timed('materialize again (nothing due)'):
+                assert materialize_due(UNTIL, chunk_size) == (0, 0)
+
+if __name__ == '__main__':
+    main(*(int(arg) for arg in sys.argv[1:4]))
@@ -0,0 +1,49 @@
+"""Serialization throughput for transaction lists: ORM objects + to_dict() + jsonify against RowSerializer.
+
+    python -m benchmarks.serialization [rows]
+"""
+import sys
+from flask import jsonify
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from benchmarks.bulk_import import make_rows
+from benchmarks.common import benchmark_app, register_user, timed
+from app.models.category import Category
+from app.models.transaction import Transaction
+from app import db
+from app.utils.serializers import TRANSACTION_SERIALIZER
+
+def main(count=100000):
+    with benchmark_app() as app:
+        client = app.test_client()
+        headers, category_id = register_user(client)
+        rows = make_rows(count, category_id)
+        for start in range(0, count, 50000):
+            client.post('/api/transactions/bulk', json=rows[start:start + 50000], headers=headers)
+        del rows
+
+        with app.test_request_context():
+            with timed('ORM + to_dict() + jsonify', count):
+                transactions = Transaction.query.options(joinedload(Transaction.category)).order_by(
+                    Transaction.date.desc(), Transaction.id.desc()
+                ).all()
+                orm_body = jsonify({'transactions': [t.to_dict() for t in transactions]}).get_data()
+            db.session.expunge_all()
+
+            statement = select(*TRANSACTION_SERIALIZER.columns).join(
+                Category, Transaction.category_id == Category.id
+            ).order_by(Transaction.date.desc(), Transaction.id.desc())
+            with timed('Core select + RowSerializer', count):
+                result = db.session.execute(statement).all()
+                body = ('{"transactions":' + TRANSACTION_SERIALIZER.serialize_many(result) + '}').encode()
+
+            # Serialization alone, on rows that are already fetched
+            with timed('  RowSerializer only', count):
+                TRANSACTION_SERIALIZER.serialize_many(result)
+            with timed('  to_dict() + jsonify only', count):
+                jsonify({'transactions': [t.to_dict() for t in transactions]}).get_data()
+
+            assert body == orm_body.strip(), 'serializers disagree'
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000)
@@ -0,0 +1,41 @@
+"""Time a CSV statement import and an overlapping re-import.
+
+    python -m benchmarks.statement_import [rows]
+"""
+import io
+import sys
+from datetime import date, timedelta
+from benchmarks.common import benchmark_app, register_user, timed
+
+def make_statement(count, start=date(2024, 1, 1)):
+    lines = ['date,amount,description']
+    for i in range(count):
+        day = start + timedelta(days=i * 365 // count)
+        lines.append(f'{day.isoformat()},-{5 + i % 300}.{i % 100:02d},Card payment {i % 800}')
+    return '\n'.join(lines) + '\n'
+
+def upload(client, headers, content, category_id):
+    response = client.post(
+        '/api/transactions/import',
+        data={'file': (io.BytesIO(content.encode()), 'statement.csv'), 'default_category_id': str(category_id)},
+        headers=headers,
+        content_type='multipart/form-data'
+    )
+    return response.get_json()
+
+def main(count=20000):
+    with benchmark_app() as app:
+        client = app.test_client()
+        headers, category_id = register_user(client)
+        statement = make_statement(count)
+
+        with timed(f'first import ({count:,} rows)', count):
+            result = upload(client, headers, statement, category_id)
+        assert result['imported'] == count, result
+
+        with timed(f'overlapping re-import ({count:,} rows)', count):
+            result = upload(client, headers, statement, category_id)
+        assert result['imported'] == 0 and result['duplicates'] == count, result
+
+if __name__ == '__main__':
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
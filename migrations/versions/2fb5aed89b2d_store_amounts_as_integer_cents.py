@@ -0,0 +1,45 @@
+"""Store amounts as integer cents with a currency code
+
+Revision ID: 2fb5aed89b2d
+Revises: 4ea9f4262417
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2fb5aed89b2d'
+down_revision = '4ea9f4262417'
+branch_labels = None
+depends_on = None
+
+MONEY_TABLES = ('transactions', 'budgets', 'daily_category_totals')
+CURRENCY_TABLES = ('transactions', 'budgets')
+
+
+def upgrade():
+    for table in MONEY_TABLES:
+        op.add_column(table, sa.Column('amount_cents', sa.BigInteger(), nullable=True))
+        op.execute(f'UPDATE {table} SET amount_cents = CAST(ROUND(amount * 100) AS BIGINT)')
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('amount_cents', existing_type=sa.BigInteger(), nullable=False)
+            batch_op.drop_column('amount')
+
+    for table in CURRENCY_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.add_column(sa.Column('currency', sa.String(length=3), nullable=False, server_default='USD'))
+
+
+def downgrade():
+    for table in CURRENCY_TABLES:
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.drop_column('currency')
+
+    for table in MONEY_TABLES:
+        op.add_column(table, sa.Column('amount', sa.Float(), nullable=True))
+        op.execute(f'UPDATE {table} SET amount = amount_cents / 100.0')
+        with op.batch_alter_table(table) as batch_op:
+            batch_op.alter_column('amount', existing_type=sa.Float(), nullable=False)
+            batch_op.drop_column('amount_cents')
@@ -0,0 +1,68 @@
+"""Add transactions.dedup_hash for import deduplication
+
+Revision ID: 4ea9f4262417
+Revises: 9c23a0bd5371
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+import hashlib
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4ea9f4262417'
+down_revision = '9c23a0bd5371'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+
+
+def _dedup_hash(date, amount, type, description):
+    # Mirrors app.models.transaction.dedup_hash at the time of this revision
+    signed_amount = -amount if type == 'expense' else amount
+    key = f'{date.isoformat()}|{signed_amount:.2f}|{(description or "").strip().lower()}'
+    return hashlib.sha1(key.encode()).hexdigest()
+
+
+def upgrade():
+    op.add_column('transactions', sa.Column('dedup_hash', sa.String(length=40), nullable=True))
+
+    transactions = sa.table(
+        'transactions',
+        sa.column('id', sa.Integer),
+        sa.column('amount', sa.Float),
+        sa.column('description', sa.String),
+        sa.column('date', sa.Date),
+        sa.column('type', sa.String),
+        sa.column('dedup_hash', sa.String)
+    )
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.select(
+                transactions.c.id,
+                transactions.c.date,
+                transactions.c.amount,
+                transactions.c.type,
+                transactions.c.description
+            ).where(transactions.c.id > last_id).order_by(transactions.c.id).limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        connection.execute(
+            transactions.update().where(transactions.c.id == sa.bindparam('row_id')),
+            [{'row_id': row.id, 'dedup_hash': _dedup_hash(row.date, row.amount, row.type, row.description)}
+             for row in rows]
+        )
+        last_id = rows[-1].id
+
+    op.create_index('ix_transactions_user_dedup_hash', 'transactions', ['user_id', 'dedup_hash'])
+
+
+def downgrade():
+    op.drop_index('ix_transactions_user_dedup_hash', table_name='transactions')
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.drop_column('dedup_hash')
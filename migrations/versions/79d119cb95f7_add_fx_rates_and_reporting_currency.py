@@ -0,0 +1,77 @@
+"""Add fx_rates, users.reporting_currency and currency to the daily rollup key
+
+Revision ID: 79d119cb95f7
+Revises: 2fb5aed89b2d
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '79d119cb95f7'
+down_revision = '2fb5aed89b2d'
+branch_labels = None
+depends_on = None
+
+
+def _create_daily_category_totals(key_columns):
+    columns = [
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.Column('type', sa.String(length=10), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False)
+    ]
+    if 'currency' in key_columns:
+        columns.append(sa.Column('currency', sa.String(length=3), nullable=False))
+    op.create_table(
+        'daily_category_totals',
+        *columns,
+        sa.Column('amount_cents', sa.BigInteger(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['category_id'], ['categories.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint(*key_columns)
+    )
+    op.create_index('ix_daily_category_totals_user_date', 'daily_category_totals', ['user_id', 'date'])
+
+    # Backfill from the existing transactions
+    keys = ', '.join(key_columns)
+    op.execute(
+        f'INSERT INTO daily_category_totals ({keys}, amount_cents, count) '
+        f'SELECT {keys}, SUM(amount_cents), COUNT(*) FROM transactions GROUP BY {keys}'
+    )
+
+
+def _drop_daily_category_totals():
+    op.drop_index('ix_daily_category_totals_user_date', table_name='daily_category_totals')
+    op.drop_table('daily_category_totals')
+
+
+def upgrade():
+    op.create_table(
+        'fx_rates',
+        sa.Column('base', sa.String(length=3), nullable=False),
+        sa.Column('quote', sa.String(length=3), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('rate', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('base', 'quote', 'date')
+    )
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.add_column(sa.Column('reporting_currency', sa.String(length=3), nullable=False, server_default='USD'))
+
+    # The rollup key changes, so the table is rebuilt rather than altered
+    _drop_daily_category_totals()
+    _create_daily_category_totals(['user_id', 'category_id', 'type', 'date', 'currency'])
+
+
+def downgrade():
+    _drop_daily_category_totals()
+    _create_daily_category_totals(['user_id', 'category_id', 'type', 'date'])
+
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.drop_column('reporting_currency')
+
+    op.drop_table('fx_rates')
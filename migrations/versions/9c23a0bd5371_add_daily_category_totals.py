@@ -0,0 +1,44 @@
+"""Add the daily_category_totals rollup table
+
+Revision ID: 9c23a0bd5371
+Revises: ee933468679c
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c23a0bd5371'
+down_revision = 'ee933468679c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'daily_category_totals',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.Column('type', sa.String(length=10), nullable=False),
+        sa.Column('date', sa.Date(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['category_id'], ['categories.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id', 'category_id', 'type', 'date')
+    )
+    op.create_index('ix_daily_category_totals_user_date', 'daily_category_totals', ['user_id', 'date'])
+
+    # Backfill from the existing transactions
+    op.execute(
+        'INSERT INTO daily_category_totals (user_id, category_id, type, date, amount, count) '
+        'SELECT user_id, category_id, type, date, SUM(amount), COUNT(*) FROM transactions '
+        'GROUP BY user_id, category_id, type, date'
+    )
+
+
+def downgrade():
+    op.drop_index('ix_daily_category_totals_user_date', table_name='daily_category_totals')
+    op.drop_table('daily_category_totals')
@@ -0,0 +1,28 @@
+"""Widen users.password_hash to fit scrypt and argon2 hashes
+
+Revision ID: 9ee35577a39d
+Revises: ee3ab3729751
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9ee35577a39d'
+down_revision = 'ee3ab3729751'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('password_hash', existing_type=sa.String(length=128), type_=sa.String(length=256),
+                              existing_nullable=False)
+
+
+def downgrade():
+    with op.batch_alter_table('users') as batch_op:
+        batch_op.alter_column('password_hash', existing_type=sa.String(length=256), type_=sa.String(length=128),
+                              existing_nullable=False)
@@ -0,0 +1,59 @@
+"""Add recurring_transactions and transactions.recurring_id
+
+Revision ID: b51f0c3e8a27
+Revises: 9ee35577a39d
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b51f0c3e8a27'
+down_revision = '9ee35577a39d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'recurring_transactions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('amount_cents', sa.BigInteger(), nullable=False),
+        sa.Column('currency', sa.String(length=3), server_default='USD', nullable=False),
+        sa.Column('description', sa.String(length=256), nullable=True),
+        sa.Column('type', sa.String(length=10), nullable=False),
+        sa.Column('frequency', sa.String(length=10), nullable=False),
+        sa.Column('interval', sa.Integer(), server_default='1', nullable=False),
+        sa.Column('start_date', sa.Date(), nullable=False),
+        sa.Column('end_date', sa.Date(), nullable=True),
+        sa.Column('max_occurrences', sa.Integer(), nullable=True),
+        sa.Column('occurrences', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('next_date', sa.Date(), nullable=True),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('category_id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['category_id'], ['categories.id']),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_recurring_transactions_next_date', 'recurring_transactions', ['next_date', 'id'])
+    op.create_index('ix_recurring_transactions_user_id', 'recurring_transactions', ['user_id'])
+
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.add_column(sa.Column('recurring_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_transactions_recurring_id', 'recurring_transactions', ['recurring_id'], ['id'],
+                                    ondelete='SET NULL')
+    op.create_index('ix_transactions_recurring_date', 'transactions', ['recurring_id', 'date'], unique=True)
+
+
+def downgrade():
+    op.drop_index('ix_transactions_recurring_date', table_name='transactions')
+    with op.batch_alter_table('transactions') as batch_op:
+        batch_op.drop_constraint('fk_transactions_recurring_id', type_='foreignkey')
+        batch_op.drop_column('recurring_id')
+    op.drop_index('ix_recurring_transactions_user_id', table_name='recurring_transactions')
+    op.drop_index('ix_recurring_transactions_next_date', table_name='recurring_transactions')
+    op.drop_table('recurring_transactions')
@@ -0,0 +1,37 @@
+"""Add indexes for the transaction, budget and category queries
+
+Revision ID: ee933468679c
+Revises: dac4eeeeb7b8
+Create Date: 2026-10-18 09:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ee933468679c'
+down_revision = 'dac4eeeeb7b8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Transaction list and summary: user + date range, ordered by (date, id)
+    op.create_index('ix_transactions_user_date', 'transactions', ['user_id', 'date', 'id'])
+    # Budget spend and spending summary: user + type + category + date range
+    op.create_index(
+        'ix_transactions_user_type_category_date',
+        'transactions',
+        ['user_id', 'type', 'category_id', 'date']
+    )
+    # Active budget lookups: user + start/end date
+    op.create_index('ix_budgets_user_dates', 'budgets', ['user_id', 'start_date', 'end_date'])
+    op.create_index('ix_categories_user_id', 'categories', ['user_id'])
+
+
+def downgrade():
+    op.drop_index('ix_categories_user_id', table_name='categories')
+    op.drop_index('ix_budgets_user_dates', table_name='budgets')
+    op.drop_index('ix_transactions_user_type_category_date', table_name='transactions')
+    op.drop_index('ix_transactions_user_date', table_name='transactions')
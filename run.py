@@ -1,6 +1,8 @@
+import os
 from app import create_app
+from app.config import CONFIGS
 
-app = create_app()
+app = create_app(CONFIGS[os.environ.get('APP_CONFIG', 'default')])
 
 if __name__ == '__main__':
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,117 @@
+import json
+import pytest
+from sqlalchemy import event
+from app import create_app, db
+from app.config import TestingConfig
+from app.signals import transaction_flagged
+from app.utils.anomalies import CategoryAmounts
+
+@pytest.fixture
+def client():
+    app = create_app(TestingConfig)
+
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+        yield client
+        with app.app_context():
+            db.drop_all()
+
+@pytest.fixture
+def auth_headers(client):
+    client.post('/api/auth/register', json={
+        'username': 'testuser',
+        'email': 'test@example.com',
+        'password': 'password123'
+    })
+    response = client.post('/api/auth/login', json={'username': 'testuser', 'password': 'password123'})
+    return {'Authorization': f'Bearer {json.loads(response.data)["access_token"]}'}
+
+@pytest.fixture
+def groceries(client, auth_headers):
+    response = client.post('/api/categories', json={'name': 'Groceries'}, headers=auth_headers)
+    category_id = json.loads(response.data)['category']['id']
+    client.post('/api/transactions/bulk', json=[
+        {'amount': amount, 'type': 'expense', 'category_id': category_id, 'date': f'2024-03-{day + 1:02d}'}
+        for day, amount in enumerate([40, 52, 47, 61, 38, 55, 44, 50, 58, 42, 49, 53])
+    ], headers=auth_headers)
+    return category_id
+
+def create_transaction(client, headers, category_id, amount, type='expense', currency='USD'):
+    response = client.post('/api/transactions', json={
+        'amount': amount, 'type': type, 'category_id': category_id, 'date': '2024-04-01', 'currency': currency
+    }, headers=headers)
+    assert response.status_code == 201
+    return json.loads(response.data)
+
+def amount_queries(client):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if statement.startswith('SELECT transactions.amount_cents'):
+            statements.append(statement)
+
+    with client.application.app_context():
+        event.listen(db.engine, 'before_cursor_execute', record)
+    return statements
+
+def test_large_expenses_are_flagged(client, auth_headers, groceries):
+    flagged = []
+
+    def receiver(sender, user_id, transaction_id, anomaly):
+        flagged.append((user_id, transaction_id, anomaly['score']))
+
+    transaction_flagged.connect(receiver)
+    try:
+        assert 'anomaly' not in create_transaction(client, auth_headers, groceries, 57)
+        created = create_transaction(client, auth_headers, groceries, 480)
+    finally:
+        transaction_flagged.disconnect(receiver)
+
+    anomaly = created['anomaly']
+    assert anomaly['score'] > 3.5
+    assert anomaly['typical_amount'] == 50
+    assert flagged == [(1, created['transaction']['id'], anomaly['score'])]
+
+def test_scoring_reuses_the_loaded_amounts(client, auth_headers, groceries):
+    queries = amount_queries(client)
+
+    for amount in (45, 51, 48):
+        create_transaction(client, auth_headers, groceries, amount)
+    assert len(queries) == 1
+
+    # New expenses joined the window without reading it again
+    assert 'anomaly' in create_transaction(client, auth_headers, groceries, 400)
+    assert len(queries) == 1
+
+    # An edit that changes a day's count by other than one drops the amounts
+    client.delete('/api/transactions/1', headers=auth_headers)
+    create_transaction(client, auth_headers, groceries, 45)
+    assert len(queries) == 2
+
+def test_updates_are_scored_without_their_old_amount(client, auth_headers, groceries):
+    transaction_id = create_transaction(client, auth_headers, groceries, 50)['transaction']['id']
+    queries = amount_queries(client)
+
+    # The loaded amounts include its 50; the 12 others have a median of 49.5
+    response = client.put(f'/api/transactions/{transaction_id}', json={'amount': 900}, headers=auth_headers)
+    assert json.loads(response.data)['anomaly']['typical_amount'] == 49.5
+    assert len(queries) == 1
+
+    response = client.put(f'/api/transactions/{transaction_id}', json={'description': 'Party'}, headers=auth_headers)
+    assert 'anomaly' not in json.loads(response.data)
+
+def test_only_expenses_with_enough_history_are_scored(client, auth_headers, groceries):
+    assert 'anomaly' not in create_transaction(client, auth_headers, groceries, 5000, type='income')
+    # Other currencies have their own history
+    assert 'anomaly' not in create_transaction(client, auth_headers, groceries, 5000, currency='EUR')
+
+    client.application.config['ANOMALY_DETECTION_ENABLED'] = False
+    assert 'anomaly' not in create_transaction(client, auth_headers, groceries, 5000)
+
+def test_identical_amounts_fall_back_to_the_mean_deviation():
+    amounts = CategoryAmounts([1000] * 8 + [1200, 800], window=10)
+
+    assert amounts.score(1000) == 0
+    assert amounts.score(2000) == pytest.approx(1000 / (40 / 0.7979))
+    assert CategoryAmounts([500] * 10, window=10).score(5000) is None
@@ -0,0 +1,136 @@
+import json
+import pytest
+
+pytest.importorskip('starlette')
+pytest.importorskip('a2wsgi')
+pytest.importorskip('aiosqlite')
+pytest.importorskip('greenlet')
+
+from starlette.testclient import TestClient
+from app import db
+from app.asgi import async_database_url, create_asgi_app
+from app.config import TestingConfig
+
+@pytest.fixture
+def client(tmp_path):
+    class TestConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(tmp_path / 'test.db')
+        CACHE_BACKEND = 'null'
+
+    app = create_asgi_app(TestConfig)
+    with app.state.flask_app.app_context():
+        db.create_all()
+
+    with TestClient(app) as client:
+        yield client
+    with app.state.flask_app.app_context():
+        db.engine.dispose()
+
+@pytest.fixture
+def auth_headers(client):
+    # Writes go through the Flask app behind the async routes
+    client.post('/api/auth/register', json={
+        'username': 'testuser',
+        'email': 'test@example.com',
+        'password': 'password123'
+    })
+    response = client.post('/api/auth/login', json={'username': 'testuser', 'password': 'password123'})
+    headers = {'Authorization': f'Bearer {response.json()["access_token"]}'}
+
+    category_id = client.post('/api/categories', json={'name': 'Groceries'}, headers=headers).json()['category']['id']
+    for day, amount, kind in [(3, 12.5, 'expense'), (4, 100, 'income'), (9, 0.1, 'expense')]:
+        response = client.post('/api/transactions', json={
+            'amount': amount, 'type': kind, 'category_id': category_id, 'date': f'2024-01-{day:02d}'
+        }, headers=headers)
+        assert response.status_code == 201
+    client.post('/api/budgets', json={
+        'amount': 50, 'category_id': category_id, 'start_date': '2024-01-01', 'end_date': '2024-01-31'
+    }, headers=headers)
+    return headers
+
+@pytest.mark.parametrize('url', [
+    '/api/transactions',
+    '/api/transactions?limit=2',
+    '/api/transactions?type=expense&start_date=2024-01-04',
+    '/api/transactions/summary',
+    '/api/transactions/summary?group_by=week',
+    '/api/transactions/summary?group_by=category&end_date=2024-01-05',
+    '/api/budgets',
+    '/api/categories'
+])
+def test_async_handlers_match_flask(client, auth_headers, url):
+    expected = client.app.state.flask_app.test_client().get(url, headers=auth_headers)
+
+    response = client.get(url, headers=auth_headers)
+
+    assert response.status_code == expected.status_code == 200
+    assert 'X-Cache' not in response.headers
+    assert response.json() == json.loads(expected.data)
+
+def test_async_pagination_and_ndjson(client, auth_headers):
+    page = client.get('/api/transactions?limit=2', headers=auth_headers).json()
+    rest = client.get(f'/api/transactions?cursor={page["next_cursor"]}', headers=auth_headers).json()
+
+    assert [t['date'] for t in page['transactions'] + rest['transactions']] == [
+        '2024-01-09', '2024-01-04', '2024-01-03'
+    ]
+    assert rest['next_cursor'] is None
+
+    response = client.get('/api/transactions?format=ndjson', headers=auth_headers)
+    assert response.headers['content-type'].startswith('application/x-ndjson')
+    assert [json.loads(line)['amount'] for line in response.text.splitlines()] == [0.1, 100, 12.5]
+
+def test_async_errors(client, auth_headers):
+    assert client.get('/api/transactions').status_code == 401
+    assert client.get('/api/transactions', headers={'Authorization': 'Bearer nope'}).status_code == 422
+
+    response = client.get('/api/transactions?cursor=nope', headers=auth_headers)
+    assert response.status_code == 400
+    assert response.json() == {'message': 'Invalid cursor'}
+    response = client.get('/api/transactions/summary?group_by=year', headers=auth_headers)
+    assert response.status_code == 400
+
+def test_async_database_url():
+    assert str(async_database_url('sqlite:////tmp/app.db')) == 'sqlite+aiosqlite:////tmp/app.db'
+    assert async_database_url('postgresql+psycopg://db/app').drivername == 'postgresql+asyncpg'
+    with pytest.raises(ValueError):
+        async_database_url('mysql://db/app')
+
+def test_async_handlers_reject_revoked_tokens(client, auth_headers):
+    response = client.post('/api/users/me/change-password', json={
+        'current_password': 'password123', 'new_password': 'password456'
+    }, headers=auth_headers)
+    assert response.status_code == 200
+    new_headers = {'Authorization': f'Bearer {response.json()["access_token"]}'}
+
+    assert client.get('/api/transactions', headers=new_headers).status_code == 200
+    response = client.get('/api/transactions', headers=auth_headers)
+    assert response.status_code == 401
+    assert response.json() == {'msg': 'Token has been revoked'}
+
+def test_async_handlers_share_the_flask_rate_limits(tmp_path):
+    class RateLimitConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(tmp_path / 'test.db')
+        RATELIMIT_ENABLED = True
+        RATELIMIT_RULES = {'transactions': 'user:2/minute'}
+
+    app = create_asgi_app(RateLimitConfig)
+    with app.state.flask_app.app_context():
+        db.create_all()
+
+    with TestClient(app) as client:
+        client.post('/api/auth/register', json={
+            'username': 'testuser', 'email': 'test@example.com', 'password': 'password123'
+        })
+        token = client.post('/api/auth/login', json={'username': 'testuser', 'password': 'password123'}).json()
+        headers = {'Authorization': f'Bearer {token["access_token"]}'}
+
+        # The async list handler and the Flask export route draw from the same bucket
+        assert client.get('/api/transactions', headers=headers).status_code == 200
+        assert client.get('/api/transactions/export', headers=headers).status_code == 200
+        response = client.get('/api/transactions/summary', headers=headers)
+        assert response.status_code == 429
+        assert int(response.headers['Retry-After']) >= 1
+        assert client.get('/api/budgets', headers=headers).status_code == 200
+    with app.state.flask_app.app_context():
+        db.engine.dispose()
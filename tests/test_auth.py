@@ -1,13 +1,16 @@
 import json
+import sys
 import pytest
+from flask_jwt_extended import decode_token
+from sqlalchemy import event
 from app import create_app, db
+from app.config import TestingConfig
 from app.models.user import User
+from app.utils.auth import user_cache
 
 @pytest.fixture
 def client():
-    app = create_app()
-    app.config['TESTING'] = True
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app = create_app(TestingConfig)
     
     with app.test_client() as client:
         with app.app_context():
@@ -16,6 +19,26 @@ def client():
         with app.app_context():
             db.drop_all()
 
+def login(client):
+    client.post(
+        '/api/auth/register',
+        data=json.dumps({
+            'username': 'testuser',
+            'email': 'test@example.com',
+            'password': 'password123'
+        }),
+        content_type='application/json'
+    )
+    response = client.post(
+        '/api/auth/login',
+        data=json.dumps({'username': 'testuser', 'password': 'password123'}),
+        content_type='application/json'
+    )
+    return json.loads(response.data)
+
+def bearer(token):
+    return {'Authorization': f'Bearer {token}'}
+
 def test_register(client):
     response = client.post(
         '/api/auth/register',
@@ -93,4 +116,139 @@ def test_login_invalid_credentials(client):
     
     assert response.status_code == 401
     data = json.loads(response.data)
-    assert data['message'] == 'Invalid username or password'
\ No newline at end of file
+    assert data['message'] == 'Invalid username or password'
+
+def test_tokens_carry_identity_claims(client):
+    tokens = login(client)
+    
+    with client.application.app_context():
+        claims = decode_token(tokens['access_token'])
+    
+    assert claims['username'] == 'testuser'
+    assert claims['email'] == 'test@example.com'
+    assert claims['ver'] == 0
+
+def test_profile_is_served_without_queries(client):
+    headers = bearer(login(client)['access_token'])
+    client.get('/api/users/me', headers=headers)
+    
+    statements = []
+    with client.application.app_context():
+        event.listen(db.engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    
+    for url in ('/api/users/me', '/api/auth/profile'):
+        response = client.get(url, headers=headers)
+        assert response.status_code == 200
+        assert json.loads(response.data)['user']['username'] == 'testuser'
+    assert statements == []
+
+def test_password_change_revokes_tokens(client):
+    tokens = login(client)
+    
+    response = client.post(
+        '/api/users/me/change-password',
+        data=json.dumps({'current_password': 'password123', 'new_password': 'password456'}),
+        headers=bearer(tokens['access_token']),
+        content_type='application/json'
+    )
+    assert response.status_code == 200
+    new_tokens = json.loads(response.data)
+    
+    response = client.get('/api/users/me', headers=bearer(tokens['access_token']))
+    assert response.status_code == 401
+    assert json.loads(response.data)['msg'] == 'Token has been revoked'
+    assert client.post('/api/auth/refresh', headers=bearer(tokens['refresh_token'])).status_code == 401
+    
+    assert client.get('/api/users/me', headers=bearer(new_tokens['access_token'])).status_code == 200
+    assert client.post('/api/auth/refresh', headers=bearer(new_tokens['refresh_token'])).status_code == 200
+
+def test_revocation_elsewhere_applies_once_cache_expires(client):
+    headers = bearer(login(client)['access_token'])
+    assert client.get('/api/users/me', headers=headers).status_code == 200
+    
+    # Another process bumps the version; this one keeps its snapshot until it expires
+    with client.application.app_context():
+        user = User.query.filter_by(username='testuser').first()
+        user.revoke_tokens()
+        db.session.commit()
+    assert client.get('/api/users/me', headers=headers).status_code == 200
+    
+    with client.application.app_context():
+        user_cache.backend.clear()
+    assert client.get('/api/users/me', headers=headers).status_code == 401
+
+def stored_hash(client):
+    with client.application.app_context():
+        return User.query.filter_by(username='testuser').first().password_hash
+
+def test_login_rehashes_with_new_method(client):
+    login(client)
+    assert stored_hash(client).startswith('pbkdf2:sha256:1000$')
+    
+    client.application.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:2000'
+    tokens = login(client)
+    
+    assert stored_hash(client).startswith('pbkdf2:sha256:2000$')
+    # Rehashing is not a password change, so earlier tokens stay valid
+    assert client.get('/api/users/me', headers=bearer(tokens['access_token'])).status_code == 200
+    assert 'access_token' in login(client)
+
+def test_login_keeps_hashes_of_a_short_method_name(client):
+    client.application.config['PASSWORD_HASH_METHOD'] = 'scrypt'
+    login(client)
+    first_hash = stored_hash(client)
+    assert first_hash.startswith('scrypt:32768:8:1$')
+    
+    # werkzeug stored its default parameters too; the hash still matches the configured method
+    login(client)
+    assert stored_hash(client) == first_hash
+
+def test_login_with_unsupported_hash_is_a_clear_error(client, monkeypatch):
+    login(client)
+    with client.application.app_context():
+        user = User.query.filter_by(username='testuser').first()
+        user.password_hash = '$argon2id$v=19$m=8192,t=1,p=1$c2FsdHNhbHQ$aGFzaGhhc2hoYXNoaGFzaA'
+        db.session.commit()
+    # As on a deploy without argon2-cffi
+    monkeypatch.setitem(sys.modules, 'argon2', None)
+    
+    response = client.post('/api/auth/login', json={'username': 'testuser', 'password': 'password123'})
+    
+    assert response.status_code == 500
+    assert 'not available' in json.loads(response.data)['message']
+
+def test_login_rehashes_to_argon2(client):
+    pytest.importorskip('argon2')
+    login(client)
+    
+    client.application.config['PASSWORD_HASH_METHOD'] = 'argon2:1:8192:1'
+    login(client)
+    assert stored_hash(client).startswith('$argon2id$v=19$m=8192,t=1,p=1$')
+    assert 'access_token' in login(client)
+    
+    client.application.config['PASSWORD_HASH_METHOD'] = 'pbkdf2:sha256:1000'
+    assert 'access_token' in login(client)
+    assert stored_hash(client).startswith('pbkdf2:sha256:1000$')
+
+def test_login_returns_503_when_hashing_is_saturated(client):
+    login(client)
+    
+    # Take every slot, as if PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE logins were in flight
+    slots = client.application.extensions['password_hasher']['slots']
+    taken = 0
+    while slots.acquire(blocking=False):
+        taken += 1
+    try:
+        response = client.post(
+            '/api/auth/login',
+            data=json.dumps({'username': 'testuser', 'password': 'password123'}),
+            content_type='application/json'
+        )
+    finally:
+        for _ in range(taken):
+            slots.release()
+    
+    assert taken == 34
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+    assert 'access_token' in login(client)
@@ -0,0 +1,244 @@
+import io
+import json
+import time
+from datetime import datetime, timedelta
+import pytest
+from sqlalchemy import event
+from app import create_app, db
+from app.config import TestingConfig
+from app.signals import budget_alert_raised
+from app.utils.alerts import budget_alerts
+from app.utils.fx import load_rates, rate_cache
+from app.utils.helpers import check_budget_status
+
+def make_app(**config):
+    class AlertsConfig(TestingConfig):
+        pass
+
+    for key, value in config.items():
+        setattr(AlertsConfig, key, value)
+
+    app = create_app(AlertsConfig)
+    with app.app_context():
+        db.create_all()
+    return app
+
+@pytest.fixture
+def client():
+    with make_app().test_client() as client:
+        yield client
+
+def auth_headers(client):
+    client.post('/api/auth/register', json={
+        'username': 'testuser',
+        'email': 'test@example.com',
+        'password': 'password123'
+    })
+    response = client.post('/api/auth/login', json={'username': 'testuser', 'password': 'password123'})
+    return {'Authorization': f'Bearer {json.loads(response.data)["access_token"]}'}
+
+def create_budget(client, headers, name, amount):
+    response = client.post('/api/categories', json={'name': name}, headers=headers)
+    category_id = json.loads(response.data)['category']['id']
+    today = datetime.utcnow().date()
+    client.post('/api/budgets', json={
+        'amount': amount,
+        'category_id': category_id,
+        'start_date': (today - timedelta(days=10)).isoformat(),
+        'end_date': (today + timedelta(days=10)).isoformat()
+    }, headers=headers)
+    return category_id
+
+def spend(client, headers, category_id, amount, days_ago=0):
+    day = datetime.utcnow().date() - timedelta(days=days_ago)
+    response = client.post('/api/transactions', json={
+        'amount': amount, 'type': 'expense', 'category_id': category_id, 'date': day.isoformat()
+    }, headers=headers)
+    return json.loads(response.data)['transaction']['id']
+
+def get_alerts(client, headers):
+    response = client.get('/api/budgets/alerts', headers=headers)
+    assert response.status_code == 200
+    return json.loads(response.data)['alerts']
+
+def record_queries(client):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if 'FROM budgets' in statement:
+            statements.append(statement)
+
+    with client.application.app_context():
+        event.listen(db.engine, 'before_cursor_execute', record)
+    return statements
+
+def record_alerts(app):
+    raised = []
+
+    def receiver(sender, user_id, alert):
+        if sender is app:
+            raised.append((user_id, alert['severity'], alert['category_name']))
+
+    budget_alert_raised.connect(receiver, weak=False)
+    return raised, receiver
+
+def test_counters_follow_transaction_writes(client):
+    headers = auth_headers(client)
+    groceries = create_budget(client, headers, 'Groceries', 100)
+    create_budget(client, headers, 'Rent', 50)
+    spend(client, headers, groceries, 50)
+    assert get_alerts(client, headers) == []
+    queries = record_queries(client)
+
+    transaction_id = spend(client, headers, groceries, 35, days_ago=3)
+    alerts = get_alerts(client, headers)
+    assert [(alert['category_name'], alert['severity'], alert['percentage_used']) for alert in alerts] == \
+        [('Groceries', 'medium', 85.0)]
+
+    client.put(f'/api/transactions/{transaction_id}', json={'amount': 60}, headers=headers)
+    assert get_alerts(client, headers)[0]['severity'] == 'high'
+
+    # Spending outside the budget's dates doesn't count
+    client.put(f'/api/transactions/{transaction_id}', json={'date': '2001-01-01'}, headers=headers)
+    assert get_alerts(client, headers) == []
+    assert queries == []
+
+    with client.application.app_context():
+        assert check_budget_status(1) == []
+
+def test_crossing_a_threshold_raises_an_alert(client):
+    headers = auth_headers(client)
+    raised, receiver = record_alerts(client.application)
+    try:
+        groceries = create_budget(client, headers, 'Groceries', 100)
+        get_alerts(client, headers)
+
+        spend(client, headers, groceries, 79)
+        spend(client, headers, groceries, 2)
+        spend(client, headers, groceries, 5)
+        spend(client, headers, groceries, 30)
+        transaction_id = spend(client, headers, groceries, 1)
+        client.delete(f'/api/transactions/{transaction_id}', headers=headers)
+    finally:
+        budget_alert_raised.disconnect(receiver)
+
+    assert raised == [(1, 'medium', 'Groceries'), (1, 'high', 'Groceries')]
+
+def test_budget_changes_reload_the_counters(client):
+    headers = auth_headers(client)
+    groceries = create_budget(client, headers, 'Groceries', 100)
+    spend(client, headers, groceries, 90)
+    assert get_alerts(client, headers)[0]['severity'] == 'medium'
+
+    client.put('/api/budgets/1', json={'amount': 80}, headers=headers)
+    assert get_alerts(client, headers)[0]['severity'] == 'high'
+
+    client.put(f'/api/categories/{groceries}', json={'name': 'Food'}, headers=headers)
+    assert get_alerts(client, headers)[0]['category_name'] == 'Food'
+
+    client.delete('/api/budgets/1', headers=headers)
+    assert get_alerts(client, headers) == []
+
+def test_reconcile_picks_up_writes_from_elsewhere(client):
+    headers = auth_headers(client)
+    groceries = create_budget(client, headers, 'Groceries', 100)
+    spend(client, headers, groceries, 10)
+    assert get_alerts(client, headers) == []
+    raised, receiver = record_alerts(client.application)
+
+    # As if another worker process had made the write
+    with client.application.app_context():
+        db.session.execute(db.text('UPDATE daily_category_totals SET amount_cents = 12000'))
+        db.session.commit()
+    assert get_alerts(client, headers) == []
+
+    try:
+        with client.application.app_context():
+            budget_alerts.reconcile()
+    finally:
+        budget_alert_raised.disconnect(receiver)
+
+    assert get_alerts(client, headers)[0]['percentage_used'] == 120
+    assert raised == [(1, 'high', 'Groceries')]
+
+def test_reconciler_runs_in_the_background():
+    app = make_app(BUDGET_ALERTS_RECONCILE_SECONDS=0.05)
+    client = app.test_client()
+    headers = auth_headers(client)
+    groceries = create_budget(client, headers, 'Groceries', 100)
+    spend(client, headers, groceries, 10)
+    assert get_alerts(client, headers) == []
+
+    with app.app_context():
+        db.session.execute(db.text('UPDATE daily_category_totals SET amount_cents = 9000'))
+        db.session.commit()
+    try:
+        deadline = time.monotonic() + 5
+        while not get_alerts(client, headers) and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert get_alerts(client, headers)[0]['severity'] == 'medium'
+    finally:
+        with app.app_context():
+            budget_alerts.stop()
+
+def setup_euro_budget(client, headers):
+    """A EUR budget of 100 around today, with a EUR/USD rate of 1.25 from before it"""
+    today = datetime.utcnow().date()
+    with client.application.app_context():
+        load_rates(io.BytesIO(f'date,base,quote,rate\n{today - timedelta(days=30)},EUR,USD,1.25\n'.encode()))
+    response = client.post('/api/categories', json={'name': 'Travel'}, headers=headers)
+    category_id = json.loads(response.data)['category']['id']
+    client.post('/api/budgets', json={
+        'amount': 100, 'currency': 'EUR', 'category_id': category_id,
+        'start_date': (today - timedelta(days=10)).isoformat(),
+        'end_date': (today + timedelta(days=10)).isoformat()
+    }, headers=headers)
+    return category_id
+
+def spend_usd(client, headers, category_id, amount):
+    return client.post('/api/transactions', json={
+        'amount': amount, 'type': 'expense', 'category_id': category_id,
+        'date': datetime.utcnow().date().isoformat(), 'currency': 'USD'
+    }, headers=headers)
+
+def test_counters_convert_other_currencies(client):
+    headers = auth_headers(client)
+    travel = setup_euro_budget(client, headers)
+    assert get_alerts(client, headers) == []
+    queries = record_queries(client)
+    raised, receiver = record_alerts(client.application)
+
+    try:
+        # The rate is looked up before the commit; the counters are updated after it
+        assert spend_usd(client, headers, travel, 50).status_code == 201
+        assert spend_usd(client, headers, travel, 50).status_code == 201
+    finally:
+        budget_alert_raised.disconnect(receiver)
+
+    [alert] = get_alerts(client, headers)
+    assert (alert['percentage_used'], alert['severity']) == (80, 'medium')
+    assert raised == [(1, 'medium', 'Travel')]
+    assert queries == []
+
+def test_counters_missing_a_rate_are_reloaded(client):
+    headers = auth_headers(client)
+    travel = setup_euro_budget(client, headers)
+    assert spend_usd(client, headers, travel, 50).status_code == 201
+    get_alerts(client, headers)
+    queries = record_queries(client)
+
+    # As if the rate had left the cache between the lookup and the commit
+    with client.application.app_context():
+        rate_cache.clear()
+        budget_alerts.apply_changes([{
+            'user_id': 1, 'category_id': travel, 'type': 'expense', 'date': datetime.utcnow().date(),
+            'currency': 'USD', 'amount_cents': 5000, 'count': 1
+        }])
+        db.session.execute(db.text('UPDATE daily_category_totals SET amount_cents = 10000'))
+        db.session.commit()
+
+    assert get_alerts(client, headers)[0]['percentage_used'] == 80
+    assert len(queries) == 1
+
+def test_alerts_require_authentication(client):
+    assert client.get('/api/budgets/alerts').status_code == 401
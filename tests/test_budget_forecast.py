@@ -0,0 +1,138 @@
+import json
+from datetime import date, datetime, timedelta
+import numpy as np
+import pytest
+from sqlalchemy import event
+from app import create_app, db
+from app.config import TestingConfig
+from app.utils.forecast import WeekdayLevels, spend_forecaster
+
+@pytest.fixture
+def client():
+    app = create_app(TestingConfig)
+
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+        yield client
+        with app.app_context():
+            db.drop_all()
+
+@pytest.fixture
+def auth_headers(client):
+    client.post('/api/auth/register', json={
+        'username': 'testuser',
+        'email': 'test@example.com',
+        'password': 'password123'
+    })
+    response = client.post('/api/auth/login', json={'username': 'testuser', 'password': 'password123'})
+    return {'Authorization': f'Bearer {json.loads(response.data)["access_token"]}'}
+
+def days_ago(days):
+    return (datetime.utcnow().date() - timedelta(days=days)).isoformat()
+
+def setup_budget(client, headers, amount=300):
+    """Groceries at 10 a day over the last 8 weeks, and a budget running from 10 days ago to 10 days ahead"""
+    response = client.post('/api/categories', json={'name': 'Groceries'}, headers=headers)
+    category_id = json.loads(response.data)['category']['id']
+    client.post('/api/transactions/bulk', json=[
+        {'amount': 10, 'type': 'expense', 'category_id': category_id, 'date': days_ago(day)}
+        for day in range(1, 57)
+    ], headers=headers)
+    client.post('/api/budgets', json={
+        'amount': amount, 'category_id': category_id, 'start_date': days_ago(10), 'end_date': days_ago(-10)
+    }, headers=headers)
+    return category_id
+
+def get_forecasts(client, headers):
+    response = client.get('/api/budgets/forecast', headers=headers)
+    assert response.status_code == 200
+    return json.loads(response.data)['forecasts']
+
+def history_queries(client):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        if 'FROM daily_category_totals' in statement and 'GROUP BY daily_category_totals.date' in statement:
+            statements.append(statement)
+
+    with client.application.app_context():
+        event.listen(db.engine, 'before_cursor_execute', record)
+    return statements
+
+def test_forecast_projects_the_rest_of_the_period(client, auth_headers):
+    setup_budget(client, auth_headers, amount=150)
+
+    [forecast] = get_forecasts(client, auth_headers)
+
+    # 10 days spent so far, 10 more expected after today
+    assert (forecast['spent'], forecast['projected_spend']) == (100, 200)
+    assert (forecast['amount'], forecast['projected_percentage'], forecast['projected_overspend']) == (150, 133.3, 50)
+
+def test_fitted_levels_are_reused_until_past_days_change(client, auth_headers):
+    category_id = setup_budget(client, auth_headers)
+    get_forecasts(client, auth_headers)
+    queries = history_queries(client)
+
+    # Spending today counts as spent, without refitting
+    client.post('/api/transactions', json={
+        'amount': 25, 'type': 'expense', 'category_id': category_id, 'date': days_ago(0)
+    }, headers=auth_headers)
+    assert get_forecasts(client, auth_headers)[0]['projected_spend'] == 225
+    assert queries == []
+
+    # A backdated expense changes the history, so the category is fitted again
+    client.post('/api/transactions', json={
+        'amount': 70, 'type': 'expense', 'category_id': category_id, 'date': days_ago(3)
+    }, headers=auth_headers)
+    assert get_forecasts(client, auth_headers)[0]['projected_spend'] > 295
+    assert len(queries) == 1
+
+def test_fitted_levels_expire_and_are_never_changed_in_place(client, auth_headers):
+    category_id = setup_budget(client, auth_headers)
+    app = client.application
+    today = datetime.utcnow().date()
+
+    with app.app_context():
+        levels = spend_forecaster.levels(1, category_id, 'USD', today)
+        through, sums = levels.through, list(levels.sums)
+        # A later day folds the new days into a copy; readers of the old levels see no change
+        later = spend_forecaster.levels(1, category_id, 'USD', today + timedelta(days=3))
+        assert later is not levels
+        assert (levels.through, levels.sums) == (through, sums)
+        assert later.through == today + timedelta(days=2)
+
+    queries = history_queries(client)
+    app.config['FORECAST_MODEL_TIMEOUT'] = 0
+    get_forecasts(client, auth_headers)
+    get_forecasts(client, auth_headers)
+    assert len(queries) == 2
+
+def test_weekday_levels_fold_in_new_days_like_a_full_fit():
+    spend = np.random.default_rng(1).uniform(0, 5000, 200)
+    first_day = date(2024, 1, 3)
+
+    whole = WeekdayLevels(first_day - timedelta(days=1))
+    whole.update(first_day, spend, 0.2)
+    stepwise = WeekdayLevels(first_day - timedelta(days=1))
+    for start in range(0, 200, 30):
+        stepwise.update(first_day + timedelta(days=start), spend[start:start + 30], 0.2)
+
+    assert stepwise.through == whole.through == first_day + timedelta(days=199)
+    assert stepwise.sums == pytest.approx(whole.sums)
+    assert stepwise.weights == pytest.approx(whole.weights)
+
+def test_weekday_levels_follow_the_weekly_pattern():
+    first_day = date(2024, 1, 1)
+    # 70 on Saturdays, nothing on other days, for ten weeks
+    spend = np.array([70.0 if (first_day + timedelta(days=day)).weekday() == 5 else 0.0 for day in range(70)])
+    levels = WeekdayLevels(first_day - timedelta(days=1))
+    levels.update(first_day, spend, 0.2)
+
+    assert levels.daily(5) == pytest.approx(70)
+    assert levels.daily(0) == 0
+    # Two Saturdays from Thursday to the Wednesday after next
+    assert levels.total(date(2024, 3, 14), date(2024, 3, 27)) == pytest.approx(140)
+
+def test_forecast_requires_authentication(client):
+    assert client.get('/api/budgets/forecast').status_code == 401
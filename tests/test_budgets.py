@@ -0,0 +1,145 @@
+import json
+import pytest
+from sqlalchemy import event
+from app import create_app, db
+from app.config import TestingConfig
+from app.utils.helpers import check_budget_status
+
+@pytest.fixture
+def client():
+    app = create_app(TestingConfig)
+
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+        yield client
+        with app.app_context():
+            db.drop_all()
+
+@pytest.fixture
+def auth_headers(client):
+    # Register a user
+    client.post(
+        '/api/auth/register',
+        data=json.dumps({
+            'username': 'testuser',
+            'email': 'test@example.com',
+            'password': 'password123'
+        }),
+        content_type='application/json'
+    )
+
+    # Login to get token
+    response = client.post(
+        '/api/auth/login',
+        data=json.dumps({
+            'username': 'testuser',
+            'password': 'password123'
+        }),
+        content_type='application/json'
+    )
+
+    data = json.loads(response.data)
+    return {'Authorization': f'Bearer {data["access_token"]}'}
+
+def post(client, headers, url, payload):
+    response = client.post(url, data=json.dumps(payload), headers=headers, content_type='application/json')
+    assert response.status_code == 201
+    return json.loads(response.data)
+
+def create_category(client, headers, name):
+    return post(client, headers, '/api/categories', {'name': name})['category']['id']
+
+def create_budget(client, headers, category_id, amount, start_date='2024-01-01', end_date='2099-12-31'):
+    return post(client, headers, '/api/budgets', {
+        'amount': amount,
+        'category_id': category_id,
+        'start_date': start_date,
+        'end_date': end_date
+    })['budget']['id']
+
+def create_expense(client, headers, category_id, amount, date):
+    post(client, headers, '/api/transactions', {
+        'amount': amount,
+        'type': 'expense',
+        'category_id': category_id,
+        'date': date
+    })
+
+def count_statements(client, url, headers):
+    statements = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with client.application.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.get(url, headers=headers)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert response.status_code == 200
+    return len(statements), json.loads(response.data)
+
+def test_get_budgets_includes_spending(client, auth_headers):
+    groceries = create_category(client, auth_headers, 'Groceries')
+    rent = create_category(client, auth_headers, 'Rent')
+    groceries_budget = create_budget(client, auth_headers, groceries, 200, '2024-01-01', '2024-01-31')
+    rent_budget = create_budget(client, auth_headers, rent, 1000)
+
+    create_expense(client, auth_headers, groceries, 50, '2024-01-10')
+    create_expense(client, auth_headers, groceries, 100, '2024-01-31')
+    # Outside the groceries budget's date range
+    create_expense(client, auth_headers, groceries, 75, '2024-02-01')
+    post(client, auth_headers, '/api/transactions', {
+        'amount': 500, 'type': 'income', 'category_id': groceries, 'date': '2024-01-15'
+    })
+
+    response = client.get('/api/budgets', headers=auth_headers)
+
+    assert response.status_code == 200
+    budgets = {b['id']: b for b in json.loads(response.data)['budgets']}
+    assert budgets[groceries_budget]['spent'] == 150
+    assert budgets[groceries_budget]['remaining'] == 50
+    assert budgets[groceries_budget]['percentage_used'] == 75
+    assert budgets[groceries_budget]['category_name'] == 'Groceries'
+    assert budgets[rent_budget]['spent'] == 0
+    assert budgets[rent_budget]['remaining'] == 1000
+
+    response = client.get(f'/api/budgets/{groceries_budget}', headers=auth_headers)
+    assert json.loads(response.data)['budget']['spent'] == 150
+
+def test_get_budgets_query_count_is_independent_of_budget_count(client, auth_headers):
+    categories = [create_category(client, auth_headers, f'Category {i}') for i in range(6)]
+    create_budget(client, auth_headers, categories[0], 100)
+    create_expense(client, auth_headers, categories[0], 10, '2024-03-01')
+    few, _ = count_statements(client, '/api/budgets', auth_headers)
+
+    for category_id in categories[1:]:
+        create_budget(client, auth_headers, category_id, 100)
+        create_expense(client, auth_headers, category_id, 10, '2024-03-01')
+    many, data = count_statements(client, '/api/budgets', auth_headers)
+
+    assert len(data['budgets']) == 6
+    assert many == few
+
+def test_check_budget_status(client, auth_headers):
+    groceries = create_category(client, auth_headers, 'Groceries')
+    rent = create_category(client, auth_headers, 'Rent')
+    fun = create_category(client, auth_headers, 'Fun')
+    groceries_budget = create_budget(client, auth_headers, groceries, 100)
+    rent_budget = create_budget(client, auth_headers, rent, 100)
+    create_budget(client, auth_headers, fun, 100)
+
+    create_expense(client, auth_headers, groceries, 120, '2024-06-01')
+    create_expense(client, auth_headers, rent, 85, '2024-06-01')
+    create_expense(client, auth_headers, fun, 10, '2024-06-01')
+
+    with client.application.app_context():
+        alerts = {a['budget_id']: a for a in check_budget_status(1)}
+
+    assert set(alerts) == {groceries_budget, rent_budget}
+    assert alerts[groceries_budget]['severity'] == 'high'
+    assert alerts[rent_budget]['severity'] == 'medium'
+    assert alerts[rent_budget]['category_name'] == 'Rent'
@@ -0,0 +1,166 @@
+import json
+import time
+import pytest
+from app import create_app, db
+from app.config import TestingConfig
+from app.utils.cache import MemoryBackend, cache
+
+class FakeRedis:
+    """The subset of the redis-py client API used by RedisBackend"""
+
+    def __init__(self):
+        self.data = {}
+
+    def get(self, name):
+        value = self.data.get(name)
+        return value.encode() if isinstance(value, str) else value
+
+    def set(self, name, value, ex=None, nx=False):
+        if nx and name in self.data:
+            return None
+        self.data[name] = str(value)
+        return True
+
+    def incr(self, name):
+        self.data[name] = str(int(self.data.get(name, 0)) + 1)
+        return int(self.data[name])
+
+@pytest.fixture(params=['memory', 'redis'])
+def client(request):
+    class TestConfig(TestingConfig):
+        CACHE_BACKEND = request.param
+        CACHE_REDIS_CLIENT = FakeRedis()
+
+    app = create_app(TestConfig)
+
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+        yield client
+        with app.app_context():
+            db.drop_all()
+
+def login(client, username):
+    client.post(
+        '/api/auth/register',
+        data=json.dumps({
+            'username': username,
+            'email': f'{username}@example.com',
+            'password': 'password123'
+        }),
+        content_type='application/json'
+    )
+    response = client.post(
+        '/api/auth/login',
+        data=json.dumps({'username': username, 'password': 'password123'}),
+        content_type='application/json'
+    )
+    return {'Authorization': f'Bearer {json.loads(response.data)["access_token"]}'}
+
+def create_category(client, headers, name):
+    response = client.post(
+        '/api/categories',
+        data=json.dumps({'name': name}),
+        headers=headers,
+        content_type='application/json'
+    )
+    assert response.status_code == 201
+    return json.loads(response.data)['category']['id']
+
+def test_read_endpoints_are_cached_until_a_write(client):
+    headers = login(client, 'alice')
+    create_category(client, headers, 'Groceries')
+
+    first = client.get('/api/categories', headers=headers)
+    second = client.get('/api/categories', headers=headers)
+    assert first.headers['X-Cache'] == 'MISS'
+    assert second.headers['X-Cache'] == 'HIT'
+    assert first.data == second.data
+
+    create_category(client, headers, 'Rent')
+    third = client.get('/api/categories', headers=headers)
+    assert third.headers['X-Cache'] == 'MISS'
+    assert len(json.loads(third.data)['categories']) == 2
+
+    with client.application.app_context():
+        stats = cache.stats.to_dict()
+    assert stats['hits'] == 1
+    assert stats['misses'] == 2
+
+def test_transaction_writes_invalidate_summary(client):
+    headers = login(client, 'alice')
+    category_id = create_category(client, headers, 'Groceries')
+    client.get('/api/transactions/summary', headers=headers)
+
+    client.post(
+        '/api/transactions',
+        data=json.dumps({'amount': 12, 'type': 'expense', 'category_id': category_id}),
+        headers=headers,
+        content_type='application/json'
+    )
+    response = client.get('/api/transactions/summary', headers=headers)
+
+    assert response.headers['X-Cache'] == 'MISS'
+    assert json.loads(response.data)['summary']['total_expense'] == 12
+
+def test_cache_is_keyed_by_user_and_arguments(client):
+    alice = login(client, 'alice')
+    bob = login(client, 'bob')
+    create_category(client, alice, 'Groceries')
+
+    client.get('/api/categories', headers=alice)
+    response = client.get('/api/categories', headers=bob)
+    assert response.headers['X-Cache'] == 'MISS'
+    assert json.loads(response.data)['categories'] == []
+
+    client.get('/api/transactions?type=expense&limit=5', headers=alice)
+    response = client.get('/api/transactions?limit=5&type=expense', headers=alice)
+    assert response.headers['X-Cache'] == 'HIT'
+    response = client.get('/api/transactions?limit=6&type=expense', headers=alice)
+    assert response.headers['X-Cache'] == 'MISS'
+
+def test_if_none_match_returns_304(client):
+    headers = login(client, 'alice')
+    create_category(client, headers, 'Groceries')
+
+    response = client.get('/api/categories', headers=headers)
+    etag = response.headers['ETag']
+
+    response = client.get('/api/categories', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.data == b''
+
+    create_category(client, headers, 'Rent')
+    response = client.get('/api/categories', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+
+def test_streamed_responses_are_not_cached(client):
+    headers = login(client, 'alice')
+
+    client.get('/api/transactions?format=ndjson', headers=headers)
+    response = client.get('/api/transactions?format=ndjson', headers=headers)
+
+    assert 'X-Cache' not in response.headers
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = MemoryBackend(max_entries=2)
+    backend.set('a', 1, ttl=60)
+    backend.set('b', 2, ttl=60)
+    backend.get('a')
+    backend.set('c', 3, ttl=60)
+
+    assert backend.get('a') == 1
+    assert backend.get('b') is None
+    assert backend.get('c') == 3
+
+def test_memory_backend_expires_entries_and_keeps_counters():
+    backend = MemoryBackend(max_entries=1)
+    backend.set('a', 1, ttl=0.01)
+    backend.add_counter('version:1', 100)
+    backend.incr('version:1')
+    time.sleep(0.02)
+    backend.set('b', 2, ttl=60)
+    backend.set('c', 3, ttl=60)
+
+    assert backend.get('a') is None
+    assert backend.get('version:1') == 101
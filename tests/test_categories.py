@@ -1,14 +1,13 @@
 import json
 import pytest
 from app import create_app, db
+from app.config import TestingConfig
 from app.models.user import User
 from app.models.category import Category
 
 @pytest.fixture
 def client():
-    app = create_app()
-    app.config['TESTING'] = True
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
+    app = create_app(TestingConfig)
     
     with app.test_client() as client:
         with app.app_context():
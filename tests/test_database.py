@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import text
+from app import create_app, db
+from app.config import Config, PostgresConfig, TestingConfig
+from app.database import engine_options, sqlite_pragmas
+
+def config_dict(config_class, **overrides):
+    config = {key: getattr(config_class, key) for key in dir(config_class) if key.isupper()}
+    config.update(overrides)
+    return config
+
+def test_engine_options_for_postgres_profile():
+    options = engine_options(config_dict(
+        PostgresConfig,
+        SQLALCHEMY_DATABASE_URI='postgresql+psycopg://app@db/finance_tracker',
+        DB_POOL_SIZE=10,
+        DB_MAX_OVERFLOW=20,
+        DB_STATEMENT_TIMEOUT_MS=30000,
+        DB_PREPARE_THRESHOLD=5
+    ))
+
+    assert options['pool_size'] == 10
+    assert options['max_overflow'] == 20
+    assert options['pool_pre_ping'] is True
+    assert options['connect_args'] == {'options': '-c statement_timeout=30000', 'prepare_threshold': 5}
+
+def test_engine_options_skip_psycopg_settings_for_other_drivers():
+    options = engine_options(config_dict(
+        Config,
+        SQLALCHEMY_DATABASE_URI='postgresql+psycopg2://app@db/finance_tracker',
+        DB_STATEMENT_TIMEOUT_MS=0,
+        DB_PREPARE_THRESHOLD=5
+    ))
+
+    assert 'connect_args' not in options
+
+def test_engine_options_leave_sqlite_pooling_alone():
+    assert engine_options(config_dict(Config, SQLALCHEMY_DATABASE_URI='sqlite:///:memory:')) == {}
+
+def test_sqlite_pragmas_are_applied_on_connect(tmp_path):
+    class TestConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(tmp_path / 'test.db')
+        SQLITE_BUSY_TIMEOUT_MS = 1234
+
+    app = create_app(TestConfig)
+
+    with app.app_context():
+        pragma = lambda name: db.session.execute(text(f'PRAGMA {name}')).scalar()
+        assert pragma('journal_mode') == 'wal'
+        assert pragma('synchronous') == 1
+        assert pragma('busy_timeout') == 1234
+        assert pragma('mmap_size') == Config.SQLITE_MMAP_SIZE
+        db.engine.dispose()
+
+def test_explicit_engine_options_win():
+    class TestConfig(TestingConfig):
+        SQLALCHEMY_ENGINE_OPTIONS = {'echo': True}
+
+    app = create_app(TestConfig)
+
+    assert app.config['SQLALCHEMY_ENGINE_OPTIONS'] == {'echo': True}
+
+def test_sqlite_pragmas_reject_unknown_modes():
+    with pytest.raises(ValueError):
+        sqlite_pragmas(config_dict(Config, SQLITE_JOURNAL_MODE='WAL; DROP TABLE users'))
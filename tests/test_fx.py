@@ -0,0 +1,202 @@
+import io
+import json
+import pytest
+from app import create_app, db
+from app.config import TestingConfig
+from app.models.fx_rate import FxRate
+from app.utils.fx import load_rates, rate_cache
+
+RATES = (
+    'date,base,quote,rate\n'
+    '2024-01-05,EUR,USD,1.10\n'
+    '2024-01-08,EUR,USD,1.20\n'
+)
+
+@pytest.fixture
+def client():
+    class TestConfig(TestingConfig):
+        FX_RATE_CACHE_SIZE = 2
+
+    app = create_app(TestConfig)
+
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+        yield client
+        with app.app_context():
+            db.drop_all()
+
+@pytest.fixture
+def auth_headers(client):
+    client.post(
+        '/api/auth/register',
+        data=json.dumps({
+            'username': 'testuser',
+            'email': 'test@example.com',
+            'password': 'password123'
+        }),
+        content_type='application/json'
+    )
+    response = client.post(
+        '/api/auth/login',
+        data=json.dumps({'username': 'testuser', 'password': 'password123'}),
+        content_type='application/json'
+    )
+    return {'Authorization': f'Bearer {json.loads(response.data)["access_token"]}'}
+
+@pytest.fixture
+def category_id(client, auth_headers):
+    response = client.post(
+        '/api/categories',
+        data=json.dumps({'name': 'Travel'}),
+        headers=auth_headers,
+        content_type='application/json'
+    )
+    return json.loads(response.data)['category']['id']
+
+def post(client, headers, url, payload):
+    response = client.post(url, data=json.dumps(payload), headers=headers, content_type='application/json')
+    assert response.status_code == 201
+    return json.loads(response.data)
+
+def load(client, content=RATES):
+    with client.application.app_context():
+        return load_rates(io.BytesIO(content.encode()))
+
+def summary(client, headers, query=''):
+    return json.loads(client.get(f'/api/transactions/summary{query}', headers=headers).data)['summary']
+
+def test_load_rates_stores_inverse_rates(client):
+    assert load(client) == 2
+
+    with client.application.app_context():
+        rates = {(rate.base, rate.quote, rate.date.isoformat()): rate.rate for rate in FxRate.query.all()}
+    assert rates[('EUR', 'USD', '2024-01-05')] == 1.10
+    assert rates[('USD', 'EUR', '2024-01-08')] == pytest.approx(1 / 1.20)
+
+def test_load_rates_rejects_bad_rows(client):
+    with pytest.raises(ValueError, match='Line 2'):
+        load(client, 'date,base,quote,rate\n2024-01-05,EUR,USD,-1\n')
+    with pytest.raises(ValueError):
+        load(client, 'day,from,to,rate\n')
+
+def test_fx_cli_loads_rates(client, tmp_path):
+    path = tmp_path / 'rates.csv'
+    path.write_text(RATES)
+
+    result = client.application.test_cli_runner().invoke(args=['fx', 'load', str(path)])
+
+    assert result.exit_code == 0
+    assert 'Loaded 2 exchange rates' in result.output
+
+def test_summary_converts_to_reporting_currency(client, auth_headers, category_id):
+    load(client)
+    post(client, auth_headers, '/api/transactions', {
+        'amount': 100, 'type': 'expense', 'category_id': category_id, 'date': '2024-01-05', 'currency': 'EUR'
+    })
+    # A Sunday: uses the rate of Friday 2024-01-05
+    post(client, auth_headers, '/api/transactions', {
+        'amount': 10, 'type': 'expense', 'category_id': category_id, 'date': '2024-01-07', 'currency': 'EUR'
+    })
+    post(client, auth_headers, '/api/transactions', {
+        'amount': 5.5, 'type': 'expense', 'category_id': category_id, 'date': '2024-01-08'
+    })
+
+    usd = summary(client, auth_headers)
+    assert usd['currency'] == 'USD'
+    assert usd['total_expense'] == 126.5
+    assert usd['missing_rates'] == []
+
+    eur = summary(client, auth_headers, '?currency=EUR&group_by=day')
+    assert eur['total_expense'] == pytest.approx(114.58)
+    assert [group['expense'] for group in eur['groups']] == [100, 10, pytest.approx(4.58)]
+
+def test_summary_reports_missing_rates(client, auth_headers, category_id):
+    post(client, auth_headers, '/api/transactions', {
+        'amount': 100, 'type': 'expense', 'category_id': category_id, 'date': '2024-01-05', 'currency': 'GBP'
+    })
+    post(client, auth_headers, '/api/transactions', {
+        'amount': 20, 'type': 'expense', 'category_id': category_id, 'date': '2024-01-05'
+    })
+
+    result = summary(client, auth_headers)
+
+    assert result['total_expense'] == 20
+    assert result['missing_rates'] == ['GBP']
+
+def test_reporting_currency_follows_profile(client, auth_headers, category_id):
+    load(client)
+    post(client, auth_headers, '/api/transactions', {
+        'amount': 11, 'type': 'expense', 'category_id': category_id, 'date': '2024-01-05'
+    })
+    assert summary(client, auth_headers)['total_expense'] == 11
+
+    response = client.put(
+        '/api/users/me',
+        data=json.dumps({'reporting_currency': 'eur'}),
+        headers=auth_headers,
+        content_type='application/json'
+    )
+    assert json.loads(response.data)['user']['reporting_currency'] == 'EUR'
+
+    result = summary(client, auth_headers)
+    assert result['currency'] == 'EUR'
+    assert result['total_expense'] == 10
+
+def test_budget_spending_is_converted_to_budget_currency(client, auth_headers, category_id):
+    load(client)
+    post(client, auth_headers, '/api/budgets', {
+        'amount': 500, 'currency': 'USD', 'category_id': category_id,
+        'start_date': '2024-01-01', 'end_date': '2024-01-31'
+    })
+    post(client, auth_headers, '/api/transactions', {
+        'amount': 100, 'type': 'expense', 'category_id': category_id, 'date': '2024-01-08', 'currency': 'EUR'
+    })
+
+    budget = json.loads(client.get('/api/budgets', headers=auth_headers).data)['budgets'][0]
+
+    assert budget['spent'] == 120
+    assert budget['remaining'] == 380
+    assert budget['percentage_used'] == 24
+    assert budget['unconverted_days'] == 0
+
+def test_reports_flag_amounts_without_rates(client, auth_headers, category_id):
+    post(client, auth_headers, '/api/budgets', {
+        'amount': 500, 'currency': 'USD', 'category_id': category_id,
+        'start_date': '2024-01-01', 'end_date': '2024-01-31'
+    })
+    for day in ('2024-01-05', '2024-01-06'):
+        post(client, auth_headers, '/api/transactions', {
+            'amount': 100, 'type': 'expense', 'category_id': category_id, 'date': day, 'currency': 'GBP'
+        })
+    post(client, auth_headers, '/api/transactions', {
+        'amount': 20, 'type': 'expense', 'category_id': category_id, 'date': '2024-01-05'
+    })
+
+    budget = json.loads(client.get('/api/budgets', headers=auth_headers).data)['budgets'][0]
+    assert (budget['spent'], budget['unconverted_days']) == (20, 2)
+
+    response = client.get('/api/reports/spending?period=2024-01', headers=auth_headers)
+    assert json.loads(response.data)['report']['missing_rates'] == ['GBP']
+    response = client.get('/api/reports/cashflow?start_date=2024-01-01&end_date=2024-01-31', headers=auth_headers)
+    assert json.loads(response.data)['cashflow']['missing_rates'] == ['GBP']
+
+    load(client, 'date,base,quote,rate\n2024-01-01,GBP,USD,1.25\n')
+    client.post('/api/categories', json={'name': 'Rent'}, headers=auth_headers)
+    budget = json.loads(client.get('/api/budgets', headers=auth_headers).data)['budgets'][0]
+    assert (budget['spent'], budget['unconverted_days']) == (270, 0)
+
+def test_rate_endpoint_uses_bounded_cache(client, auth_headers):
+    load(client)
+
+    response = client.get('/api/fx/rates/eur/usd?date=2024-01-06', headers=auth_headers)
+    assert response.status_code == 200
+    assert json.loads(response.data)['rate'] == {
+        'base': 'EUR', 'quote': 'USD', 'date': '2024-01-06', 'rate': 1.10
+    }
+    response = client.get('/api/fx/rates/EUR/USD?date=2024-01-04', headers=auth_headers)
+    assert response.status_code == 404
+    client.get('/api/fx/rates/USD/EUR?date=2024-01-09', headers=auth_headers)
+
+    with client.application.app_context():
+        assert len(rate_cache.backend._entries) == 2
@@ -0,0 +1,124 @@
+import logging
+import pytest
+from sqlalchemy import text
+from app import create_app, db
+from app.config import TestingConfig
+
+def make_app(**config):
+    class MetricsConfig(TestingConfig):
+        METRICS_TOKEN = 'scrape-token'
+
+    for key, value in config.items():
+        setattr(MetricsConfig, key, value)
+
+    app = create_app(MetricsConfig)
+    with app.app_context():
+        db.create_all()
+    return app
+
+@pytest.fixture
+def client():
+    with make_app().test_client() as client:
+        yield client
+
+def auth_headers(client):
+    client.post('/api/auth/register', json={
+        'username': 'testuser',
+        'email': 'test@example.com',
+        'password': 'password123'
+    })
+    response = client.post('/api/auth/login', json={'username': 'testuser', 'password': 'password123'})
+    return {'Authorization': f'Bearer {response.get_json()["access_token"]}'}
+
+def scrape(client):
+    response = client.get('/api/metrics', headers={'Authorization': 'Bearer scrape-token'})
+    assert response.status_code == 200
+    assert response.mimetype == 'text/plain'
+    samples = {}
+    for line in response.get_data(as_text=True).splitlines():
+        if not line.startswith('#'):
+            name, value = line.rsplit(' ', 1)
+            samples[name] = float(value)
+    return samples
+
+def test_requests_are_recorded_per_route(client):
+    headers = auth_headers(client)
+    client.post('/api/categories', json={'name': 'Groceries'}, headers=headers)
+    for _ in range(2):
+        client.get('/api/categories', headers=headers)
+    client.get('/api/categories/1', headers=headers)
+    client.get('/api/nope')
+
+    samples = scrape(client)
+
+    route = 'method="GET",route="/api/categories"'
+    assert samples['http_requests_total{method="GET",route="/api/categories",status="200"}'] == 2
+    assert samples['http_requests_total{method="GET",route="/api/categories/<int:id>",status="200"}'] == 1
+    assert samples['http_requests_total{method="GET",route="unmatched",status="404"}'] == 1
+    assert samples[f'http_request_duration_seconds_count{{{route}}}'] == 2
+    assert samples[f'http_request_duration_seconds_bucket{{{route},le="+Inf"}}'] == 2
+    # The first listing runs the category query; the second comes from the response cache
+    assert samples[f'http_request_sql_statements_sum{{{route}}}'] >= 1
+    assert samples[f'http_request_sql_statements_bucket{{{route},le="0"}}'] == 1
+    assert samples[f'http_request_sql_duration_seconds_count{{{route}}}'] == 2
+    assert samples[f'http_response_size_bytes_sum{{{route}}}'] > 0
+    assert samples['response_cache_hits_total'] == 1
+
+def test_slow_queries_are_logged_with_parameters(caplog):
+    client = make_app(SLOW_QUERY_MS=0).test_client()
+
+    with caplog.at_level(logging.WARNING, logger='app.utils.metrics'):
+        client.post('/api/auth/login', json={'username': 'nobody', 'password': 'password123'})
+
+    messages = [record.getMessage() for record in caplog.records]
+    assert any('Slow query' in message and 'FROM users' in message and "'nobody'" in message
+               for message in messages)
+    assert scrape(client)['sql_slow_queries_total'] >= 1
+
+def test_slow_query_parameters_are_truncated(caplog):
+    app = make_app(SLOW_QUERY_MS=0)
+
+    @app.route('/api/big')
+    def big():
+        db.session.execute(text('SELECT :value'), {'value': 'x' * 100000})
+        db.session.execute(text('CREATE TEMP TABLE notes (body TEXT)'))
+        db.session.execute(text('INSERT INTO notes VALUES (:body)'), [{'body': 'y' * 1000}] * 50)
+        return {}
+
+    with caplog.at_level(logging.WARNING, logger='app.utils.metrics'):
+        app.test_client().get('/api/big')
+
+    messages = [record.getMessage() for record in caplog.records if 'Slow query' in record.getMessage()]
+    assert any('xxx... (100005 characters)' in message for message in messages)
+    assert any(message.endswith('parameters: 50 parameter sets') for message in messages)
+    assert max(len(message) for message in messages) < 1000
+
+def test_repeated_statements_are_flagged_as_n_plus_one(caplog):
+    app = make_app(N_PLUS_ONE_THRESHOLD=2)
+
+    @app.route('/api/loop')
+    def loop():
+        for value in range(3):
+            db.session.execute(text('SELECT :value'), {'value': value})
+        return {}
+
+    client = app.test_client()
+    with caplog.at_level(logging.WARNING, logger='app.utils.metrics'):
+        client.get('/api/loop')
+
+    assert any('Possible N+1 query in GET /api/loop: ran 3 times' in record.getMessage()
+               for record in caplog.records)
+    assert scrape(client)['http_request_n_plus_one_total{method="GET",route="/api/loop"}'] == 1
+
+def test_metrics_can_be_disabled():
+    client = make_app(METRICS_ENABLED=False).test_client()
+
+    assert client.get('/api/metrics').status_code == 404
+
+def test_metrics_need_the_token():
+    client = make_app().test_client()
+
+    assert client.get('/api/metrics').status_code == 401
+    assert client.get('/api/metrics', headers={'Authorization': 'Bearer wrong'}).status_code == 401
+    # Without a token the endpoint is not served at all
+    assert make_app(METRICS_TOKEN=None).test_client().get('/api/metrics').status_code == 404
@@ -0,0 +1,28 @@
+from decimal import Decimal
+import pytest
+from app.utils.money import format_cents, from_cents, parse_currency, to_cents
+
+def test_to_cents():
+    assert to_cents(12) == 1200
+    assert to_cents(0.1) == 10
+    assert to_cents('19.99') == 1999
+    assert to_cents(Decimal('-2.005')) == -201
+    assert to_cents('0.125') == 13
+
+@pytest.mark.parametrize('value', ['ten', '', 'nan', 'Infinity', True, None])
+def test_to_cents_rejects_non_numbers(value):
+    with pytest.raises(ValueError):
+        to_cents(value)
+
+def test_from_and_format_cents():
+    assert from_cents(1999) == 19.99
+    assert format_cents(-1234) == '-12.34'
+    assert format_cents(5) == '0.05'
+    assert format_cents(0) == '0.00'
+
+def test_parse_currency():
+    assert parse_currency(None) == 'USD'
+    assert parse_currency('', 'EUR') == 'EUR'
+    assert parse_currency(' gbp ') == 'GBP'
+    with pytest.raises(ValueError):
+        parse_currency('EURO')
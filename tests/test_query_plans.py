@@ -0,0 +1,198 @@
+"""Query-plan regression tests.
+
+Every SELECT issued by the read endpoints is captured and run through the
+database's EXPLAIN. The tests fail if any of them reads one of the indexed
+tables with a full scan. Set TEST_POSTGRES_URL to also check the plans on
+PostgreSQL.
+"""
+import json
+import os
+import re
+from datetime import date
+import pytest
+from sqlalchemy import event
+from app import create_app, db
+from app.config import TestingConfig
+from app.utils.anomalies import anomaly_detector
+from app.utils.helpers import check_budget_status, get_spending_summary
+from app.utils.recurring import materialize_due
+
+INDEXED_TABLES = ('transactions', 'budgets', 'categories', 'daily_category_totals', 'fx_rates', 'recurring_transactions')
+
+READ_ENDPOINTS = [
+    '/api/transactions',
+    '/api/transactions?type=expense&category_id=1',
+    '/api/transactions?start_date=2024-01-01&end_date=2024-01-31',
+    '/api/transactions/summary?start_date=2024-01-01&end_date=2024-12-31',
+    '/api/transactions/summary?group_by=month',
+    '/api/transactions/summary?currency=EUR',
+    '/api/budgets',
+    '/api/budgets?active_only=true',
+    '/api/budgets/1',
+    '/api/budgets/forecast',
+    '/api/categories',
+    '/api/recurring',
+    '/api/reports/cashflow?start_date=2024-01-01&end_date=2024-12-31&group_by=week',
+]
+
+def database_urls():
+    urls = [pytest.param('sqlite:///:memory:', id='sqlite')]
+    if os.environ.get('TEST_POSTGRES_URL'):
+        urls.append(pytest.param(os.environ['TEST_POSTGRES_URL'], id='postgresql'))
+    return urls
+
+@pytest.fixture(params=database_urls())
+def client(request):
+    # The engine is created by create_app, so the URL has to be set up front
+    class TestConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = request.param
+
+    app = create_app(TestConfig)
+
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+        yield client
+        with app.app_context():
+            db.drop_all()
+
+@pytest.fixture
+def auth_headers(client):
+    client.post(
+        '/api/auth/register',
+        data=json.dumps({
+            'username': 'testuser',
+            'email': 'test@example.com',
+            'password': 'password123'
+        }),
+        content_type='application/json'
+    )
+    response = client.post(
+        '/api/auth/login',
+        data=json.dumps({
+            'username': 'testuser',
+            'password': 'password123'
+        }),
+        content_type='application/json'
+    )
+    return {'Authorization': f'Bearer {json.loads(response.data)["access_token"]}'}
+
+@pytest.fixture
+def seeded(client, auth_headers):
+    response = client.post(
+        '/api/categories',
+        data=json.dumps({'name': 'Groceries'}),
+        headers=auth_headers,
+        content_type='application/json'
+    )
+    category_id = json.loads(response.data)['category']['id']
+    for day in range(1, 6):
+        client.post(
+            '/api/transactions',
+            data=json.dumps({
+                'amount': 10,
+                'type': 'expense',
+                'category_id': category_id,
+                'date': f'2024-01-0{day}'
+            }),
+            headers=auth_headers,
+            content_type='application/json'
+        )
+    client.post(
+        '/api/budgets',
+        data=json.dumps({
+            'amount': 100,
+            'category_id': category_id,
+            'start_date': '2024-01-01',
+            'end_date': '2099-12-31'
+        }),
+        headers=auth_headers,
+        content_type='application/json'
+    )
+    return auth_headers
+
+class StatementRecorder:
+    """Collects the SELECT statements executed on an engine"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self.record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.engine, 'before_cursor_execute', self.record)
+
+    def record(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            self.statements.append((statement, parameters))
+
+def full_scans(engine, statements):
+    """Return the (statement, plan line) pairs that scan an indexed table"""
+    problems = []
+    with engine.connect() as conn:
+        if engine.dialect.name == 'postgresql':
+            # Tiny test tables make sequential scans look cheap, so only
+            # report the ones the planner can't avoid
+            conn.exec_driver_sql('SET enable_seqscan = off')
+        for statement, parameters in statements:
+            if engine.dialect.name == 'sqlite':
+                rows = conn.exec_driver_sql('EXPLAIN QUERY PLAN ' + statement, parameters).fetchall()
+                plan = [row[-1] for row in rows]
+                pattern = r'^SCAN ({})\b'
+            else:
+                rows = conn.exec_driver_sql('EXPLAIN ' + statement, parameters).fetchall()
+                plan = [row[0] for row in rows]
+                pattern = r'Seq Scan on ({})\b'
+            pattern = pattern.format('|'.join(INDEXED_TABLES))
+            problems.extend((statement, line) for line in plan if re.search(pattern, line.strip()))
+    return problems
+
+@pytest.mark.parametrize('url', READ_ENDPOINTS)
+def test_read_endpoints_use_indexes(client, seeded, url):
+    with client.application.app_context():
+        engine = db.engine
+    with StatementRecorder(engine) as recorder:
+        response = client.get(url, headers=seeded)
+    assert response.status_code == 200
+    assert recorder.statements
+
+    with client.application.app_context():
+        assert full_scans(db.engine, recorder.statements) == []
+
+def test_report_helpers_use_indexes(client, seeded):
+    with client.application.app_context():
+        with StatementRecorder(db.engine) as recorder:
+            get_spending_summary(1)
+            check_budget_status(1)
+        assert recorder.statements
+        assert full_scans(db.engine, recorder.statements) == []
+
+def test_anomaly_scoring_uses_indexes(client, seeded):
+    with client.application.app_context():
+        anomaly_detector.forget_all()
+        engine = db.engine
+    with StatementRecorder(engine) as recorder:
+        response = client.post('/api/transactions', json={
+            'amount': 10, 'type': 'expense', 'category_id': 1, 'date': '2024-01-06'
+        }, headers=seeded)
+    assert response.status_code == 201
+    assert any('transactions.amount_cents' in statement for statement, _ in recorder.statements)
+
+    with client.application.app_context():
+        assert full_scans(db.engine, recorder.statements) == []
+
+def test_recurring_materializer_uses_indexes(client, seeded):
+    response = client.post('/api/recurring', json={
+        'amount': 10, 'type': 'expense', 'category_id': 1, 'frequency': 'daily', 'start_date': '2099-01-01'
+    }, headers=seeded)
+    assert response.status_code == 201
+
+    with client.application.app_context():
+        engine = db.engine
+        with StatementRecorder(engine) as recorder:
+            assert materialize_due(date(2099, 1, 3)) == (1, 3)
+        assert any('FROM recurring_transactions' in statement for statement, _ in recorder.statements)
+        assert full_scans(engine, recorder.statements) == []
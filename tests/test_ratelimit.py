@@ -0,0 +1,173 @@
+import json
+import math
+import time
+import pytest
+from app import create_app, db
+from app.config import TestingConfig
+from app.utils.ratelimit import MemoryBucketStore, RedisBucketStore, parse_rate_limit, take_token
+
+class FakeRedis:
+    """A Redis server in a dict, shared by workers, that runs RedisBucketStore.SCRIPT.
+
+    Lua is not available here, so eval runs a line by line transcription of
+    the script against the TIME, GET and SET commands below. The commands
+    keep the server's semantics: keys set with EX vanish once they expire,
+    and the clock can be moved forward.
+    """
+
+    def __init__(self):
+        self.data = {}
+        self.expiry = {}
+        self.clock = 1700000000.0
+
+    def call(self, command, *args):
+        if command == 'TIME':
+            seconds = int(self.clock)
+            return [str(seconds), str(int((self.clock - seconds) * 1000000))]
+        key = args[0]
+        if key in self.expiry and self.expiry[key] <= self.clock:
+            del self.data[key], self.expiry[key]
+        if command == 'GET':
+            return self.data.get(key)
+        if command == 'SET':
+            value, option, seconds = args[1:]
+            assert option == 'EX' and seconds > 0, 'SET needs a positive EX'
+            self.data[key] = value
+            self.expiry[key] = self.clock + seconds
+            return 'OK'
+        raise ValueError(f'Unsupported command: {command}')
+
+    def eval(self, script, numkeys, *keys_and_args):
+        assert script == RedisBucketStore.SCRIPT, 'the transcription below follows RedisBucketStore.SCRIPT'
+        KEYS, ARGV = keys_and_args[:numkeys], keys_and_args[numkeys:]
+        now = self.call('TIME')
+        now = float(now[0]) + float(now[1]) / 1000000
+        tat = self.call('GET', KEYS[0])
+        tat = float(tat) if tat is not None else None
+        if tat is None or tat < now:
+            tat = now
+        wait = tat + float(ARGV[0]) - now - float(ARGV[1])
+        if wait > 0:
+            return repr(wait).encode()
+        tat = tat + float(ARGV[0])
+        self.call('SET', KEYS[0], repr(tat), 'EX', math.ceil(tat - now))
+        return b'0'
+
+def make_app(rules=None, **config):
+    class RateLimitConfig(TestingConfig):
+        RATELIMIT_ENABLED = True
+        RATELIMIT_RULES = {'auth.login': 'ip:3/minute', 'auth.register': None, **(rules or {})}
+
+    for key, value in config.items():
+        setattr(RateLimitConfig, key, value)
+
+    app = create_app(RateLimitConfig)
+    with app.app_context():
+        db.create_all()
+    return app
+
+@pytest.fixture
+def client():
+    with make_app().test_client() as client:
+        yield client
+
+def register(client, username='testuser'):
+    client.post('/api/auth/register', json={
+        'username': username,
+        'email': f'{username}@example.com',
+        'password': 'password123'
+    })
+
+def login(client, username='testuser', ip='127.0.0.1'):
+    return client.post('/api/auth/login', json={'username': username, 'password': 'password123'},
+                       environ_base={'REMOTE_ADDR': ip})
+
+def test_login_is_throttled_per_ip(client):
+    register(client)
+
+    assert [login(client).status_code for _ in range(3)] == [200, 200, 200]
+    response = login(client)
+
+    assert response.status_code == 429
+    assert json.loads(response.data) == {'message': 'Too many requests'}
+    assert 1 <= int(response.headers['Retry-After']) <= 20
+    assert login(client, ip='10.0.0.2').status_code == 200
+    # Other routes are not limited
+    assert client.get('/api/health').status_code == 200
+
+def test_user_limits_apply_per_user_after_authentication():
+    app = make_app({'auth.login': None, 'categories': 'user:2/minute'})
+    client = app.test_client()
+    headers = {}
+    for username in ('alice', 'bob'):
+        register(client, username)
+        token = json.loads(login(client, username).data)['access_token']
+        headers[username] = {'Authorization': f'Bearer {token}'}
+
+    # The blueprint rule covers all its routes with one bucket per user
+    assert client.get('/api/categories', headers=headers['alice']).status_code == 200
+    assert client.post('/api/categories', json={'name': 'Rent'}, headers=headers['alice']).status_code == 201
+    assert client.get('/api/categories', headers=headers['alice']).status_code == 429
+    assert client.get('/api/categories', headers=headers['bob']).status_code == 200
+    # Requests that fail authentication take no tokens
+    assert client.get('/api/categories').status_code == 401
+
+def test_shared_store_limits_across_workers():
+    redis = FakeRedis()
+    workers = [make_app(RATELIMIT_STORAGE='redis', RATELIMIT_REDIS_CLIENT=redis) for _ in range(2)]
+    # Each worker has its own in-memory database; only the buckets are shared
+    for app in workers:
+        register(app.test_client())
+
+    statuses = [login(workers[i % 2].test_client()).status_code for i in range(4)]
+
+    assert statuses == [200, 200, 200, 429]
+    assert list(redis.data) == ['finance-tracker:ratelimit:auth.login:127.0.0.1']
+
+def test_redis_buckets_expire_once_refilled():
+    redis = FakeRedis()
+    store = RedisBucketStore(redis)
+    # 2 tokens per 10 seconds
+    assert store.take('k', 5.0, 10.0) == 0
+    assert store.take('k', 5.0, 10.0) == 0
+    assert 4.9 < store.take('k', 5.0, 10.0) <= 5.0
+    # The key expires once the bucket is full again, not before
+    assert redis.expiry['finance-tracker:ratelimit:k'] - redis.clock == 10
+    redis.clock += 9.5
+    assert redis.call('GET', 'finance-tracker:ratelimit:k') is not None
+    redis.clock += 0.5
+    assert redis.call('GET', 'finance-tracker:ratelimit:k') is None
+    assert store.take('k', 5.0, 10.0) == 0
+
+def test_disabled_limiter_lets_everything_through():
+    client = make_app(RATELIMIT_ENABLED=False).test_client()
+    register(client)
+
+    assert {login(client).status_code for _ in range(5)} == {200}
+
+def test_token_bucket_refills_at_the_rule_rate():
+    # 2 tokens per 10 seconds: one every 5 seconds, at most 2 saved up
+    tat, wait = take_token(None, 100.0, 5.0, 10.0)
+    assert (tat, wait) == (105.0, 0)
+    tat, wait = take_token(tat, 100.0, 5.0, 10.0)
+    assert (tat, wait) == (110.0, 0)
+    assert take_token(tat, 100.0, 5.0, 10.0) == (110.0, 5.0)
+    assert take_token(tat, 106.0, 5.0, 10.0) == (115.0, 0)
+    # A long idle spell refills the bucket but never beyond its size
+    assert take_token(tat, 500.0, 5.0, 10.0) == (505.0, 0)
+
+def test_memory_store_drops_refilled_buckets():
+    store = MemoryBucketStore(max_keys=2)
+    store.take('a', 0.001, 1)
+    store.take('b', 0.001, 1)
+    time.sleep(0.01)
+
+    store.take('c', 0.001, 1)
+
+    assert list(store._buckets) == ['c']
+
+def test_parse_rate_limit():
+    assert parse_rate_limit('auth.login', 'ip:10/minute') == ('auth.login', 'ip', 10, 60)
+    for spec in ('10/minute', 'ip:10/fortnight', 'user:0/second', 'host:1/day'):
+        with pytest.raises(ValueError):
+            parse_rate_limit('auth.login', spec)
@@ -0,0 +1,182 @@
+import json
+from datetime import date, datetime, timedelta
+import pytest
+from sqlalchemy import select
+from app import create_app, db
+from app.config import TestingConfig
+from app.models.recurring_transaction import RecurringTransaction
+from app.models.transaction import Transaction
+from app.utils.recurring import materialize_due, occurrence_date
+from app.utils.rollups import check_daily_totals
+
+@pytest.fixture
+def client():
+    app = create_app(TestingConfig)
+
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+        yield client
+        with app.app_context():
+            db.drop_all()
+
+@pytest.fixture
+def auth_headers(client):
+    client.post('/api/auth/register', json={
+        'username': 'testuser',
+        'email': 'test@example.com',
+        'password': 'password123'
+    })
+    response = client.post('/api/auth/login', json={'username': 'testuser', 'password': 'password123'})
+    return {'Authorization': f'Bearer {json.loads(response.data)["access_token"]}'}
+
+@pytest.fixture
+def category_id(client, auth_headers):
+    response = client.post('/api/categories', json={'name': 'Rent'}, headers=auth_headers)
+    return json.loads(response.data)['category']['id']
+
+def add_schedule(client, user_id, category_id, **fields):
+    """Insert a schedule directly, as the materializer would find it, without materializing it"""
+    with client.application.app_context():
+        schedule = RecurringTransaction(
+            amount_cents=fields.pop('amount_cents', 120000), type=fields.pop('type', 'expense'),
+            user_id=user_id, category_id=category_id, occurrences=0,
+            next_date=fields['start_date'], **fields
+        )
+        db.session.add(schedule)
+        db.session.commit()
+        return schedule.id
+
+def transaction_dates(client, recurring_id=None):
+    with client.application.app_context():
+        statement = select(Transaction.date).order_by(Transaction.date)
+        if recurring_id is not None:
+            statement = statement.where(Transaction.recurring_id == recurring_id)
+        return [day.isoformat() for day in db.session.execute(statement).scalars()]
+
+def run_materializer(client, until, chunk_size=None):
+    with client.application.app_context():
+        return materialize_due(until, chunk_size)
+
+def test_monthly_occurrences_are_clamped_to_the_month_end():
+    assert [occurrence_date(date(2024, 1, 31), 'monthly', 1, index) for index in range(4)] == [
+        date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31), date(2024, 4, 30)
+    ]
+    assert occurrence_date(date(2024, 2, 29), 'yearly', 1, 1) == date(2025, 2, 28)
+    assert occurrence_date(date(2024, 1, 1), 'weekly', 2, 3) == date(2024, 2, 12)
+
+def test_materializing_again_creates_nothing(client, auth_headers, category_id):
+    add_schedule(client, 1, category_id, frequency='monthly', interval=1, start_date=date(2024, 1, 31))
+    add_schedule(client, 1, category_id, frequency='weekly', interval=1, start_date=date(2024, 3, 1),
+                 type='income', amount_cents=5000)
+
+    # Two chunks of one schedule each
+    assert run_materializer(client, date(2024, 4, 15), chunk_size=1) == (2, 3 + 7)
+    assert run_materializer(client, date(2024, 4, 15)) == (0, 0)
+
+    assert transaction_dates(client, 1) == ['2024-01-31', '2024-02-29', '2024-03-31']
+    with client.application.app_context():
+        schedule = db.session.get(RecurringTransaction, 1)
+        assert (schedule.occurrences, schedule.next_date) == (3, date(2024, 4, 30))
+        assert check_daily_totals() == []
+
+    # A later day only adds what fell due since
+    assert run_materializer(client, date(2024, 5, 1)) == (2, 1 + 2)
+
+def test_existing_occurrences_are_skipped(client, auth_headers, category_id):
+    recurring_id = add_schedule(client, 1, category_id, frequency='daily', interval=1, start_date=date(2024, 1, 1))
+    run_materializer(client, date(2024, 1, 3))
+
+    # A run that read the schedule before the previous one moved it on
+    with client.application.app_context():
+        schedule = db.session.get(RecurringTransaction, recurring_id)
+        schedule.occurrences, schedule.next_date = 1, date(2024, 1, 2)
+        db.session.commit()
+
+    assert run_materializer(client, date(2024, 1, 4)) == (1, 1)
+    assert transaction_dates(client) == ['2024-01-01', '2024-01-02', '2024-01-03', '2024-01-04']
+    with client.application.app_context():
+        assert check_daily_totals() == []
+
+def test_schedules_stop_at_their_end_date_or_count(client, auth_headers, category_id):
+    until = add_schedule(client, 1, category_id, frequency='daily', interval=2,
+                         start_date=date(2024, 1, 1), end_date=date(2024, 1, 6))
+    limited = add_schedule(client, 1, category_id, frequency='yearly', interval=1,
+                           start_date=date(2020, 6, 1), max_occurrences=2)
+
+    assert run_materializer(client, date(2024, 12, 31)) == (2, 3 + 2)
+    assert transaction_dates(client, until) == ['2024-01-01', '2024-01-03', '2024-01-05']
+    assert transaction_dates(client, limited) == ['2020-06-01', '2021-06-01']
+    with client.application.app_context():
+        assert db.session.get(RecurringTransaction, until).next_date is None
+        assert db.session.get(RecurringTransaction, limited).next_date is None
+
+def test_create_materializes_due_occurrences(client, auth_headers, category_id):
+    start = datetime.utcnow().date() - timedelta(weeks=2)
+    response = client.post('/api/recurring', json={
+        'amount': 15, 'type': 'expense', 'category_id': category_id, 'frequency': 'weekly',
+        'start_date': start.isoformat(), 'description': 'Gym'
+    }, headers=auth_headers)
+
+    assert response.status_code == 201
+    data = json.loads(response.data)
+    assert data['created_transactions'] == 3
+    assert data['recurring_transaction']['occurrences'] == 3
+    assert data['recurring_transaction']['next_date'] == (start + timedelta(weeks=3)).isoformat()
+
+    response = client.get('/api/transactions', headers=auth_headers)
+    assert [transaction['amount'] for transaction in json.loads(response.data)['transactions']] == [15, 15, 15]
+
+def test_create_validates_the_cadence(client, auth_headers, category_id):
+    schedule = {'amount': 15, 'type': 'expense', 'category_id': category_id, 'start_date': '2024-01-01'}
+
+    response = client.post('/api/recurring', json={**schedule, 'frequency': 'hourly'}, headers=auth_headers)
+    assert response.status_code == 400
+    response = client.post('/api/recurring', json={**schedule, 'frequency': 'daily', 'interval': 0},
+                           headers=auth_headers)
+    assert response.status_code == 400
+    response = client.post('/api/recurring', json={**schedule, 'frequency': 'daily', 'category_id': 99},
+                           headers=auth_headers)
+    assert response.status_code == 404
+
+def test_create_bounds_the_backfill(client, auth_headers, category_id):
+    today = datetime.utcnow().date()
+    schedule = {'amount': 15, 'type': 'expense', 'category_id': category_id, 'frequency': 'daily'}
+
+    response = client.post('/api/recurring', json={**schedule, 'start_date': '1900-01-01'}, headers=auth_headers)
+    assert response.status_code == 400
+    assert json.loads(response.data)['message'] == 'Start date must be within the last 366 days'
+    assert transaction_dates(client) == []
+
+    response = client.post('/api/recurring', json={
+        **schedule, 'start_date': (today - timedelta(days=366)).isoformat()
+    }, headers=auth_headers)
+    assert response.status_code == 201
+    assert json.loads(response.data)['created_transactions'] == 367
+
+def test_delete_keeps_created_transactions(client, auth_headers, category_id):
+    start = datetime.utcnow().date() - timedelta(days=90)
+    response = client.post('/api/recurring', json={
+        'amount': 15, 'type': 'expense', 'category_id': category_id, 'frequency': 'monthly',
+        'start_date': start.isoformat(), 'max_occurrences': 2
+    }, headers=auth_headers)
+    recurring_id = json.loads(response.data)['recurring_transaction']['id']
+
+    response = client.delete(f'/api/recurring/{recurring_id}', headers=auth_headers)
+    assert response.status_code == 200
+    assert json.loads(client.get('/api/recurring', headers=auth_headers).data)['recurring_transactions'] == []
+    assert transaction_dates(client) == [occurrence_date(start, 'monthly', 1, index).isoformat() for index in range(2)]
+    assert transaction_dates(client, recurring_id) == []
+
+def test_materialize_command(client, auth_headers, category_id):
+    add_schedule(client, 1, category_id, frequency='daily', interval=1, start_date=date(2024, 1, 1))
+
+    runner = client.application.test_cli_runner()
+    result = runner.invoke(args=['recurring', 'materialize', '--date', '2024-01-10'])
+    assert result.exit_code == 0
+    assert 'Materialized 10 transactions from 1 recurring schedules.' in result.output
+    result = runner.invoke(args=['recurring', 'materialize', '--date', '2024-01-10'])
+    assert 'Materialized 0 transactions from 0 recurring schedules.' in result.output
+
+def test_recurring_requires_authentication(client):
+    assert client.get('/api/recurring').status_code == 401
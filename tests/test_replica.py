@@ -0,0 +1,116 @@
+import json
+import pytest
+from datetime import date
+from sqlalchemy import insert
+from app import create_app, db
+from app.config import TestingConfig
+from app.database import get_replica_engine
+from app.models.category import Category
+from app.models.transaction import Transaction
+from app.utils.cache import cache
+
+def make_client(tmp_path, sticky_seconds, **config):
+    class TestConfig(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = 'sqlite:///' + str(tmp_path / 'primary.db')
+        DATABASE_REPLICA_URL = 'sqlite:///' + str(tmp_path / 'replica.db')
+        REPLICA_STICKY_SECONDS = sticky_seconds
+        CACHE_BACKEND = 'null'
+
+    for key, value in config.items():
+        setattr(TestConfig, key, value)
+
+    app = create_app(TestConfig)
+    with app.app_context():
+        db.create_all()
+        db.metadata.create_all(get_replica_engine())
+    return app.test_client()
+
+@pytest.fixture
+def client(tmp_path):
+    client = make_client(tmp_path, 0)
+    yield client
+    with client.application.app_context():
+        db.engine.dispose()
+        get_replica_engine().dispose()
+
+def login(client):
+    client.post(
+        '/api/auth/register',
+        data=json.dumps({
+            'username': 'testuser',
+            'email': 'test@example.com',
+            'password': 'password123'
+        }),
+        content_type='application/json'
+    )
+    response = client.post(
+        '/api/auth/login',
+        data=json.dumps({'username': 'testuser', 'password': 'password123'}),
+        content_type='application/json'
+    )
+    return {'Authorization': f'Bearer {json.loads(response.data)["access_token"]}'}
+
+def create_transaction(client, headers):
+    response = client.post(
+        '/api/categories',
+        data=json.dumps({'name': 'Groceries'}),
+        headers=headers,
+        content_type='application/json'
+    )
+    category_id = json.loads(response.data)['category']['id']
+    response = client.post(
+        '/api/transactions',
+        data=json.dumps({'amount': 12.5, 'type': 'expense', 'category_id': category_id, 'date': '2024-01-05'}),
+        headers=headers,
+        content_type='application/json'
+    )
+    assert response.status_code == 201
+    return category_id
+
+def list_transactions(client, headers):
+    return json.loads(client.get('/api/transactions', headers=headers).data)['transactions']
+
+def test_marked_views_read_from_replica(client):
+    headers = login(client)
+    category_id = create_transaction(client, headers)
+
+    # The replica has not caught up with the primary yet
+    assert list_transactions(client, headers) == []
+
+    with client.application.app_context():
+        with get_replica_engine().begin() as connection:
+            connection.execute(insert(Category.__table__), {'id': category_id, 'name': 'Groceries', 'user_id': 1})
+            connection.execute(insert(Transaction.__table__), {
+                'user_id': 1, 'category_id': category_id, 'amount_cents': 999,
+                'currency': 'USD', 'type': 'expense', 'date': date(2024, 1, 6)
+            })
+
+    assert [t['amount'] for t in list_transactions(client, headers)] == [9.99]
+
+def test_unmarked_views_and_writes_use_primary(client):
+    headers = login(client)
+    create_transaction(client, headers)
+
+    categories = json.loads(client.get('/api/categories', headers=headers).data)['categories']
+    assert [c['name'] for c in categories] == ['Groceries']
+    response = client.get('/api/transactions/1', headers=headers)
+    assert response.status_code == 200
+
+def test_writers_read_their_writes(tmp_path):
+    client = make_client(tmp_path, 60, CACHE_BACKEND='memory', CACHE_MAX_ENTRIES=8)
+    headers = login(client)
+    create_transaction(client, headers)
+
+    assert [t['amount'] for t in list_transactions(client, headers)] == [12.5]
+
+    # Filling the response cache evicts the cached list, but not the pin
+    with client.application.app_context():
+        for index in range(8):
+            cache.backend.set(f'response:{index}', '{}', 60)
+    assert [t['amount'] for t in list_transactions(client, headers)] == [12.5]
+
+    # Once the pin is gone, reads go back to the replica
+    with client.application.app_context():
+        client.application.extensions['replica']['backend'].clear()
+        cache.backend.clear()
+    assert list_transactions(client, headers) == []
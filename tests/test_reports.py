@@ -0,0 +1,247 @@
+import json
+import tracemalloc
+from datetime import date, datetime, timedelta
+import pytest
+from sqlalchemy import event, insert
+from app import create_app, db
+from app.config import TestingConfig
+from app.models.category import Category
+from app.models.daily_category_total import DailyCategoryTotal
+from app.utils.cashflow import cashflow_report
+from app.utils.reports import report_period, spending_memo
+from app.utils.rollups import rebuild_daily_totals
+
+@pytest.fixture
+def client():
+    app = create_app(TestingConfig)
+
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+        yield client
+        with app.app_context():
+            db.drop_all()
+
+@pytest.fixture
+def auth_headers(client):
+    client.post('/api/auth/register', json={
+        'username': 'testuser',
+        'email': 'test@example.com',
+        'password': 'password123'
+    })
+    response = client.post('/api/auth/login', json={'username': 'testuser', 'password': 'password123'})
+    return {'Authorization': f'Bearer {json.loads(response.data)["access_token"]}'}
+
+def create_category(client, headers, name):
+    response = client.post('/api/categories', json={'name': name}, headers=headers)
+    return json.loads(response.data)['category']['id']
+
+def create_transaction(client, headers, category_id, amount, day, type='expense'):
+    response = client.post('/api/transactions', json={
+        'amount': amount, 'type': type, 'category_id': category_id, 'date': day
+    }, headers=headers)
+    assert response.status_code == 201
+    return json.loads(response.data)['transaction']['id']
+
+def rollup_queries(client):
+    """Collects the SELECTs that sum a period's daily_category_totals per category while the test runs"""
+    statements = []
+    
+    def record(conn, cursor, statement, *args):
+        if statement.startswith('SELECT') and 'GROUP BY daily_category_totals.category_id' in statement:
+            statements.append(statement)
+    
+    with client.application.app_context():
+        event.listen(db.engine, 'before_cursor_execute', record)
+    return statements
+
+def get_report(client, headers, period):
+    response = client.get(f'/api/reports/spending?period={period}', headers=headers)
+    assert response.status_code == 200
+    return json.loads(response.data)['report']
+
+def test_spending_report_compares_with_previous_period(client, auth_headers):
+    groceries = create_category(client, auth_headers, 'Groceries')
+    rent = create_category(client, auth_headers, 'Rent')
+    create_transaction(client, auth_headers, groceries, 30, '2024-02-10')
+    create_transaction(client, auth_headers, rent, 500, '2024-02-01')
+    create_transaction(client, auth_headers, groceries, 45, '2024-03-05')
+    create_transaction(client, auth_headers, groceries, 0.5, '2024-03-31')
+    create_transaction(client, auth_headers, rent, 1000, '2024-03-15', type='income')
+
+    report = get_report(client, auth_headers, '2024-03')
+
+    assert (report['start_date'], report['end_date']) == ('2024-03-01', '2024-03-31')
+    assert (report['previous_start_date'], report['previous_end_date']) == ('2024-02-01', '2024-02-29')
+    assert (report['currency'], report['total'], report['previous_total']) == ('USD', 45.5, 530)
+    assert report['change'] == -484.5
+    assert report['categories'] == [{
+        'category_id': groceries, 'category_name': 'Groceries',
+        'total': 45.5, 'previous_total': 30, 'change': 15.5, 'change_pct': 51.7
+    }, {
+        'category_id': rent, 'category_name': 'Rent',
+        'total': 0, 'previous_total': 500, 'change': -500, 'change_pct': -100.0
+    }]
+
+def test_closed_periods_survive_unrelated_writes(client, auth_headers):
+    groceries = create_category(client, auth_headers, 'Groceries')
+    create_transaction(client, auth_headers, groceries, 20, '2024-02-10')
+    create_transaction(client, auth_headers, groceries, 10, '2024-03-10')
+    assert get_report(client, auth_headers, '2024-03')['total'] == 10
+    queries = rollup_queries(client)
+
+    # A write in another month orphans the cached response, not the memoized periods
+    create_transaction(client, auth_headers, groceries, 99, '2024-05-01')
+    report = get_report(client, auth_headers, '2024-03')
+    assert (report['total'], report['previous_total']) == (10, 20)
+    assert queries == []
+
+    # A backdated write drops only the periods containing its date
+    transaction_id = create_transaction(client, auth_headers, groceries, 5, '2024-02-20')
+    report = get_report(client, auth_headers, '2024-03')
+    assert (report['total'], report['previous_total']) == (10, 25)
+    assert len(queries) == 1
+
+    client.put(f'/api/transactions/{transaction_id}', json={'date': '2024-03-20'}, headers=auth_headers)
+    report = get_report(client, auth_headers, '2024-03')
+    assert (report['total'], report['previous_total']) == (15, 20)
+    assert len(queries) == 3
+
+    client.delete(f'/api/transactions/{transaction_id}', headers=auth_headers)
+    assert get_report(client, auth_headers, '2024-03')['total'] == 10
+
+def test_rebuilding_rollups_drops_memoized_periods(client, auth_headers):
+    groceries = create_category(client, auth_headers, 'Groceries')
+    create_transaction(client, auth_headers, groceries, 20, '2024-02-10')
+    assert get_report(client, auth_headers, '2024-02')['total'] == 20
+
+    with client.application.app_context():
+        db.session.execute(db.text('UPDATE transactions SET amount_cents = 700'))
+        rebuild_daily_totals()
+    # Any write orphans the cached response; the memoized total must be gone as well
+    client.post('/api/categories', json={'name': 'Rent'}, headers=auth_headers)
+
+    assert get_report(client, auth_headers, '2024-02')['total'] == 7
+
+def test_memo_timeout_is_capped_without_a_shared_backend():
+    timeouts = {}
+    for backend in ('memory', 'null', 'redis'):
+        class MemoConfig(TestingConfig):
+            CACHE_BACKEND = backend
+            CACHE_REDIS_CLIENT = object()
+            CACHE_DEFAULT_TIMEOUT = 300
+            SPENDING_MEMO_TIMEOUT = 86400
+
+        with create_app(MemoConfig).app_context():
+            timeouts[backend] = spending_memo.timeout()
+
+    # Writes handled by other workers only reach the memo through Redis counters
+    assert timeouts == {'memory': 300, 'null': 300, 'redis': 86400}
+
+def test_current_period_and_bad_periods(client, auth_headers):
+    groceries = create_category(client, auth_headers, 'Groceries')
+    today = datetime.utcnow().date().isoformat()
+    create_transaction(client, auth_headers, groceries, 12, today)
+
+    report = get_report(client, auth_headers, 'this_month')
+    assert report['total'] == 12
+    assert report['end_date'] == today
+
+    for period in ('next_month', '2024-13', '24'):
+        response = client.get(f'/api/reports/spending?period={period}', headers=auth_headers)
+        assert response.status_code == 400
+    assert client.get('/api/reports/spending').status_code == 401
+
+def test_report_period():
+    assert report_period('2023') == (
+        (date(2023, 1, 1), date(2023, 12, 31)), (date(2022, 1, 1), date(2022, 12, 31))
+    )
+    assert report_period('2024-01') == (
+        (date(2024, 1, 1), date(2024, 1, 31)), (date(2023, 12, 1), date(2023, 12, 31))
+    )
+    assert report_period('2023-03')[1] == (date(2023, 2, 1), date(2023, 2, 28))
+
+def get_cashflow(client, headers, query):
+    response = client.get(f'/api/reports/cashflow?{query}', headers=headers)
+    assert response.status_code == 200
+    return json.loads(response.data)['cashflow']
+
+def test_cashflow_series_and_running_balance(client, auth_headers):
+    salary = create_category(client, auth_headers, 'Salary')
+    groceries = create_category(client, auth_headers, 'Groceries')
+    create_transaction(client, auth_headers, salary, 1000, '2023-06-30', type='income')
+    create_transaction(client, auth_headers, groceries, 100, '2023-12-20')
+    create_transaction(client, auth_headers, salary, 2000, '2024-01-31', type='income')
+    create_transaction(client, auth_headers, groceries, 30, '2024-01-15')
+    create_transaction(client, auth_headers, groceries, 60, '2024-03-01')
+    create_transaction(client, auth_headers, groceries, 0.25, '2024-03-01')
+    
+    cashflow = get_cashflow(client, auth_headers, 'start_date=2024-01-01&end_date=2024-03-31')
+    
+    assert (cashflow['group_by'], cashflow['currency'], cashflow['opening_balance']) == ('month', 'USD', 900)
+    assert cashflow['series'] == {
+        'period': ['2024-01-01', '2024-02-01', '2024-03-01'],
+        'income': [2000, 0, 0],
+        'expense': [30, 0, 60.25],
+        'net': [1970, 0, -60.25],
+        'balance': [2870, 2870, 2809.75]
+    }
+    by_category = {(entry['category_name'], entry['type']): entry for entry in cashflow['categories']}
+    assert set(by_category) == {('Salary', 'income'), ('Groceries', 'expense')}
+    # Trailing windows ending on the last day of each month, reaching back before start_date
+    assert by_category['Groceries', 'expense']['average_30d'] == [1, 0, 0]
+    assert by_category['Groceries', 'expense']['average_90d'] == [1.44, 1.44, 1]
+    assert by_category['Salary', 'income']['average_30d'] == [66.67, 66.67, 0]
+
+def test_cashflow_by_week_and_day(client, auth_headers):
+    groceries = create_category(client, auth_headers, 'Groceries')
+    create_transaction(client, auth_headers, groceries, 10, '2024-03-03')
+    create_transaction(client, auth_headers, groceries, 20, '2024-03-04')
+    
+    weekly = get_cashflow(client, auth_headers, 'start_date=2024-03-01&end_date=2024-03-12&group_by=week')
+    # Weeks start on Monday, so the first one began before start_date
+    assert weekly['series']['period'] == ['2024-02-26', '2024-03-04', '2024-03-11']
+    assert weekly['series']['expense'] == [10, 20, 0]
+    
+    daily = get_cashflow(client, auth_headers, 'start_date=2024-03-01&end_date=2024-03-05&group_by=day')
+    assert daily['series']['period'][0] == '2024-03-01'
+    assert daily['series']['balance'] == [0, 0, -10, -30, -30]
+    
+    default = get_cashflow(client, auth_headers, '')
+    assert len(default['series']['period']) == 12
+    assert default['end_date'] == datetime.utcnow().date().isoformat()
+
+def test_cashflow_memory_does_not_grow_with_idle_categories(client, auth_headers):
+    end = date(2024, 12, 31)
+    start = end - timedelta(days=7300)
+    with client.application.app_context():
+        db.session.execute(insert(Category), [{'name': f'Category {number}', 'user_id': 1} for number in range(1000)])
+        # Each category has a total on one day; a dense (category, day) array would take 59 MB
+        db.session.execute(insert(DailyCategoryTotal), [
+            {'user_id': 1, 'category_id': number + 1, 'type': 'expense', 'date': end - timedelta(days=number),
+             'currency': 'USD', 'amount_cents': 3000, 'count': 1}
+            for number in range(1000)
+        ])
+        db.session.commit()
+
+        tracemalloc.start()
+        try:
+            cashflow = cashflow_report(1, start, end, 'month', 'USD')
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    assert peak < 20 * 1024 * 1024
+    by_id = {entry['category_id']: entry for entry in cashflow['categories']}
+    # The 30-day window of December runs from the 2nd (category 30's day) to the 31st
+    assert by_id[30]['average_30d'][-2:] == [0, 1]
+    assert by_id[31]['average_30d'][-2:] == [0, 0]
+    assert by_id[32]['average_30d'][-2:] == [1, 0]
+    assert by_id[32]['average_90d'][-4:] == [0, 0, 0.33, 0.33]
+
+def test_cashflow_rejects_bad_arguments(client, auth_headers):
+    for query in ('group_by=year', 'start_date=2024-13-01', 'start_date=2024-02-01&end_date=2024-01-01',
+                  'start_date=1900-01-01&end_date=2024-01-01', 'currency=dollars'):
+        response = client.get(f'/api/reports/cashflow?{query}', headers=auth_headers)
+        assert response.status_code == 400
+    assert client.get('/api/reports/cashflow').status_code == 401
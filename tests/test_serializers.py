@@ -0,0 +1,77 @@
+import json
+from datetime import date, datetime
+import pytest
+from flask import jsonify
+from app import create_app, db
+from app.config import TestingConfig
+from app.models.budget import Budget
+from app.models.category import Category
+from app.models.transaction import Transaction
+from app.models.user import User
+from app.utils.serializers import RowSerializer, TRANSACTION_SERIALIZER
+from app.utils.helpers import get_budget_spending
+
+@pytest.fixture
+def app():
+    app = create_app(TestingConfig)
+
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.drop_all()
+
+def jsonify_text(data):
+    return jsonify(data).get_data(as_text=True)
+
+def test_row_serializer_matches_jsonify(app):
+    serializer = RowSerializer([
+        (Transaction.id, 'int'),
+        (Transaction.amount_cents.label('amount'), 'cents'),
+        (Transaction.description, 'str'),
+        (Transaction.date, 'date'),
+        (Transaction.created_at, 'date')
+    ])
+    row = (7, 1250, 'Café "bar"\n☃', date(2024, 3, 1), datetime(2024, 3, 1, 9, 30, 15, 120))
+
+    assert serializer.serialize(row) == jsonify_text({
+        'id': 7,
+        'amount': 12.5,
+        'description': 'Café "bar"\n☃',
+        'date': '2024-03-01',
+        'created_at': '2024-03-01T09:30:15.000120'
+    }).strip()
+
+def test_row_serializer_handles_nulls_and_whole_numbers(app):
+    serializer = RowSerializer([(Transaction.id, 'float'), (Transaction.description, 'str')])
+
+    assert serializer.serialize((0, None)) == '{"description":null,"id":0}'
+    assert serializer.serialize_many([]) == '[]'
+
+def test_transaction_and_budget_rows_match_to_dict(app):
+    user = User(username='alice', email='alice@example.com')
+    user.set_password('password123')
+    db.session.add(user)
+    db.session.flush()
+    category = Category(name='Groceries', user_id=user.id)
+    db.session.add(category)
+    db.session.flush()
+    transaction = Transaction(
+        amount_cents=4210, description='Weekly shop', date=date(2024, 1, 5), type='expense',
+        user_id=user.id, category_id=category.id
+    )
+    budget = Budget(
+        amount_cents=30000, start_date=date(2024, 1, 1), end_date=date(2024, 1, 31),
+        user_id=user.id, category_id=category.id
+    )
+    db.session.add_all([transaction, budget])
+    db.session.commit()
+
+    row = db.session.execute(
+        db.select(*TRANSACTION_SERIALIZER.columns).join(Category, Transaction.category_id == Category.id)
+    ).one()
+    assert json.loads(TRANSACTION_SERIALIZER.serialize(row)) == transaction.to_dict()
+
+    (budget_row,) = get_budget_spending(user.id)
+    assert budget_row.spent == 0
+    assert budget_row.remaining == 30000
+    assert budget_row.percentage_used == 0
@@ -0,0 +1,88 @@
+import subprocess
+import sys
+from pathlib import Path
+import click
+from click.testing import CliRunner
+from flask.cli import FlaskGroup
+from app import create_app, db
+from app.config import TestingConfig
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Microseconds the app's own modules may spend importing (self time, as
+# reported by python -X importtime); they take around 40 ms today
+APP_IMPORT_BUDGET_US = 150000
+
+# Modules that only some commands or settings need, and must stay out of a worker's startup
+DEFERRED_MODULES = ('alembic', 'flask_migrate', 'flask_swagger_ui', 'numpy', 'pyarrow', 'redis', 'starlette')
+
+def import_profile():
+    """{module: self time in us} for creating the app with TestingConfig in a fresh interpreter"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c',
+         'from app import create_app; from app.config import TestingConfig; create_app(TestingConfig)'],
+        cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    profile = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, module = line[len('import time:'):].split('|')
+        profile[module.strip()] = int(self_us)
+    return profile
+
+def test_startup_import_budget():
+    profile = import_profile()
+
+    app_time = sum(us for module, us in profile.items() if module == 'app' or module.startswith('app.'))
+    assert app_time < APP_IMPORT_BUDGET_US, f'app modules took {app_time} us to import'
+    deferred = [module for module in profile if module.split('.')[0] in DEFERRED_MODULES]
+    assert deferred == []
+
+def test_startup_skips_schema_and_swagger():
+    app = create_app(TestingConfig)
+
+    with app.app_context():
+        assert db.inspect(db.engine).get_table_names() == []
+    assert 'swagger_ui' not in app.blueprints
+    assert 'migrate' not in app.extensions
+
+def test_flask_cli_gets_migration_commands():
+    cli = FlaskGroup(create_app=lambda: create_app(TestingConfig))
+
+    result = CliRunner().invoke(cli, ['db', '--help'])
+
+    assert result.exit_code == 0
+    assert 'upgrade' in result.output
+
+def test_flask_cli_creates_the_schema_except_for_flask_db():
+    class AutoCreateConfig(TestingConfig):
+        SCHEMA_AUTO_CREATE = True
+
+    def tables(args):
+        apps = []
+        cli = FlaskGroup(create_app=lambda: apps.append(create_app(AutoCreateConfig)) or apps[-1])
+        assert CliRunner().invoke(cli, args).exit_code == 0
+        with apps[0].app_context():
+            return db.inspect(db.engine).get_table_names()
+
+    # Built-in commands such as `flask run` and `flask routes` load the app themselves
+    assert 'transactions' in tables(['routes'])
+    # The app's own commands are looked up first
+    assert 'transactions' in tables(['rollups', 'check'])
+    assert tables(['db', '--help']) == []
+
+def test_other_click_commands_get_a_regular_app():
+    class AutoCreateConfig(TestingConfig):
+        SCHEMA_AUTO_CREATE = True
+
+    apps = []
+
+    @click.command()
+    def script():
+        apps.append(create_app(AutoCreateConfig))
+
+    assert CliRunner().invoke(script).exit_code == 0
+    assert 'migrate' not in apps[0].extensions
+    with apps[0].app_context():
+        assert 'transactions' in db.inspect(db.engine).get_table_names()
@@ -0,0 +1,467 @@
+import csv
+import io
+import json
+import pytest
+from app import create_app, db
+from app.config import TestingConfig
+from app.models.daily_category_total import DailyCategoryTotal
+from app.utils.rollups import check_daily_totals
+from app.utils.money import from_cents
+
+@pytest.fixture
+def client():
+    app = create_app(TestingConfig)
+
+    with app.test_client() as client:
+        with app.app_context():
+            db.create_all()
+        yield client
+        with app.app_context():
+            db.drop_all()
+
+@pytest.fixture
+def auth_headers(client):
+    # Register a user
+    client.post(
+        '/api/auth/register',
+        data=json.dumps({
+            'username': 'testuser',
+            'email': 'test@example.com',
+            'password': 'password123'
+        }),
+        content_type='application/json'
+    )
+
+    # Login to get token
+    response = client.post(
+        '/api/auth/login',
+        data=json.dumps({
+            'username': 'testuser',
+            'password': 'password123'
+        }),
+        content_type='application/json'
+    )
+
+    data = json.loads(response.data)
+    return {'Authorization': f'Bearer {data["access_token"]}'}
+
+@pytest.fixture
+def category_id(client, auth_headers):
+    response = client.post(
+        '/api/categories',
+        data=json.dumps({'name': 'Groceries'}),
+        headers=auth_headers,
+        content_type='application/json'
+    )
+    return json.loads(response.data)['category']['id']
+
+def create_transaction(client, headers, category_id, amount, date, type='expense', description=''):
+    response = client.post(
+        '/api/transactions',
+        data=json.dumps({
+            'amount': amount,
+            'type': type,
+            'category_id': category_id,
+            'date': date,
+            'description': description
+        }),
+        headers=headers,
+        content_type='application/json'
+    )
+    assert response.status_code == 201
+    return json.loads(response.data)['transaction']
+
+def test_get_transactions_paginates_with_cursor(client, auth_headers, category_id):
+    # Two transactions share a date so the id tie-breaker is exercised
+    for day in ['2024-01-01', '2024-01-02', '2024-01-02', '2024-01-03', '2024-01-04']:
+        create_transaction(client, auth_headers, category_id, 10, day)
+
+    seen = []
+    cursor = None
+    while True:
+        url = '/api/transactions?limit=2' + (f'&cursor={cursor}' if cursor else '')
+        response = client.get(url, headers=auth_headers)
+        assert response.status_code == 200
+        data = json.loads(response.data)
+        assert len(data['transactions']) <= 2
+        seen.extend(data['transactions'])
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+
+    assert len(seen) == 5
+    assert len({t['id'] for t in seen}) == 5
+    keys = [(t['date'], t['id']) for t in seen]
+    assert keys == sorted(keys, reverse=True)
+
+def test_get_transactions_rejects_invalid_cursor(client, auth_headers):
+    response = client.get('/api/transactions?cursor=not-a-cursor', headers=auth_headers)
+
+    assert response.status_code == 400
+    assert json.loads(response.data)['message'] == 'Invalid cursor'
+
+def test_get_transactions_ndjson_stream(client, auth_headers, category_id):
+    for day in ['2024-01-01', '2024-01-02', '2024-01-03']:
+        create_transaction(client, auth_headers, category_id, 10, day)
+
+    response = client.get('/api/transactions?format=ndjson&type=expense', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    rows = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [row['date'] for row in rows] == ['2024-01-03', '2024-01-02', '2024-01-01']
+    assert rows[0]['category_name'] == 'Groceries'
+
+def test_get_transaction_summary(client, auth_headers, category_id):
+    create_transaction(client, auth_headers, category_id, 100, '2024-01-01', type='income')
+    create_transaction(client, auth_headers, category_id, 30, '2024-01-02')
+    create_transaction(client, auth_headers, category_id, 20, '2024-02-05')
+
+    response = client.get('/api/transactions/summary', headers=auth_headers)
+
+    assert response.status_code == 200
+    summary = json.loads(response.data)['summary']
+    assert summary['total_income'] == 100
+    assert summary['total_expense'] == 50
+    assert summary['net'] == 50
+    assert summary['by_category'] == {'Groceries': {'income': 100, 'expense': 50}}
+    assert 'groups' not in summary
+
+def test_get_transaction_summary_group_by_period(client, auth_headers, category_id):
+    # 2024-01-01 is a Monday, 2024-01-07 the Sunday of the same week
+    create_transaction(client, auth_headers, category_id, 10, '2024-01-01')
+    create_transaction(client, auth_headers, category_id, 20, '2024-01-07')
+    create_transaction(client, auth_headers, category_id, 40, '2024-01-08')
+    create_transaction(client, auth_headers, category_id, 80, '2024-02-29', type='income')
+
+    def groups(group_by):
+        response = client.get(f'/api/transactions/summary?group_by={group_by}', headers=auth_headers)
+        assert response.status_code == 200
+        return json.loads(response.data)['summary']['groups']
+
+    assert [(g['period'], g['expense']) for g in groups('day')] == [
+        ('2024-01-01', 10), ('2024-01-07', 20), ('2024-01-08', 40), ('2024-02-29', 0)
+    ]
+    assert [(g['period'], g['expense']) for g in groups('week')] == [
+        ('2024-01-01', 30), ('2024-01-08', 40), ('2024-02-26', 0)
+    ]
+    assert [(g['period'], g['income'], g['net']) for g in groups('month')] == [
+        ('2024-01-01', 0, -70), ('2024-02-01', 80, 80)
+    ]
+    assert groups('category') == [{
+        'category_id': category_id,
+        'category_name': 'Groceries',
+        'income': 80,
+        'expense': 70,
+        'net': 10
+    }]
+
+def test_get_transaction_summary_rejects_unknown_group_by(client, auth_headers):
+    response = client.get('/api/transactions/summary?group_by=year', headers=auth_headers)
+
+    assert response.status_code == 400
+
+def daily_totals(client):
+    with client.application.app_context():
+        return {
+            (row.category_id, row.type, row.date.isoformat()): (from_cents(row.amount_cents), row.count)
+            for row in DailyCategoryTotal.query.all()
+        }
+
+def test_amounts_are_summed_exactly(client, auth_headers, category_id):
+    for _ in range(10):
+        create_transaction(client, auth_headers, category_id, 0.1, '2024-01-01')
+    create_transaction(client, auth_headers, category_id, '19.99', '2024-01-02', type='income')
+
+    summary = json.loads(client.get('/api/transactions/summary', headers=auth_headers).data)['summary']
+
+    # Ten float additions of 0.1 would give 0.9999999999999999
+    assert summary['total_expense'] == 1.0
+    assert summary['net'] == 18.99
+    assert daily_totals(client)[(category_id, 'expense', '2024-01-01')] == (1.0, 10)
+
+def test_transaction_currency(client, auth_headers, category_id):
+    transaction = create_transaction(client, auth_headers, category_id, 12.345, '2024-01-01')
+    assert transaction['amount'] == 12.35
+    assert transaction['currency'] == 'USD'
+
+    response = client.put(
+        f'/api/transactions/{transaction["id"]}',
+        data=json.dumps({'currency': 'eur'}),
+        headers=auth_headers,
+        content_type='application/json'
+    )
+    assert json.loads(response.data)['transaction']['currency'] == 'EUR'
+
+    response = client.post(
+        '/api/transactions',
+        data=json.dumps({'amount': 'ten', 'type': 'expense', 'category_id': category_id, 'currency': 'EUR'}),
+        headers=auth_headers,
+        content_type='application/json'
+    )
+    assert response.status_code == 400
+    response = client.post(
+        '/api/transactions',
+        data=json.dumps({'amount': 10, 'type': 'expense', 'category_id': category_id, 'currency': 'EURO'}),
+        headers=auth_headers,
+        content_type='application/json'
+    )
+    assert response.status_code == 400
+
+def test_daily_totals_follow_transaction_writes(client, auth_headers, category_id):
+    other_category = json.loads(client.post(
+        '/api/categories',
+        data=json.dumps({'name': 'Rent'}),
+        headers=auth_headers,
+        content_type='application/json'
+    ).data)['category']['id']
+    first = create_transaction(client, auth_headers, category_id, 10, '2024-01-01')
+    create_transaction(client, auth_headers, category_id, 5, '2024-01-01')
+    assert daily_totals(client) == {(category_id, 'expense', '2024-01-01'): (15, 2)}
+
+    # Move the first transaction to another category and date
+    response = client.put(
+        f'/api/transactions/{first["id"]}',
+        data=json.dumps({'category_id': other_category, 'date': '2024-01-02', 'amount': 12}),
+        headers=auth_headers,
+        content_type='application/json'
+    )
+    assert response.status_code == 200
+    assert daily_totals(client) == {
+        (category_id, 'expense', '2024-01-01'): (5, 1),
+        (other_category, 'expense', '2024-01-02'): (12, 1)
+    }
+
+    client.delete(f'/api/transactions/{first["id"]}', headers=auth_headers)
+    assert daily_totals(client) == {(category_id, 'expense', '2024-01-01'): (5, 1)}
+
+    with client.application.app_context():
+        assert check_daily_totals() == []
+
+def test_rollups_cli_rebuilds_and_checks(client, auth_headers, category_id):
+    create_transaction(client, auth_headers, category_id, 10, '2024-01-01')
+    runner = client.application.test_cli_runner()
+
+    with client.application.app_context():
+        db.session.query(DailyCategoryTotal).delete()
+        db.session.commit()
+
+    result = runner.invoke(args=['rollups', 'check'])
+    assert result.exit_code != 0
+    assert '1 inconsistent daily totals' in result.output
+
+    result = runner.invoke(args=['rollups', 'rebuild'])
+    assert result.exit_code == 0
+    assert daily_totals(client) == {(category_id, 'expense', '2024-01-01'): (10, 1)}
+
+    result = runner.invoke(args=['rollups', 'check'])
+    assert result.exit_code == 0
+
+def test_bulk_create_transactions(client, auth_headers, category_id):
+    client.application.config['TRANSACTIONS_BULK_CHUNK_SIZE'] = 2
+    payload = [
+        {'amount': 10, 'type': 'expense', 'category_id': category_id, 'date': '2024-01-01'},
+        {'amount': 20, 'type': 'expense', 'category_id': category_id, 'date': '2024-01-01'},
+        {'amount': 5, 'type': 'transfer', 'category_id': category_id},
+        {'amount': 30, 'type': 'income', 'category_id': 999, 'date': '2024-01-02'},
+        {'amount': 40, 'type': 'income', 'category_id': category_id, 'date': '2024-01-03'},
+        {'amount': 50, 'type': 'expense', 'category_id': category_id, 'date': '01/04/2024'},
+    ]
+
+    response = client.post(
+        '/api/transactions/bulk',
+        data=json.dumps(payload),
+        headers=auth_headers,
+        content_type='application/json'
+    )
+
+    assert response.status_code == 201
+    data = json.loads(response.data)
+    assert data['created'] == 3
+    assert [error['index'] for error in data['errors']] == [2, 3, 5]
+    assert data['errors'][1]['message'] == 'Category not found'
+    assert daily_totals(client) == {
+        (category_id, 'expense', '2024-01-01'): (30, 2),
+        (category_id, 'income', '2024-01-03'): (40, 1)
+    }
+
+def test_bulk_create_transactions_ndjson(client, auth_headers, category_id):
+    lines = [
+        json.dumps({'amount': 10, 'type': 'expense', 'category_id': category_id, 'date': '2024-01-01'}),
+        '',
+        'not json',
+        json.dumps({'amount': 15, 'type': 'expense', 'category_id': category_id, 'date': '2024-01-02'}),
+    ]
+
+    response = client.post(
+        '/api/transactions/bulk',
+        data='\n'.join(lines),
+        headers=auth_headers,
+        content_type='application/x-ndjson'
+    )
+
+    assert response.status_code == 201
+    data = json.loads(response.data)
+    assert data['created'] == 2
+    assert data['errors'] == [{'index': 1, 'message': 'Invalid JSON'}]
+    response = client.get('/api/transactions', headers=auth_headers)
+    assert len(json.loads(response.data)['transactions']) == 2
+
+def test_bulk_create_transactions_rejects_invalid_input(client, auth_headers, category_id):
+    response = client.post(
+        '/api/transactions/bulk',
+        data=json.dumps({'amount': 10}),
+        headers=auth_headers,
+        content_type='application/json'
+    )
+    assert response.status_code == 400
+
+    response = client.post(
+        '/api/transactions/bulk',
+        data=json.dumps([{'amount': 10, 'type': 'expense', 'category_id': 999}]),
+        headers=auth_headers,
+        content_type='application/json'
+    )
+    assert response.status_code == 400
+    assert json.loads(response.data)['created'] == 0
+
+STATEMENT_CSV = '''Date,Amount,Payee,Category
+2024-03-01,-4.50,Coffee Shop,Groceries
+2024-03-01,-4.50,Coffee Shop,Groceries
+2024-03-02,2500.00,Salary,
+2024-03-03,-80.25,Supermarket,Groceries
+2024-03-04,abc,Broken row,Groceries
+'''
+
+STATEMENT_OFX = '''OFXHEADER:100
+DATA:OFXSGML
+
+<OFX>
+<BANKMSGSRSV1><STMTTRNRS><STMTRS><BANKTRANLIST>
+<STMTTRN>
+<TRNTYPE>DEBIT
+<DTPOSTED>20240305120000
+<TRNAMT>-12.00
+<NAME>Bookshop
+</STMTTRN>
+<STMTTRN><TRNTYPE>CREDIT</TRNTYPE><DTPOSTED>20240306</DTPOSTED><TRNAMT>40.00</TRNAMT><NAME>Refund</NAME></STMTTRN>
+</BANKTRANLIST></STMTRS></STMTTRNRS></BANKMSGSRSV1>
+</OFX>
+'''
+
+def import_statement(client, headers, content, filename, **form):
+    response = client.post(
+        '/api/transactions/import',
+        data={'file': (io.BytesIO(content.encode()), filename), **form},
+        headers=headers,
+        content_type='multipart/form-data'
+    )
+    assert response.status_code in (200, 201), response.data
+    return json.loads(response.data)
+
+def test_import_csv_skips_duplicates_on_reimport(client, auth_headers, category_id):
+    form = {'description_column': 'Payee', 'category_column': 'Category', 'date_column': 'Date',
+            'amount_column': 'Amount', 'default_category_id': str(category_id)}
+
+    first = import_statement(client, auth_headers, STATEMENT_CSV, 'march.csv', **form)
+    assert first['imported'] == 4
+    assert first['duplicates'] == 0
+    assert [error['index'] for error in first['errors']] == [4]
+
+    # Overlapping statement: the same rows plus one new purchase
+    overlapping = STATEMENT_CSV + '2024-03-05,-15.00,Cinema,Groceries\n'
+    second = import_statement(client, auth_headers, overlapping, 'march-again.csv', **form)
+    assert second['imported'] == 1
+    assert second['duplicates'] == 4
+
+    response = client.get('/api/transactions/summary', headers=auth_headers)
+    summary = json.loads(response.data)['summary']
+    assert summary['total_income'] == 2500
+    assert summary['total_expense'] == 4.5 + 4.5 + 80.25 + 15
+
+def test_import_ofx(client, auth_headers, category_id):
+    data = import_statement(client, auth_headers, STATEMENT_OFX, 'march.ofx', default_category_id=str(category_id))
+
+    assert data['imported'] == 2
+    response = client.get('/api/transactions', headers=auth_headers)
+    transactions = json.loads(response.data)['transactions']
+    assert [(t['date'], t['type'], t['amount'], t['description']) for t in transactions] == [
+        ('2024-03-06', 'income', 40, 'Refund'),
+        ('2024-03-05', 'expense', 12, 'Bookshop'),
+    ]
+
+    again = import_statement(client, auth_headers, STATEMENT_OFX, 'march.qfx', default_category_id=str(category_id))
+    assert again['imported'] == 0
+    assert again['duplicates'] == 2
+
+def test_import_uses_the_statement_currency(client, auth_headers, category_id):
+    import_statement(client, auth_headers, STATEMENT_OFX, 'march.ofx', default_category_id=str(category_id),
+                     currency='EUR')
+
+    response = client.get('/api/transactions', headers=auth_headers)
+    assert [t['currency'] for t in json.loads(response.data)['transactions']] == ['EUR', 'EUR']
+
+def test_import_detects_rows_entered_by_hand(client, auth_headers, category_id):
+    create_transaction(client, auth_headers, category_id, 12, '2024-03-05', description='Bookshop')
+
+    data = import_statement(client, auth_headers, STATEMENT_OFX, 'march.ofx', default_category_id=str(category_id))
+
+    assert data['imported'] == 1
+    assert data['duplicates'] == 1
+
+def test_import_rejects_unknown_categories_unless_asked(client, auth_headers, category_id):
+    content = 'date,amount,category\n2024-03-01,-10,Travel\n'
+
+    data = import_statement(client, auth_headers, content, 'a.csv')
+    assert data['imported'] == 0
+    assert data['errors'] == [{'index': 0, 'message': 'Unknown category: Travel'}]
+
+    data = import_statement(client, auth_headers, content, 'a.csv', create_categories='true')
+    assert data['imported'] == 1
+    response = client.get('/api/categories', headers=auth_headers)
+    assert 'Travel' in [c['name'] for c in json.loads(response.data)['categories']]
+
+def test_export_csv_applies_filters(client, auth_headers, category_id):
+    create_transaction(client, auth_headers, category_id, 10, '2024-01-01', description='Milk, eggs')
+    create_transaction(client, auth_headers, category_id, 20, '2024-01-02', type='income')
+    create_transaction(client, auth_headers, category_id, 30, '2024-02-01')
+
+    response = client.get('/api/transactions/export?format=csv&type=expense&end_date=2024-01-31', headers=auth_headers)
+
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert 'attachment' in response.headers['Content-Disposition']
+    rows = list(csv.DictReader(io.StringIO(response.data.decode())))
+    assert len(rows) == 1
+    assert rows[0]['date'] == '2024-01-01'
+    assert rows[0]['description'] == 'Milk, eggs'
+    assert rows[0]['category_name'] == 'Groceries'
+    assert float(rows[0]['amount']) == 10
+
+def test_export_ndjson(client, auth_headers, category_id):
+    client.application.config['TRANSACTIONS_STREAM_BATCH_SIZE'] = 2
+    for day in range(1, 6):
+        create_transaction(client, auth_headers, category_id, day, f'2024-01-0{day}')
+
+    response = client.get('/api/transactions/export?format=ndjson', headers=auth_headers)
+
+    rows = [json.loads(line) for line in response.data.decode().splitlines()]
+    assert [row['amount'] for row in rows] == [5, 4, 3, 2, 1]
+
+def test_export_parquet(client, auth_headers, category_id):
+    pq = pytest.importorskip('pyarrow.parquet')
+    client.application.config['TRANSACTIONS_STREAM_BATCH_SIZE'] = 2
+    for day in range(1, 6):
+        create_transaction(client, auth_headers, category_id, day, f'2024-01-0{day}')
+
+    response = client.get('/api/transactions/export?format=parquet', headers=auth_headers)
+
+    assert response.status_code == 200
+    table = pq.read_table(io.BytesIO(response.data))
+    assert table.num_rows == 5
+    assert table.column('amount').to_pylist() == [5, 4, 3, 2, 1]
+
+def test_export_rejects_unknown_format(client, auth_headers):
+    response = client.get('/api/transactions/export?format=xlsx', headers=auth_headers)
+
+    assert response.status_code == 400